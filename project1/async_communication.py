@@ -0,0 +1,351 @@
+"""
+Asynchronous client communication with the trusted server.
+
+AsyncCommunication sends the same requests as Communication with aiohttp, so that a party
+waits on several messages at once, and that a process hosts many parties in a single event
+loop.
+"""
+
+import asyncio
+import base64
+import json
+from typing import Dict, List, Optional, Tuple, Union
+
+import aiohttp
+
+from communication import encode_values, pack_frames, unpack_frames
+
+
+class AsyncCommunication:
+    """
+    Asynchronous network communications with the server.
+
+    Attributes:
+        server_host: hostname of the server
+        server_port: port of the server
+        client_id: Identifier of this client
+        poll_delay: delay between requests in seconds (default: 0.2 s)
+        protocol: network protocol to use (default: "http")
+        long_poll: whether the server holds the retrieve requests until the message is sent,
+            instead of the client polling it (default: True)
+        wait_timeout: longest time in seconds the server holds a request (default: 30 s)
+        participants: Clients of the protocol, whose shares the openings wait for and among
+            which the trusted parameters are split, apart from the other protocols on the
+            server. By default, they are every client of the server.
+        session: HTTP session to send the requests with, which can be shared by several
+            parties. A session is opened on the first request and closed by close() otherwise.
+        bytes_sent: Total size of the bodies of the requests sent
+        bytes_received: Total size of the bodies of the responses received
+    """
+
+    def __init__(
+            self,
+            server_host: str,
+            server_port: int,
+            client_id: str,
+            poll_delay: float = 0.2,
+            protocol: str = "http",
+            long_poll: bool = True,
+            wait_timeout: float = 30.0,
+            session: Optional[aiohttp.ClientSession] = None,
+            participants: Optional[List[str]] = None
+    ):
+        self.base_url = f"{protocol}://{server_host}:{server_port}"
+        self.client_id = client_id
+        self.poll_delay = poll_delay
+        self.long_poll = long_poll
+        self.wait_timeout = wait_timeout
+        self.participants = participants
+        self.session = session
+        self._owns_session = session is None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+    async def close(self) -> None:
+        """
+        Close the session of the client, unless it was given.
+        """
+
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+    async def _request(
+            self,
+            method: str,
+            url: str,
+            data: Union[bytes, str, None] = None,
+            body=None
+        ) -> Tuple[int, bytes]:
+        """
+        Send a request, with raw data or a JSON body, and return the status and content of
+        the response.
+        """
+
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        headers = None
+        if body is not None:
+            data = encode_values(body)
+            headers = {"Content-Type": "application/json"}
+        if isinstance(data, str):
+            data = data.encode()
+        async with self.session.request(method, url, data=data, headers=headers) as res:
+            content = await res.read()
+        self.bytes_sent += len(data or b"")
+        self.bytes_received += len(content)
+        return res.status, content
+
+
+    async def _send(self, url: str, data: Union[bytes, str, None] = None, body=None) -> None:
+        """
+        Post a message or shares to the server, raising a ConnectionError if it rejects them.
+        """
+
+        status, content = await self._request("POST", url, data, body)
+        if status != 200:
+            raise ConnectionError(f"The server rejected the request: {content.decode()}")
+
+
+    def _url(self, path: str, query: str = "") -> str:
+        """
+        URL of a retrieve route, its waiting version with long polling, with an optional query
+        string.
+        """
+
+        if self.long_poll:
+            path = f"/wait{path}"
+            query = "&".join(filter(None, [f"timeout={self.wait_timeout}", query]))
+        return f"{self.base_url}{path}?{query}" if query else f"{self.base_url}{path}"
+
+
+    def _scope(self) -> str:
+        """
+        Query string of the participants of the protocol, if any.
+        """
+
+        return f"participants={','.join(self.participants)}" if self.participants else ""
+
+
+    def _scoped(self, url: str) -> str:
+        """
+        URL of a request for the openings or trusted parameters of the participants, if any.
+        """
+
+        scope = self._scope()
+        if not scope:
+            return url
+        return f"{url}&{scope}" if "?" in url else f"{url}?{scope}"
+
+
+    async def _retrieve(self, path: str, query: str = "") -> bytes:
+        """
+        Get a message, repeating the request until it is ready.
+        """
+
+        url = self._url(path, query)
+        while True:
+            status, content = await self._request("GET", url)
+            if status == 200:
+                return content
+            if not self.long_poll:
+                await asyncio.sleep(self.poll_delay)
+
+
+    async def send_private_message(
+            self,
+            receiver_id: str,
+            label: str,
+            message: Union[bytes, str]
+        ) -> None:
+        """
+        Send a private message to the server.
+        """
+
+        url = f"{self.base_url}/private/{self.client_id}/{receiver_id}/{label}"
+        await self._send(url, message)
+
+
+    async def retrieve_private_message(
+            self,
+            label: str
+        ) -> bytes:
+        """
+        Retrieve a private message from the server.
+        """
+
+        return await self._retrieve(f"/private/{self.client_id}/{label}")
+
+
+    async def retrieve_private_messages(
+            self,
+            labels: List[str]
+        ) -> Dict[str, bytes]:
+        """
+        Retrieve several private messages from the server, polling until all of them arrived.
+        """
+
+        url = self._url(f"/private/{self.client_id}")
+        messages = {}
+        while True:
+            missing = [label for label in labels if label not in messages]
+            if not missing:
+                return messages
+            _, content = await self._request("POST", url, body=missing)
+            for label, message in json.loads(content).items():
+                messages[label] = base64.b64decode(message)
+            if len(messages) < len(labels) and not self.long_poll:
+                await asyncio.sleep(self.poll_delay)
+
+
+    async def publish_message(
+            self,
+            label: str,
+            message: Union[bytes, str]
+        ) -> None:
+        """
+        Publish a message on the server.
+        """
+
+        url = f"{self.base_url}/public/{self.client_id}/{label}"
+        await self._send(url, message)
+
+
+    async def publish_messages(
+            self,
+            messages: Dict[str, Union[bytes, str]]
+        ) -> None:
+        """
+        Publish several messages on the server in a single request, by label.
+        """
+
+        url = f"{self.base_url}/bulk/publish/{self.client_id}"
+        frames = [
+            ([label], message.encode() if isinstance(message, str) else message)
+            for label, message in messages.items()
+        ]
+        await self._send(url, pack_frames(frames))
+
+
+    async def retrieve_public_message(
+            self,
+            sender_id: str,
+            label: str
+        ) -> bytes:
+        """
+        Retrieve a public message from the server.
+        """
+
+        return await self._retrieve(f"/public/{self.client_id}/{sender_id}/{label}")
+
+
+    async def retrieve_public_messages(
+            self,
+            sender_ids: List[str],
+            label: str
+        ) -> List[bytes]:
+        """
+        Retrieve the public messages of several senders with the same label, in a single
+        request once they are all published.
+        """
+
+        url = f"{self.base_url}/bulk/retrieve/{self.client_id}"
+        if self.long_poll:
+            url += f"?timeout={self.wait_timeout}"
+        messages = {}
+        while True:
+            missing = [[sender_id, label] for sender_id in sender_ids if sender_id not in messages]
+            if not missing:
+                return [messages[sender_id] for sender_id in sender_ids]
+            _, content = await self._request("POST", url, body=missing)
+            for (sender_id, _), message in unpack_frames(content):
+                messages[sender_id] = message
+            if len(messages) < len(sender_ids) and not self.long_poll:
+                await asyncio.sleep(self.poll_delay)
+
+
+    async def publish_opening_share(
+            self,
+            label: str,
+            values: list,
+            field: str = "default"
+        ) -> None:
+        """
+        Publish my shares of values opened to all the clients, in the field of that name.
+        """
+
+        url = self._scoped(f"{self.base_url}/opening/{self.client_id}/{label}?field={field}")
+        await self._send(url, body=values)
+
+
+    async def retrieve_opening(
+            self,
+            label: str
+        ) -> list:
+        """
+        Retrieve opened values from the server, vectors as lists.
+        """
+
+        return json.loads(
+            await self._retrieve(f"/opening/{self.client_id}/{label}", self._scope())
+        )
+
+
+    async def retrieve_beaver_triplet_shares(
+            self,
+            op_id: str,
+            field: Optional[str] = None
+        ) -> Tuple[int, int, int]:
+        """
+        Retrieve a triplet of shares generated by the trusted server, in the field of that name
+        if one is given.
+        """
+
+        url = f"{self.base_url}/shares/{self.client_id}/{op_id}"
+        if field is not None:
+            url += f"?field={field}"
+        url = self._scoped(url)
+
+        _, content = await self._request("GET", url)
+        return tuple(json.loads(content))
+
+
+    async def retrieve_beaver_triplet_shares_batch(
+            self,
+            op_ids: List[str],
+            sizes: Optional[List[int]] = None,
+            field: Optional[str] = None
+        ) -> List[Tuple[int, int, int]]:
+        """
+        Retrieve the triplets of shares of several operations in a single request.
+        An operation with a non-zero size gets a triplet of vectors, as lists of that size.
+        The triplets are in the field of that name if one is given.
+        """
+
+        url = self._scoped(f"{self.base_url}/shares/{self.client_id}")
+
+        if sizes is not None:
+            op_ids = [[op_id, size] for op_id, size in zip(op_ids, sizes)]
+        body = op_ids if field is None else {"ops": op_ids, "field": field}
+        _, content = await self._request("POST", url, body=body)
+        return [tuple(triplet) for triplet in json.loads(content)]
+
+
+    async def retrieve_truncation_pairs_batch(
+            self,
+            op_ids: List[str],
+            bits: List[int],
+            field: str
+        ) -> List[Tuple[int, int]]:
+        """
+        Retrieve the shares of the truncation pairs (r, r >> bits) of several operations in a
+        single request, in the field of that name.
+        """
+
+        url = self._scoped(f"{self.base_url}/truncation/{self.client_id}")
+
+        body = {"ops": [[op_id, b] for op_id, b in zip(op_ids, bits)], "field": field}
+        _, content = await self._request("POST", url, body=body)
+        return [tuple(pair) for pair in json.loads(content)]
@@ -0,0 +1,185 @@
+"""
+Asynchronous implementation of an SMC client.
+
+AsyncSMCParty runs the same protocol as SMCParty, whose local computations it reuses, but
+awaits its requests: the messages of all the peers of a round are retrieved concurrently and
+the Beaver triplets of every layer are requested as soon as the run starts. Since a party only
+waits on the event loop, a process can run many of them with run_parties.
+
+Several protocols can run in one event loop, on a server each or on a shared one: the
+parties scope their trusted parameters and openings to the participants of their protocol.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from async_communication import AsyncCommunication
+from circuit import TRUNC, Circuit, compile_circuit
+from expression import Expression, Secret
+from protocol import ProtocolSpec
+from secret_sharing import Share
+from smc_party import SMCParty, layer_sizes
+
+
+class AsyncSMCParty(SMCParty):
+    """
+    A client that executes an SMC protocol with asyncio.
+
+    Attributes:
+        client_id: Identifier of this client
+        server_host: hostname of the server
+        server_port: port of the server
+        protocol_spec (ProtocolSpec): Protocol specification
+        value_dict (dict): Dictionary assigning values to secrets belonging to this client.
+        session: HTTP session shared with other parties, each party opens its own by default
+        comm: Transport with the API of AsyncCommunication, such as an AsyncLocalCommunication
+    """
+    def __init__(
+            self,
+            client_id: str,
+            server_host: str,
+            server_port: int,
+            protocol_spec: ProtocolSpec,
+            value_dict: Dict[Secret, int],
+            session: Optional[aiohttp.ClientSession] = None,
+            comm: Optional[AsyncCommunication] = None
+        ):
+        comm = comm or AsyncCommunication(
+            server_host, server_port, client_id, session=session,
+            participants=protocol_spec.participant_ids
+        )
+        super().__init__(
+            client_id, server_host, server_port, protocol_spec, value_dict, comm=comm
+        )
+
+    async def run(self):
+        """
+        The method the client use to do the SMC.
+        """
+        try:
+            await self.init_secret_sharing()
+            circuit = self.compile_protocol()
+            shares = await self.process_circuit(circuit)
+            return self.decode_outputs(await self.reveal(shares, circuit.output_label()))
+        finally:
+            await self.comm.close()
+
+    async def reveal(self, my_shares: List[Share], label: str) -> list:
+        """
+        Publish my shares of the outputs in a single message and get their values, which the
+        server reconstructs from the shares of all the clients.
+        """
+        field = self.protocol_spec.field
+        await self.comm.publish_opening_share(label, self.share_values(my_shares), field.name)
+        return self.opened_values(await self.comm.retrieve_opening(label))
+
+    async def init_secret_sharing(self):
+        """Distribute shares of my secret among other parties"""
+        bundles = self.share_inputs()
+        peers = self.peers()
+        await asyncio.gather(*(
+            self.comm.send_private_message(
+                client_id, self.input_label(self.client_id, self.session), bundles[client_id]
+            )
+            for client_id in peers
+        ))
+        if peers:
+            self.store_input_shares(await self.comm.retrieve_private_messages([
+                self.input_label(client_id, self.session) for client_id in peers
+            ]))
+
+    async def process_expression(
+            self,
+            expr: Expression
+        ) -> Share:
+        """
+        Compute my share of an expression.
+        """
+        return (await self.process_circuit(compile_circuit(expr)))[0]
+
+    async def process_circuit(
+            self,
+            circuit: Circuit
+        ) -> List[Share]:
+        """
+        Execute a compiled circuit and return my share of each of its outputs.
+        """
+        self.check_circuit(circuit)
+        values = [0] * len(circuit)
+        # The triplets do not depend on the values, they are all requested at once.
+        material = {
+            depth: asyncio.ensure_future(self.retrieve_layer_material(circuit, layer))
+            for depth, layer in enumerate(circuit.layers, 1)
+        }
+        try:
+            for depth, (start, beaver_end, end) in enumerate(circuit.stages):
+                if beaver_end > start:
+                    await self.process_multiplication_layer(
+                        circuit, values, range(start, beaver_end), depth, material[depth]
+                    )
+                self.process_local_instructions(circuit, values, range(beaver_end, end))
+        finally:
+            for task in material.values():
+                task.cancel()
+        return self.output_shares(circuit, values)
+
+    async def process_multiplication_layer(
+            self,
+            circuit: Circuit,
+            values: List[int],
+            layer: range,
+            depth: int,
+            material: Optional[asyncio.Future] = None
+        ) -> None:
+        """
+        Run the Beaver triplets algorithm for all the multiplications of a layer, and the
+        probabilistic truncation of its truncations, in a single round.
+        """
+        label = circuit.layer_label(depth)
+        if material is None:
+            material = await self.retrieve_layer_material(circuit, layer)
+        else:
+            material = await material
+        masked = self.mask_layer(circuit, values, layer, material)
+        await self.comm.publish_opening_share(label, masked, self.protocol_spec.field.name)
+        opened = self.opened_values(await self.comm.retrieve_opening(label))
+        self.finish_layer(circuit, values, layer, material, opened)
+
+    async def retrieve_layer_material(
+            self,
+            circuit: Circuit,
+            layer: range
+        ) -> Tuple[list, list]:
+        """
+        Get my shares of the Beaver triplets of the multiplications of a layer, as vectors for
+        element-wise triplets, and of the truncation pairs of its truncations.
+        """
+        field = self.protocol_spec.field
+        products = [wire for wire in layer if circuit.ops[wire] != TRUNC]
+        truncations = [wire for wire in layer if circuit.ops[wire] == TRUNC]
+        sizes = layer_sizes(circuit, products)
+        # Both batches are requested concurrently, asyncio.sleep(0, []) stands for an empty one.
+        triplets, pairs = await asyncio.gather(
+            self.comm.retrieve_beaver_triplet_shares_batch(
+                [circuit.beaver_label(wire) for wire in products], sizes, field.name
+            ) if products else asyncio.sleep(0, []),
+            self.comm.retrieve_truncation_pairs_batch(
+                [circuit.beaver_label(wire) for wire in truncations],
+                [circuit.args_b[wire] for wire in truncations],
+                field.name
+            ) if truncations else asyncio.sleep(0, [])
+        )
+        triplets = [
+            tuple(field.vector(t) for t in triplet) if size else triplet
+            for triplet, size in zip(triplets, sizes)
+        ]
+        return triplets, pairs
+
+
+async def run_parties(parties: List[AsyncSMCParty]) -> list:
+    """
+    Run parties concurrently in the current event loop and return their results.
+    """
+    return list(await asyncio.gather(*(party.run() for party in parties)))
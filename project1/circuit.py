@@ -0,0 +1,288 @@
+"""
+Flat representation of arithmetic expressions.
+
+An expression graph is lowered to a list of instructions, one per distinct node. Instruction i
+writes wire i, and its operands are the wires stored at index i of `args_a` and `args_b`.
+Instructions are ordered by multiplicative depth, so the party executes them in a single pass
+and stops once per stage to open the Beaver multiplications of that stage together.
+
+A wire holds either a single value or, for secret vectors, a NumPy array of values. The same
+instructions apply element-wise to vectors, scalars being broadcast.
+
+Truncations of secret values also open a masked value: they are executed with the
+multiplications of their stage.
+"""
+
+import copy
+import hashlib
+from array import array
+from typing import Dict, List, Optional, Tuple, Union
+
+from expression import (
+    Expression,
+    InnerProduct,
+    Operation,
+    Scalar,
+    Secret,
+    SecretVector,
+    Truncation,
+    postorder
+)
+
+
+# Opcodes. A "public" wire only depends on scalars, so every party knows its value.
+INPUT = 0         # args_a: index in Circuit.inputs
+CONST = 1         # args_a: index in Circuit.constants
+ADD = 2           # two secret or two public wires
+SUB = 3           # two secret or two public wires
+ADD_PUBLIC = 4    # secret wire a + public wire b
+SUB_PUBLIC = 5    # secret wire a - public wire b
+PUBLIC_SUB = 6    # public wire a - secret wire b
+MUL = 7           # at least one public wire, computed locally
+BEAVER = 8        # two secret wires, needs a Beaver triplet and an opening
+DOT = 9           # dot product of two secret vectors, needs a vector triplet and an opening
+INNER = 10        # args_a: index in Circuit.inner_products, opened like a dot product
+TRUNC = 11        # secret wire a divided by 2^b, needs a truncation pair and an opening
+TRUNC_PUBLIC = 12 # public wire a divided by 2^b, computed locally
+
+# Multiplications, and instructions opened together in the layers of the circuit.
+MULTIPLICATIONS = (BEAVER, DOT, INNER)
+OPENINGS = MULTIPLICATIONS + (TRUNC,)
+
+
+class Circuit:
+    """
+    Array-backed instruction list of one or several expressions.
+
+    Attributes:
+        id: Identifier of the circuit, used to derive the labels of its messages
+        ops, args_a, args_b: Opcode and operand wires of each instruction
+        secret: Whether each wire depends on a secret
+        sizes: Number of elements of each vector wire, 0 for single values
+        constants: Values of the CONST instructions
+        inner_products: Wires of the secret products summed by each INNER instruction
+        inputs: IDs of the secrets read by the INPUT instructions
+        owners: Owner of each input, if known when compiling
+        stages: (start, beaver_end, end) instruction ranges of each multiplicative depth. The
+            multiplications and truncations of a stage come first and only read wires of
+            earlier stages.
+        outputs: Wires holding the value of each compiled expression
+        reused_nodes: Number of references to a node that was already lowered
+    """
+
+    def __init__(self, id: str):
+        self.id = id
+        self.ops = array('B')
+        self.args_a = array('q')
+        self.args_b = array('q')
+        self.secret = array('B')
+        self.sizes = array('q')
+        self.constants: List[int] = []
+        self.inner_products: List[Tuple[array, array]] = []
+        self.inputs: List[bytes] = []
+        self.owners: List[Optional[str]] = []
+        self.stages: List[Tuple[int, int, int]] = []
+        self.outputs: List[int] = []
+        self.reused_nodes = 0
+
+    def __len__(self):
+        return len(self.ops)
+
+    @property
+    def layers(self) -> List[range]:
+        """Wires of the multiplications and truncations opened together, by depth."""
+        return [range(start, beaver_end) for start, beaver_end, _ in self.stages[1:]]
+
+    @property
+    def depth(self) -> int:
+        return len(self.stages) - 1
+
+    def num_multiplications(self) -> int:
+        """Number of Beaver products, counting each secret product of an inner product."""
+        return sum(
+            len(self.inner_products[self.args_a[wire]][0]) if self.ops[wire] == INNER else 1
+            for layer in self.layers for wire in layer if self.ops[wire] in MULTIPLICATIONS
+        )
+
+    def resized(self, size: int, id: str) -> "Circuit":
+        """
+        Copy of the circuit under another ID, with vectors of another size. The vectors of the
+        circuit must all have the same size.
+        """
+        circuit = copy.copy(self)
+        circuit.id = id
+        circuit.sizes = array('q', [size if s else 0 for s in self.sizes])
+        return circuit
+
+    def beaver_label(self, wire: int) -> str:
+        """Label of the Beaver triplet of a multiplication."""
+        return f"{self.id}_{wire}"
+
+    def layer_label(self, depth: int) -> str:
+        """Label of the masked values opened for a multiplication layer."""
+        return f"beaver:{self.id}_{depth}"
+
+    def output_label(self) -> str:
+        """Label of the outputs revealed at the end of the circuit."""
+        return f"done:{self.id}"
+
+
+def circuit_id(outputs: List[Expression]) -> str:
+    """
+    ID of a circuit from the IDs of its outputs. Unlike hash(), it is the same in every party,
+    whatever the hash seed of its interpreter.
+    """
+    return hashlib.sha256(b",".join(output.id for output in outputs)).hexdigest()
+
+
+def compile_circuit(
+        outputs: Union[Expression, List[Expression]],
+        owners: Optional[Dict[Secret, str]] = None,
+        id: Optional[str] = None
+    ) -> Circuit:
+    """
+    Lower one or several expressions to a circuit sharing their common nodes.
+
+    Args:
+        outputs: Expression(s) to compile
+        owners: Optional mapping from the secrets to the ID of the client that holds them
+        id: Identifier of the circuit, derived from the IDs of the outputs by default
+    """
+    if isinstance(outputs, Expression):
+        outputs = [outputs]
+    owner_ids = {secret.id: owner for secret, owner in (owners or {}).items()}
+
+    # Lower the distinct nodes in topological order first.
+    index = {}  # expression id -> instruction
+    nodes = []
+    code = []  # (op, a, b, size, secret, depth)
+    inner = []  # secret products of the INNER instructions
+    references = len(outputs)
+    for output in outputs:
+        for node in postorder(output):
+            if node.id in index:
+                continue
+            if isinstance(node, InnerProduct):
+                references += 2 * len(node.xs)
+                # The secret products are opened together, the others are computed locally,
+                # then the terms are added up.
+                products = []
+                terms = []
+                for x, y in zip(node.xs, node.ys):
+                    a, b = index[x.id], index[y.id]
+                    a_secret, a_depth = code[a][4:]
+                    b_secret, b_depth = code[b][4:]
+                    if a_secret and b_secret:
+                        products.append((a, b))
+                    else:
+                        code.append((MUL, a, b, 0, a_secret or b_secret, max(a_depth, b_depth)))
+                        nodes.append(None)
+                        terms.append(len(code) - 1)
+                if products:
+                    depth = max(max(code[a][5], code[b][5]) for a, b in products) + 1
+                    inner.append(products)
+                    code.append((INNER, len(inner) - 1, 0, 0, True, depth))
+                    nodes.append(None)
+                    terms.append(len(code) - 1)
+                result = terms[0]
+                for term in terms[1:]:
+                    r_secret, r_depth = code[result][4:]
+                    t_secret, t_depth = code[term][4:]
+                    if r_secret == t_secret:
+                        code.append((ADD, result, term, 0, r_secret, max(r_depth, t_depth)))
+                    else:
+                        a, b = (result, term) if r_secret else (term, result)
+                        code.append((ADD_PUBLIC, a, b, 0, True, max(r_depth, t_depth)))
+                    nodes.append(None)
+                    result = len(code) - 1
+                index[node.id] = result
+                continue
+            if isinstance(node, Truncation):
+                references += 1
+                a = index[node.expr.id]
+                a_secret, a_depth = code[a][4:]
+                if a_secret:
+                    code.append((TRUNC, a, node.bits, 0, True, a_depth + 1))
+                else:
+                    code.append((TRUNC_PUBLIC, a, node.bits, 0, False, a_depth))
+            elif isinstance(node, Operation):
+                references += 2
+                a, b = index[node.a.id], index[node.b.id]
+                a_size, a_secret, a_depth = code[a][3:]
+                b_size, b_secret, b_depth = code[b][3:]
+                depth = max(a_depth, b_depth)
+                if (a_size and not b_size and b_secret) or (b_size and not a_size and a_secret):
+                    raise ValueError("Secret vectors can only be combined with vectors and scalars")
+                if node.is_dot_product():
+                    op = DOT
+                    depth += 1
+                elif node.is_multiplication():
+                    if a_secret and b_secret:
+                        op = BEAVER
+                        depth += 1
+                    else:
+                        op = MUL
+                elif a_secret == b_secret:
+                    op = ADD if node.is_addition() else SUB
+                elif node.is_addition():
+                    op = ADD_PUBLIC
+                    if b_secret:
+                        a, b = b, a
+                else:
+                    op = SUB_PUBLIC if a_secret else PUBLIC_SUB
+                code.append((op, a, b, node.size or 0, a_secret or b_secret, depth))
+            elif isinstance(node, (Secret, SecretVector)):
+                code.append((INPUT, 0, 0, node.size or 0, True, 0))
+            elif isinstance(node, Scalar):
+                code.append((CONST, 0, 0, 0, False, 0))
+            else:
+                raise TypeError(f"Cannot compile {node!r}")
+            index[node.id] = len(nodes)
+            nodes.append(node)
+
+    # Then order the instructions by stage, with the Beaver multiplications first.
+    order = sorted(
+        range(len(code)),
+        key=lambda i: (code[i][5], code[i][0] not in OPENINGS, i)
+    )
+    wire = [0] * len(code)
+    for new, old in enumerate(order):
+        wire[old] = new
+
+    if id is None:
+        id = circuit_id(outputs)
+    circuit = Circuit(id)
+    for new, old in enumerate(order):
+        op, a, b, size, secret, depth = code[old]
+        if op == INPUT:
+            a = len(circuit.inputs)
+            circuit.inputs.append(nodes[old].id)
+            circuit.owners.append(owner_ids.get(nodes[old].id))
+        elif op == CONST:
+            a = len(circuit.constants)
+            circuit.constants.append(nodes[old].value)
+        elif op == INNER:
+            xs, ys = zip(*inner[a])
+            a = len(circuit.inner_products)
+            circuit.inner_products.append(
+                (array('q', [wire[x] for x in xs]), array('q', [wire[y] for y in ys]))
+            )
+        elif op in (TRUNC, TRUNC_PUBLIC):
+            a = wire[a]
+        else:
+            a, b = wire[a], wire[b]
+        circuit.ops.append(op)
+        circuit.args_a.append(a)
+        circuit.args_b.append(b)
+        circuit.secret.append(secret)
+        circuit.sizes.append(size)
+        if len(circuit.stages) == depth:
+            circuit.stages.append((new, new, new))
+        start, beaver_end, _ = circuit.stages[depth]
+        if op in OPENINGS:
+            beaver_end = new + 1
+        circuit.stages[depth] = (start, beaver_end, new + 1)
+    circuit.outputs = [wire[index[output.id]] for output in outputs]
+    # Every reference beyond the first one of a node reuses its wire.
+    circuit.reused_nodes = references - len(index)
+    return circuit
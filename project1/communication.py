@@ -3,11 +3,55 @@ Utilities for client communication with the trusted server.
 You should not need to change this file.
 """
 
+import base64
 import json
+import struct
+import threading
 import time
-from typing import Union, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+
+
+# Header of a frame: the sizes of its JSON key and of its data.
+_FRAME = struct.Struct("!II")
+
+
+def pack_frames(frames: List[Tuple[list, bytes]]) -> bytes:
+    """
+    Body holding several messages, each with a key given as a JSON list.
+    """
+    body = bytearray()
+    for key, data in frames:
+        key = json.dumps(key).encode()
+        body += _FRAME.pack(len(key), len(data))
+        body += key
+        body += data
+    return bytes(body)
+
+
+def unpack_frames(body: bytes) -> List[Tuple[list, bytes]]:
+    """
+    Keys and messages of a body made by pack_frames.
+    """
+    frames = []
+    offset = 0
+    while offset < len(body):
+        key_size, data_size = _FRAME.unpack_from(body, offset)
+        offset += _FRAME.size
+        key = json.loads(body[offset:offset + key_size])
+        offset += key_size
+        frames.append((key, body[offset:offset + data_size]))
+        offset += data_size
+    return frames
+
+
+def encode_values(values: list) -> bytes:
+    """
+    JSON body of a list of integers and vectors.
+    """
+    return json.dumps(values, default=lambda vector: vector.tolist()).encode()
 
 
 class Communication:
@@ -20,6 +64,19 @@ class Communication:
         client_id: Identifier of this client
         poll_delay: delay between requests in seconds (default: 0.2 s)
         protocol: network protocol to use (default: "http")
+        long_poll: whether the server holds the retrieve requests until the message is sent,
+            instead of the client polling it (default: True)
+        wait_timeout: longest time in seconds the server holds a request (default: 30 s)
+        pool_size: number of connections to the server kept open, for the requests sent
+            concurrently by several threads (default: 10)
+        timeout: time in seconds after which a request that got no answer fails, on top of
+            the time the server holds it (default: 60 s). Requests never time out with None.
+        participants: Clients of the protocol, whose shares the openings wait for and among
+            which the trusted parameters are split, apart from the other protocols on the
+            server. By default, they are every client of the server.
+        session: HTTP session whose connections are reused by the requests
+        bytes_sent: Total size of the bodies of the requests sent
+        bytes_received: Total size of the bodies of the responses received
     """
 
     def __init__(
@@ -28,11 +85,103 @@ class Communication:
             server_port: int,
             client_id: str,
             poll_delay: float = 0.2,
-            protocol: str = "http"
+            protocol: str = "http",
+            long_poll: bool = True,
+            wait_timeout: float = 30.0,
+            pool_size: int = 10,
+            timeout: Optional[float] = 60.0,
+            participants: Optional[List[str]] = None
     ):
         self.base_url = f"{protocol}://{server_host}:{server_port}"
         self.client_id = client_id
         self.poll_delay = poll_delay
+        self.long_poll = long_poll
+        self.wait_timeout = wait_timeout
+        self.timeout = timeout
+        self.participants = participants
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount(f"{protocol}://", adapter)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._count_lock = threading.Lock()
+
+
+    def close(self) -> None:
+        """
+        Close the connections to the server.
+        """
+
+        self.session.close()
+
+
+    def _request(self, method: str, url: str, wait: bool = False, **kwargs) -> requests.Response:
+        """
+        Send a request on a connection of the session and account for the bytes it exchanged.
+        A request that the server holds for a message waits wait_timeout longer.
+        """
+
+        timeout = self.timeout
+        if timeout is not None and wait:
+            timeout += self.wait_timeout
+        return self._count(self.session.request(method, url, timeout=timeout, **kwargs))
+
+
+    def _count(self, res: requests.Response) -> requests.Response:
+        """
+        Account for the bytes exchanged by a request.
+        """
+
+        with self._count_lock:
+            self.bytes_sent += len(res.request.body or b"")
+            self.bytes_received += len(res.content)
+        return res
+
+
+    def _url(self, path: str, query: str = "") -> str:
+        """
+        URL of a retrieve route, its waiting version with long polling, with an optional query
+        string.
+        """
+
+        if self.long_poll:
+            path = f"/wait{path}"
+            query = "&".join(filter(None, [f"timeout={self.wait_timeout}", query]))
+        return f"{self.base_url}{path}?{query}" if query else f"{self.base_url}{path}"
+
+
+    def _scope(self) -> str:
+        """
+        Query string of the participants of the protocol, if any.
+        """
+
+        return f"participants={','.join(self.participants)}" if self.participants else ""
+
+
+    def _scoped(self, url: str) -> str:
+        """
+        URL of a request for the openings or trusted parameters of the participants, if any.
+        """
+
+        scope = self._scope()
+        if not scope:
+            return url
+        return f"{url}&{scope}" if "?" in url else f"{url}?{scope}"
+
+
+    def _retrieve(self, path: str, query: str = "") -> bytes:
+        """
+        Get a message, repeating the request until it is ready.
+        """
+
+        url = self._url(path, query)
+        # Without long polling, the requests are answered at once and we wait between them.
+        while True:
+            res = self._request("GET", url, self.long_poll)
+            if res.status_code == 200:
+                return res.content
+            if not self.long_poll:
+                time.sleep(self.poll_delay)
 
 
     def send_private_message(
@@ -46,7 +195,7 @@ class Communication:
         """
 
         url = f"{self.base_url}/private/{self.client_id}/{receiver_id}/{label}"
-        requests.post(url, message)
+        self._request("POST", url, data=message).raise_for_status()
 
 
     def retrieve_private_message(
@@ -57,14 +206,28 @@ class Communication:
         Retrieve a private message from the server.
         """
 
-        url = f"{self.base_url}/private/{self.client_id}/{label}"
-        # We can either use a websocket, or do some polling, but websockets would require asyncio.
-        # So we are doing polling to avoid introducing a new programming paradigm.
+        return self._retrieve(f"/private/{self.client_id}/{label}")
+
+
+    def retrieve_private_messages(
+            self,
+            labels: List[str]
+        ) -> Dict[str, bytes]:
+        """
+        Retrieve several private messages from the server, polling until all of them arrived.
+        """
+
+        url = self._url(f"/private/{self.client_id}")
+        messages = {}
         while True:
-            res = requests.get(url)
-            if res.status_code == 200:
-                return res.content
-            time.sleep(self.poll_delay)
+            missing = [label for label in labels if label not in messages]
+            if not missing:
+                return messages
+            res = self._request("POST", url, self.long_poll, json=missing)
+            for label, message in json.loads(res.text).items():
+                messages[label] = base64.b64decode(message)
+            if len(messages) < len(labels) and not self.long_poll:
+                time.sleep(self.poll_delay)
 
 
     def publish_message(
@@ -78,7 +241,23 @@ class Communication:
 
         url = f"{self.base_url}/public/{self.client_id}/{label}"
         print(f"POST {url}")
-        requests.post(url, message)
+        self._request("POST", url, data=message).raise_for_status()
+
+
+    def publish_messages(
+            self,
+            messages: Dict[str, Union[bytes, str]]
+        ) -> None:
+        """
+        Publish several messages on the server in a single request, by label.
+        """
+
+        url = f"{self.base_url}/bulk/publish/{self.client_id}"
+        frames = [
+            ([label], message.encode() if isinstance(message, str) else message)
+            for label, message in messages.items()
+        ]
+        self._request("POST", url, data=pack_frames(frames)).raise_for_status()
 
 
     def retrieve_public_message(
@@ -90,27 +269,307 @@ class Communication:
         Retrieve a public message from the server.
         """
 
-        url = f"{self.base_url}/public/{self.client_id}/{sender_id}/{label}"
+        return self._retrieve(f"/public/{self.client_id}/{sender_id}/{label}")
+
 
-        # We can either use a websocket, or do some polling, but websockets would require asyncio.
-        # So we are doing polling to avoid introducing a new programming paradigm.
+    def retrieve_public_messages(
+            self,
+            sender_ids: List[str],
+            label: str
+        ) -> List[bytes]:
+        """
+        Retrieve the public messages of several senders with the same label, in a single
+        request once they are all published.
+        """
+
+        url = f"{self.base_url}/bulk/retrieve/{self.client_id}"
+        if self.long_poll:
+            url += f"?timeout={self.wait_timeout}"
+        messages = {}
         while True:
-            print(f"GET  {url}")
-            res = requests.get(url)
-            if res.status_code == 200:
-                return res.content
-            time.sleep(self.poll_delay)
+            missing = [[sender_id, label] for sender_id in sender_ids if sender_id not in messages]
+            if not missing:
+                return [messages[sender_id] for sender_id in sender_ids]
+            res = self._request("POST", url, self.long_poll, json=missing)
+            for (sender_id, _), message in unpack_frames(res.content):
+                messages[sender_id] = message
+            if len(messages) < len(sender_ids) and not self.long_poll:
+                time.sleep(self.poll_delay)
+
+
+    def publish_opening_share(
+            self,
+            label: str,
+            values: list,
+            field: str = "default"
+        ) -> None:
+        """
+        Publish my shares of values opened to all the clients, integers and vectors, in the
+        field of that name. The server reconstructs the values once every participant sent its
+        shares.
+        """
+
+        url = self._scoped(f"{self.base_url}/opening/{self.client_id}/{label}?field={field}")
+        self._request(
+            "POST", url, data=encode_values(values), headers={"Content-Type": "application/json"}
+        ).raise_for_status()
+
+
+    def retrieve_opening(
+            self,
+            label: str
+        ) -> list:
+        """
+        Retrieve opened values from the server, vectors as lists.
+        """
+
+        return json.loads(self._retrieve(f"/opening/{self.client_id}/{label}", self._scope()))
+
+
+    def join_session(self) -> int:
+        """
+        Join my next session on the server and get its number, which the other clients of the
+        session get too.
+        """
+
+        res = self._request("POST", f"{self.base_url}/session/{self.client_id}")
+        return json.loads(res.text)
 
 
     def retrieve_beaver_triplet_shares(
             self,
-            op_id: str
+            op_id: str,
+            field: Optional[str] = None
         ) -> Tuple[int, int, int]:
         """
-        Retrieve a triplet of shares generated by the trusted server.
+        Retrieve a triplet of shares generated by the trusted server, in the field of that name
+        if one is given.
         """
 
         url = f"{self.base_url}/shares/{self.client_id}/{op_id}"
+        if field is not None:
+            url += f"?field={field}"
+        url = self._scoped(url)
 
-        res = requests.get(url)
+        res = self._request("GET", url)
         return tuple(json.loads(res.text))
+
+
+    def retrieve_beaver_triplet_shares_batch(
+            self,
+            op_ids: List[str],
+            sizes: Optional[List[int]] = None,
+            field: Optional[str] = None
+        ) -> List[Tuple[int, int, int]]:
+        """
+        Retrieve the triplets of shares of several operations in a single request.
+        An operation with a non-zero size gets a triplet of vectors, as lists of that size.
+        The triplets are in the field of that name if one is given.
+        """
+
+        url = self._scoped(f"{self.base_url}/shares/{self.client_id}")
+
+        if sizes is not None:
+            op_ids = [[op_id, size] for op_id, size in zip(op_ids, sizes)]
+        body = op_ids if field is None else {"ops": op_ids, "field": field}
+        res = self._request("POST", url, json=body)
+        return [tuple(triplet) for triplet in json.loads(res.text)]
+
+
+    def retrieve_truncation_pairs_batch(
+            self,
+            op_ids: List[str],
+            bits: List[int],
+            field: str
+        ) -> List[Tuple[int, int]]:
+        """
+        Retrieve the shares of the truncation pairs (r, r >> bits) of several operations in a
+        single request, in the field of that name.
+        """
+
+        url = self._scoped(f"{self.base_url}/truncation/{self.client_id}")
+
+        body = {"ops": [[op_id, b] for op_id, b in zip(op_ids, bits)], "field": field}
+        res = self._request("POST", url, json=body)
+        return [tuple(pair) for pair in json.loads(res.text)]
+
+
+class StreamCommunication(Communication):
+    """
+    Network communications with the server, receiving the messages on a single stream.
+
+    The client subscribes once to the server-sent events of its private messages and of the
+    public messages of the other clients. A thread puts them in a mailbox, from which the
+    retrieves take them, without sending requests.
+
+    Attributes:
+        senders: Clients whose public messages are received, all the others by default
+    """
+
+    def __init__(
+            self,
+            server_host: str,
+            server_port: int,
+            client_id: str,
+            poll_delay: float = 0.2,
+            protocol: str = "http",
+            senders: Optional[List[str]] = None,
+            pool_size: int = 10,
+            timeout: Optional[float] = 60.0,
+            participants: Optional[List[str]] = None
+    ):
+        super().__init__(
+            server_host, server_port, client_id, poll_delay, protocol,
+            pool_size=pool_size, timeout=timeout, participants=participants
+        )
+        self.senders = senders
+        self._mailbox: Dict[tuple, bytes] = {}
+        self._arrived = threading.Condition()
+        self._stream: Optional[requests.Response] = None
+        self._error: Optional[Exception] = None
+        self._reader: Optional[threading.Thread] = None
+        self._closed = False
+
+
+    def subscribe(self) -> None:
+        """
+        Open the stream of messages, unless it is already open.
+        """
+
+        with self._arrived:
+            if self._reader is not None:
+                return
+            url = f"{self.base_url}/stream/{self.client_id}"
+            params = {"senders": ",".join(self.senders)} if self.senders else None
+            self._stream = self.session.get(url, params=params, stream=True, timeout=self.timeout)
+            self._reader = threading.Thread(target=self._read, daemon=True)
+            self._reader.start()
+
+
+    def close(self) -> None:
+        """
+        Close the stream of messages and the other connections. The thread reading the
+        stream stops after the next event or keep-alive from the server, without blocking the
+        caller.
+        """
+
+        self._closed = True
+        super().close()
+
+
+    def _read(self) -> None:
+        """
+        Put the messages of the stream in the mailbox.
+        """
+
+        try:
+            for line in self._lines():
+                if self._closed:
+                    break
+                if not line.startswith(b"data: "):
+                    continue
+                event = json.loads(line[len(b"data: "):])
+                if event["pool"] in ("private", "opening"):
+                    key = (event["pool"], event["label"])
+                else:
+                    key = ("public", event["sender"], event["label"])
+                with self._arrived:
+                    self._mailbox[key] = base64.b64decode(event["data"])
+                    self._arrived.notify_all()
+        except Exception as error:
+            self._error = error
+        self._stream.close()
+        with self._arrived:
+            self._error = self._error or ConnectionError("The stream of messages was closed")
+            self._arrived.notify_all()
+
+
+    def _lines(self):
+        """
+        Lines of the stream, as soon as they are received.
+        """
+
+        # iter_lines would wait for its buffer to be full before giving the first line.
+        buffer = bytearray()
+        while True:
+            chunk = self._stream.raw.read1(1 << 16)
+            if not chunk:
+                return
+            with self._count_lock:
+                self.bytes_received += len(chunk)
+            buffer += chunk
+            *lines, rest = buffer.split(b"\n")
+            buffer = bytearray(rest)
+            yield from lines
+
+
+    def _take(self, keys: List[tuple]) -> List[bytes]:
+        """
+        Take messages from the mailbox, waiting until all of them arrived.
+        """
+
+        self.subscribe()
+        with self._arrived:
+            self._arrived.wait_for(
+                lambda: self._error or all(key in self._mailbox for key in keys)
+            )
+            if not all(key in self._mailbox for key in keys):
+                raise self._error
+            return [self._mailbox.pop(key) for key in keys]
+
+
+    def retrieve_private_message(
+            self,
+            label: str
+        ) -> bytes:
+        """
+        Retrieve a private message from the stream.
+        """
+
+        return self._take([("private", label)])[0]
+
+
+    def retrieve_private_messages(
+            self,
+            labels: List[str]
+        ) -> Dict[str, bytes]:
+        """
+        Retrieve several private messages from the stream, waiting until all of them arrived.
+        """
+
+        return dict(zip(labels, self._take([("private", label) for label in labels])))
+
+
+    def retrieve_public_message(
+            self,
+            sender_id: str,
+            label: str
+        ) -> bytes:
+        """
+        Retrieve a public message from the stream.
+        """
+
+        return self._take([("public", sender_id, label)])[0]
+
+
+    def retrieve_public_messages(
+            self,
+            sender_ids: List[str],
+            label: str
+        ) -> List[bytes]:
+        """
+        Retrieve the public messages of several senders with the same label from the stream.
+        """
+
+        return self._take([("public", sender_id, label) for sender_id in sender_ids])
+
+
+    def retrieve_opening(
+            self,
+            label: str
+        ) -> list:
+        """
+        Retrieve opened values from the stream, vectors as lists.
+        """
+
+        return json.loads(self._take([("opening", label)])[0])
@@ -0,0 +1,22 @@
+"""
+Fixtures shared by the test suites.
+"""
+
+import time
+from multiprocessing import Process
+
+import pytest
+
+from test_integration import smc_server
+
+
+@pytest.fixture(scope="module")
+def server():
+    """Server of Alice, Bob and Charlie on localhost:5000, shared by the tests of a module."""
+    process = Process(target=smc_server, args=(["Alice", "Bob", "Charlie"],))
+    process.start()
+    time.sleep(3)
+    yield "http://localhost:5000"
+    process.terminate()
+    process.join()
+    time.sleep(2)
@@ -15,7 +15,7 @@ from typing import Optional, List
 from enum import Enum
 
 
-ID_BYTES = 4
+ID_BYTES = 8
 
 
 def gen_id() -> bytes:
@@ -29,6 +29,7 @@ class OperationType(Enum):
     ADD = '+'
     MUL = '*'
     SUB = '-'
+    DOT = '@'
 
 
 class Expression:
@@ -36,6 +37,11 @@ class Expression:
     Base class for an arithmetic expression.
     """
 
+    # Number of elements of a vector expression, None for a single value.
+    size: Optional[int] = None
+    # Number of bits of the fractional part of a fixed-point expression, 0 for integers.
+    fraction_bits: int = 0
+
     def __init__(
             self,
             id: Optional[bytes] = None # this should be a unique identifier for the expression (I suppose that multiple expressions can be run paralelly in the network)
@@ -46,17 +52,29 @@ class Expression:
         self.id = id
 
     def __add__(self, other):
+        _check_fraction_bits(self, other)
         return Operation(self, other, OperationType.ADD)
 
     def __mul__(self, other):
-        return Operation(self, other, OperationType.MUL)
+        product = Operation(self, other, OperationType.MUL)
+        if self.fraction_bits and other.fraction_bits:
+            # Keep the precision of the most precise operand.
+            return Truncation(product, min(self.fraction_bits, other.fraction_bits))
+        return product
 
     def __sub__(self, other):
+        _check_fraction_bits(self, other)
         return Operation(self, other, OperationType.SUB)
 
+    def __matmul__(self, other):
+        return Operation(self, other, OperationType.DOT)
+
     def __hash__(self):
         return hash(self.id)
 
+    def get_operands(self) -> List["Expression"]:
+        return []
+
     def is_Scalar(self):
         return False
     def is_Secret(self):
@@ -112,28 +130,68 @@ class Secret(Expression):
     def is_Secret(self):
         return True
 
+class SecretVector(Expression):
+    """
+    Term representing a vector of secret finite field values.
+
+    Operations between vectors are element-wise, scalars are broadcast to every element and
+    `u @ v` is the dot product of two vectors.
+    """
+
+    def __init__(
+            self,
+            size: int,
+            value: Optional[List[int]] = None,
+            id: Optional[bytes] = None
+        ):
+        if size < 1:
+            raise ValueError("A secret vector holds at least one value")
+        self.size = size
+        self.value = value
+        super().__init__(id)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.size})"
+
+    def is_Secret(self):
+        return True
+
+
 class Operation(Expression):
     """Term representing an operation between basic expression (i.e. sum between two secrets). It's a node of a tree"""
     def __init__(self, a: Expression, b: Expression, operand_type):
         self.a = a
         self.b = b
         self.operand_type = operand_type
+        if operand_type == OperationType.DOT:
+            if a.size is None or a.size != b.size:
+                raise ValueError("A dot product needs two vectors of the same size")
+        elif a.size is not None and b.size is not None and a.size != b.size:
+            raise ValueError(f"Vectors of sizes {a.size} and {b.size} do not match")
+        else:
+            self.size = a.size if a.size is not None else b.size
+        if operand_type in (OperationType.MUL, OperationType.DOT):
+            self.fraction_bits = a.fraction_bits + b.fraction_bits
+        else:
+            self.fraction_bits = max(a.fraction_bits, b.fraction_bits)
         super().__init__()
 
-    def __add__(self, other):
-        return Operation(self, other, OperationType.ADD)
-
-    def __mul__(self, other):
-        return Operation(self, other, OperationType.MUL)
-
-    def __sub__(self, other):
-        return Operation(self, other, OperationType.SUB)
-
     def __repr__(self):
-        ans = f"{repr(self.a)} {self.operand_type.value} {repr(self.b)}"
-        if not self.operand_type == OperationType.MUL:
-            ans = f"({ans})"
-        return ans
+        # Built with an explicit stack, deep expressions would exceed the recursion limit.
+        pieces = []
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                pieces.append(item)
+            elif isinstance(item, Operation):
+                if item.operand_type in (OperationType.MUL, OperationType.DOT):
+                    stack.extend([item.b, f" {item.operand_type.value} ", item.a])
+                else:
+                    stack.extend([")", item.b, f" {item.operand_type.value} ", item.a, "("])
+            else:
+                pieces.append(repr(item))
+        return "".join(pieces)
 
     def get_operands(self) -> List[Expression]:
         return [self.a, self.b]
@@ -147,4 +205,134 @@ class Operation(Expression):
     def is_multiplication(self):
         return self.operand_type == OperationType.MUL
 
+    def is_dot_product(self):
+        return self.operand_type == OperationType.DOT
+
+class InnerProduct(Expression):
+    """
+    Term representing the sum of the products of two lists of expressions: sum(x_i * y_i).
+
+    All the secret products are opened in a single round, and summed locally.
+    """
+    def __init__(
+            self,
+            xs: List[Expression],
+            ys: List[Expression],
+            id: Optional[bytes] = None
+        ):
+        if not xs or len(xs) != len(ys):
+            raise ValueError("An inner product needs two non-empty lists of the same length")
+        if any(e.size is not None for e in xs + ys):
+            raise ValueError("Use the dot product `u @ v` for secret vectors")
+        self.xs = list(xs)
+        self.ys = list(ys)
+        self.fraction_bits = max(x.fraction_bits + y.fraction_bits for x, y in zip(xs, ys))
+        super().__init__(id)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.xs!r}, {self.ys!r})"
+
+    def get_operands(self) -> List[Expression]:
+        return self.xs + self.ys
+
+
+class FixedSecret(Secret):
+    """
+    Term representing a secret fixed-point value, shared as the integer value * 2^fraction_bits.
+
+    The product of two fixed-point expressions is truncated back to the precision of the most
+    precise of them. The truncation is probabilistic: the result may be rounded up or down.
+    """
+
+    def __init__(
+            self,
+            fraction_bits: int = 12,
+            value: Optional[float] = None,
+            id: Optional[bytes] = None
+        ):
+        if fraction_bits < 1:
+            raise ValueError("A fixed-point value has at least one fractional bit")
+        self.fraction_bits = fraction_bits
+        super().__init__(value, id)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.fraction_bits})"
+
+
+class FixedScalar(Scalar):
+    """Term representing a public fixed-point value, encoded as round(value * 2^fraction_bits)."""
+
+    def __init__(
+            self,
+            value: float,
+            fraction_bits: int = 12,
+            id: Optional[bytes] = None
+        ):
+        if fraction_bits < 1:
+            raise ValueError("A fixed-point value has at least one fractional bit")
+        self.fraction_bits = fraction_bits
+        self.real = value
+        super().__init__(round(value * 2 ** fraction_bits), id)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.real!r})"
+
+
+class Truncation(Expression):
+    """
+    Term representing a value divided by 2^bits and rounded, up or down, to an integer.
+    Used to bring the product of fixed-point values back to their precision.
+    """
+    def __init__(
+            self,
+            expr: Expression,
+            bits: int,
+            id: Optional[bytes] = None
+        ):
+        if expr.size is not None:
+            raise ValueError("Secret vectors cannot be truncated")
+        if not 0 < bits <= expr.fraction_bits:
+            raise ValueError(f"Cannot truncate {bits} bits of a value with {expr.fraction_bits}")
+        self.expr = expr
+        self.bits = bits
+        self.fraction_bits = expr.fraction_bits - bits
+        super().__init__(id)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.expr!r}, {self.bits})"
+
+    def get_operands(self) -> List[Expression]:
+        return [self.expr]
+
+
+def _check_fraction_bits(a: Expression, b: Expression) -> None:
+    if a.fraction_bits != b.fraction_bits:
+        raise ValueError(
+            f"Cannot add values with {a.fraction_bits} and {b.fraction_bits} fractional bits, "
+            "use a FixedScalar for public fixed-point values"
+        )
+
 # Feel free to add as many classes as you like.
+
+
+def postorder(expr: Expression) -> List[Expression]:
+    """
+    List the distinct nodes of an expression, each one after its operands.
+
+    The traversal uses an explicit stack, so it works on expressions of any depth.
+    """
+    nodes = []
+    visited = set()
+    stack = [(expr, False)]
+    while stack:
+        e, expanded = stack.pop()
+        if e.id in visited:
+            continue
+        operands = e.get_operands()
+        if expanded or not operands:
+            visited.add(e.id)
+            nodes.append(e)
+        else:
+            stack.append((e, True))
+            stack.extend((operand, False) for operand in reversed(operands))
+    return nodes
@@ -0,0 +1,176 @@
+"""
+Prime fields in which the values are secret shared.
+
+A field reduces single values, held as Python ints, and provides the NumPy kernels used on
+vectors. The parties and the trusted server must use the same field, which is chosen by name
+in the ProtocolSpec.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+
+# Bits of statistical security of the masks opened by the probabilistic truncation.
+STATISTICAL_SECURITY = 20
+
+
+class Field:
+    """
+    Integers modulo a prime small enough that the product of two elements fits in an int64.
+
+    Attributes:
+        name: Name of the field, as given in a ProtocolSpec
+        modulus: Prime order of the field
+        dtype: NumPy type of the elements of vectors
+    """
+
+    dtype = np.int64
+
+    def __init__(self, name: str, modulus: int):
+        if modulus >= 2 ** 31:
+            raise ValueError("Products of elements of the field must fit in 63 bits")
+        self.name = name
+        self.modulus = modulus
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name}, {self.modulus})"
+
+    @property
+    def value_bits(self) -> int:
+        """
+        Bits of the signed values that can be truncated: masked by STATISTICAL_SECURITY more
+        bits, they must stay below the modulus.
+        """
+        return self.modulus.bit_length() - 2 - STATISTICAL_SECURITY
+
+    def reduce(self, value: int) -> int:
+        """Representative in [0, modulus) of an integer."""
+        return value % self.modulus
+
+    def signed(self, value: int) -> int:
+        """Representative in (-modulus / 2, modulus / 2) of an element."""
+        value = self.reduce(value)
+        return value - self.modulus if value > self.modulus // 2 else value
+
+    def random(self, rng: Optional[np.random.Generator] = None) -> int:
+        """Uniformly random element."""
+        rng = rng or np.random.default_rng()
+        return int(rng.integers(0, self.modulus, dtype=np.int64))
+
+    def random_vector(self, size: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Vector of uniformly random elements."""
+        rng = rng or np.random.default_rng()
+        return rng.integers(0, self.modulus, size=size, dtype=self.dtype)
+
+    def vector(self, values) -> np.ndarray:
+        """Reduced vector of integers, possibly negative or larger than the modulus."""
+        return (np.asarray(values) % self.modulus).astype(self.dtype)
+
+    # The kernels take reduced vectors, or single reduced values, and return reduced vectors.
+    def add(self, a, b) -> np.ndarray:
+        return (a + b) % self.modulus
+
+    def sub(self, a, b) -> np.ndarray:
+        return (a - b) % self.modulus
+
+    def neg(self, a) -> np.ndarray:
+        return (-a) % self.modulus
+
+    def mul(self, a, b) -> np.ndarray:
+        return (a * b) % self.modulus
+
+    def sum(self, a: np.ndarray) -> int:
+        """Sum of the elements of a reduced vector."""
+        # Each element is below 2^31, up to 2^32 of them can be added in an int64.
+        return int(a.sum()) % self.modulus
+
+
+class MersenneField(Field):
+    """
+    Integers modulo the Mersenne prime 2^61 - 1.
+
+    Since 2^61 = 1 modulo the prime, a value is reduced by adding its bits above the 61st
+    to the lower ones instead of dividing. Vectors are uint64 arrays, and their products,
+    which take 122 bits, are computed from 32-bit halves.
+    """
+
+    dtype = np.uint64
+    BITS = 61
+
+    def __init__(self, name: str = "mersenne61"):
+        self.name = name
+        self.modulus = (1 << self.BITS) - 1
+        self._modulus = np.uint64(self.modulus)
+
+    def reduce(self, value: int) -> int:
+        if value < 0:
+            return value % self.modulus
+        p = self.modulus
+        # Each fold leaves a value below 2^61 + (value >> 61).
+        while value >> self.BITS:
+            value = (value & p) + (value >> self.BITS)
+        return 0 if value == p else value
+
+    def vector(self, values) -> np.ndarray:
+        if isinstance(values, np.ndarray) and values.dtype == self.dtype:
+            return self._fold(values)
+        return super().vector(values)
+
+    def _fold(self, a: np.ndarray) -> np.ndarray:
+        """Reduce a uint64 vector."""
+        p = self._modulus
+        a = (a & p) + (a >> np.uint64(self.BITS))
+        return a - (a >= p) * p
+
+    def add(self, a, b) -> np.ndarray:
+        return self._fold(np.asarray(a, dtype=self.dtype) + np.asarray(b, dtype=self.dtype))
+
+    def sub(self, a, b) -> np.ndarray:
+        return self.add(a, self.neg(b))
+
+    def neg(self, a) -> np.ndarray:
+        a = np.asarray(a, dtype=self.dtype)
+        return np.where(a == 0, a, self._modulus - a)
+
+    def mul(self, a, b) -> np.ndarray:
+        a = np.asarray(a, dtype=self.dtype)
+        b = np.asarray(b, dtype=self.dtype)
+        low = np.uint64(0xFFFFFFFF)
+        shift = np.uint64(32)
+        a_hi, a_lo = a >> shift, a & low
+        b_hi, b_lo = b >> shift, b & low
+        # a * b = hi * 2^64 + mid * 2^32 + lo, where 2^64 = 8 and 2^61 = 1 modulo the prime.
+        lo = a_lo * b_lo
+        mid = a_hi * b_lo + a_lo * b_hi
+        hi = a_hi * b_hi
+        bits = np.uint64(self.BITS)
+        mid_bits = np.uint64(self.BITS - 32)
+        result = (
+            (hi << np.uint64(3))
+            + (mid >> mid_bits)
+            + ((mid & np.uint64((1 << (self.BITS - 32)) - 1)) << shift)
+            + (lo & self._modulus)
+            + (lo >> bits)
+        )
+        return self._fold(result)
+
+    def sum(self, a: np.ndarray) -> int:
+        # The halves of up to 2^32 elements can be added without overflowing.
+        a = np.asarray(a, dtype=self.dtype)
+        low = int((a & np.uint64(0xFFFFFFFF)).sum())
+        high = int((a >> np.uint64(32)).sum())
+        return self.reduce(low + (high << 32))
+
+
+DEFAULT_FIELD = Field("default", 6700417)
+MERSENNE_61 = MersenneField()
+
+FIELDS: Dict[str, Field] = {field.name: field for field in (DEFAULT_FIELD, MERSENNE_61)}
+
+
+def get_field(name: str) -> Field:
+    """Field registered under a name."""
+    if name not in FIELDS:
+        raise ValueError(f"Unknown field {name!r}, expected one of {sorted(FIELDS)}")
+    return FIELDS[name]
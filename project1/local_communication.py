@@ -0,0 +1,379 @@
+"""
+In-process communication between SMC parties.
+
+A LocalServer holds the messages of the parties and a TrustedParamGenerator in memory, and
+LocalCommunication has the API of Communication on top of it: parties running as threads of
+one process exchange their messages without HTTP, and wait for them without polling.
+AsyncLocalCommunication has the API of AsyncCommunication, for parties running as asyncio
+tasks.
+"""
+
+import asyncio
+import collections
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from async_smc_party import AsyncSMCParty, run_parties
+from communication import encode_values
+from field import get_field
+from protocol import ProtocolSpec
+from secret_sharing import ShareVector, reconstruct_values
+from smc_party import SMCParty
+from ttp import TrustedParamGenerator
+
+
+class LocalServer:
+    """
+    In-memory counterpart of the trusted server.
+
+    Attributes:
+        store: Messages of each pool, "private", "public" or "opening", by channel. Private
+            messages are forgotten once their receiver got them.
+        ttp: Generator of the Beaver triplets and truncation pairs
+        timeout: Time in seconds after which waiting for a message raises a TimeoutError, for
+            instance when a party failed. Parties wait forever by default.
+    """
+
+    def __init__(self, participants: List[str], timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.store: Dict[str, Dict[Tuple[str, str], bytes]] = collections.defaultdict(dict)
+        self.ttp = TrustedParamGenerator()
+        # Shares of the values being opened by each client, by label, until all of them arrived.
+        self.openings: Dict[str, Dict[str, list]] = collections.defaultdict(dict)
+        # Clients that retrieved opened values, by label, until all of them did.
+        self.openings_retrieved: Dict[str, set] = collections.defaultdict(set)
+        # Number of sessions each client joined.
+        self.sessions: Dict[str, int] = collections.defaultdict(int)
+        for participant in participants:
+            self.ttp.add_participant(participant)
+        self._ready = threading.Condition()
+        # Futures of the asyncio tasks waiting for a channel, with their event loop.
+        self._waiters = collections.defaultdict(list)
+
+    def set_value(self, pool: str, channel: Tuple[str, str], data: bytes) -> None:
+        """
+        Push data to a channel in a given pool and wake up the parties waiting for it.
+        """
+        with self._ready:
+            self.store[pool][channel] = data
+            self._ready.notify_all()
+            waiters = self._waiters.pop((pool, channel), [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_set_result, future, data)
+
+    def get_value(self, pool: str, channel: Tuple[str, str]) -> bytes:
+        """
+        Get the data of a channel, waiting until it is ready.
+        """
+        with self._ready:
+            if not self._ready.wait_for(lambda: channel in self.store[pool], self.timeout):
+                raise TimeoutError(f"No message on {pool} channel {channel}")
+            return self.store[pool][channel]
+
+    async def get_value_async(self, pool: str, channel: Tuple[str, str]) -> bytes:
+        """
+        Get the data of a channel, awaiting until it is ready.
+        """
+        loop = asyncio.get_running_loop()
+        with self._ready:
+            if channel in self.store[pool]:
+                return self.store[pool][channel]
+            future = loop.create_future()
+            self._waiters[(pool, channel)].append((loop, future))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No message on {pool} channel {channel}") from None
+
+    def forget_value(self, pool: str, channel: Tuple[str, str]) -> None:
+        """
+        Forget the data of a channel, once its receiver got it.
+        """
+        with self._ready:
+            self.store[pool].pop(channel, None)
+
+    def join_session(self, client_id: str) -> int:
+        """
+        Number of the next session of a client.
+        """
+        with self._ready:
+            number = self.sessions[client_id]
+            self.sessions[client_id] += 1
+            return number
+
+    def add_opening_share(self, client_id: str, label: str, shares: list, field: str) -> None:
+        """
+        Add the shares of a client to values being opened, and reconstruct the values once
+        every client sent its shares.
+        """
+        if client_id not in self.ttp.participant_ids:
+            raise ValueError(f"Unknown participant {client_id}")
+        with self._ready:
+            openings = self.openings[label]
+            openings[client_id] = shares
+            if len(openings) < len(self.ttp.participant_ids):
+                return
+            del self.openings[label]
+        values = reconstruct_values(list(openings.values()), get_field(field))
+        self.set_value("opening", ("", label), encode_values(values))
+
+    def opening_retrieved(self, client_id: str, label: str) -> None:
+        """
+        Forget opened values once every client retrieved them.
+        """
+        with self._ready:
+            clients = self.openings_retrieved[label]
+            clients.add(client_id)
+            if clients >= self.ttp.participant_ids:
+                del self.openings_retrieved[label]
+                self.store["opening"].pop(("", label), None)
+
+    def triplets(self, client_id: str, op_ids: List, field: str) -> List[Tuple]:
+        """
+        Shares of the triplets of several operations, given by ID or as [op_id, size] pairs.
+        """
+        triplets = []
+        for op in op_ids:
+            op_id, size = op if isinstance(op, (list, tuple)) else (op, 0)
+            shares = self.ttp.retrieve_share(client_id, op_id, size, get_field(field))
+            triplets.append(tuple(
+                share.values if isinstance(share, ShareVector) else share.value
+                for share in shares
+            ))
+        return triplets
+
+    def truncation_pairs(
+            self,
+            client_id: str,
+            op_ids: List[str],
+            bits: List[int],
+            field: str
+        ) -> List[Tuple[int, int]]:
+        """
+        Shares of the truncation pairs of several operations.
+        """
+        return [
+            tuple(share.value for share in self.ttp.retrieve_truncation_pair(
+                client_id, op_id, b, get_field(field)
+            ))
+            for op_id, b in zip(op_ids, bits)
+        ]
+
+
+def _set_result(future: asyncio.Future, data: bytes) -> None:
+    if not future.done():
+        future.set_result(data)
+
+
+def _encode(message: Union[bytes, str]) -> bytes:
+    return message.encode() if isinstance(message, str) else message
+
+
+class LocalCommunication:
+    """
+    Communications with a LocalServer, with the API of Communication.
+
+    Attributes:
+        server: Server shared by the parties
+        client_id: Identifier of this client
+        bytes_sent: Total size of the messages sent
+        bytes_received: Total size of the messages received
+    """
+
+    def __init__(self, server: LocalServer, client_id: str):
+        self.server = server
+        self.client_id = client_id
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._count_lock = threading.Lock()
+
+    def _sent(self, message: Union[bytes, str]) -> bytes:
+        message = _encode(message)
+        with self._count_lock:
+            self.bytes_sent += len(message)
+        return message
+
+    def _received(self, message: bytes) -> bytes:
+        with self._count_lock:
+            self.bytes_received += len(message)
+        return message
+
+    def send_private_message(
+            self,
+            receiver_id: str,
+            label: str,
+            message: Union[bytes, str]
+        ) -> None:
+        self.server.set_value("private", (receiver_id, label), self._sent(message))
+
+    def retrieve_private_message(self, label: str) -> bytes:
+        message = self.server.get_value("private", (self.client_id, label))
+        self.server.forget_value("private", (self.client_id, label))
+        return self._received(message)
+
+    def retrieve_private_messages(self, labels: List[str]) -> Dict[str, bytes]:
+        return {label: self.retrieve_private_message(label) for label in labels}
+
+    def publish_message(self, label: str, message: Union[bytes, str]) -> None:
+        self.server.set_value("public", (self.client_id, label), self._sent(message))
+
+    def publish_messages(self, messages: Dict[str, Union[bytes, str]]) -> None:
+        for label, message in messages.items():
+            self.publish_message(label, message)
+
+    def retrieve_public_message(self, sender_id: str, label: str) -> bytes:
+        return self._received(self.server.get_value("public", (sender_id, label)))
+
+    def retrieve_public_messages(self, sender_ids: List[str], label: str) -> List[bytes]:
+        return [self.retrieve_public_message(sender_id, label) for sender_id in sender_ids]
+
+    def publish_opening_share(self, label: str, values: list, field: str = "default") -> None:
+        # The shares go through JSON, as with the server.
+        shares = json.loads(self._sent(encode_values(values)))
+        self.server.add_opening_share(self.client_id, label, shares, field)
+
+    def retrieve_opening(self, label: str) -> list:
+        values = self.server.get_value("opening", ("", label))
+        self.server.opening_retrieved(self.client_id, label)
+        return json.loads(self._received(values))
+
+    def join_session(self) -> int:
+        return self.server.join_session(self.client_id)
+
+    def retrieve_beaver_triplet_shares(
+            self,
+            op_id: str,
+            field: Optional[str] = None
+        ) -> Tuple[int, int, int]:
+        return self.server.triplets(self.client_id, [op_id], field or "default")[0]
+
+    def retrieve_beaver_triplet_shares_batch(
+            self,
+            op_ids: List[str],
+            sizes: Optional[List[int]] = None,
+            field: Optional[str] = None
+        ) -> List[Tuple[int, int, int]]:
+        if sizes is not None:
+            op_ids = list(zip(op_ids, sizes))
+        return self.server.triplets(self.client_id, op_ids, field or "default")
+
+    def retrieve_truncation_pairs_batch(
+            self,
+            op_ids: List[str],
+            bits: List[int],
+            field: str
+        ) -> List[Tuple[int, int]]:
+        return self.server.truncation_pairs(self.client_id, op_ids, bits, field)
+
+
+class AsyncLocalCommunication(LocalCommunication):
+    """
+    Communications with a LocalServer, with the API of AsyncCommunication.
+    """
+
+    async def close(self) -> None:
+        pass
+
+    async def send_private_message(self, receiver_id, label, message) -> None:
+        super().send_private_message(receiver_id, label, message)
+
+    async def retrieve_private_message(self, label: str) -> bytes:
+        message = await self.server.get_value_async("private", (self.client_id, label))
+        self.server.forget_value("private", (self.client_id, label))
+        return self._received(message)
+
+    async def retrieve_private_messages(self, labels: List[str]) -> Dict[str, bytes]:
+        messages = await asyncio.gather(*(self.retrieve_private_message(label) for label in labels))
+        return dict(zip(labels, messages))
+
+    async def publish_message(self, label, message) -> None:
+        super().publish_message(label, message)
+
+    async def publish_messages(self, messages) -> None:
+        super().publish_messages(messages)
+
+    async def retrieve_public_message(self, sender_id: str, label: str) -> bytes:
+        return self._received(await self.server.get_value_async("public", (sender_id, label)))
+
+    async def retrieve_public_messages(self, sender_ids: List[str], label: str) -> List[bytes]:
+        return list(await asyncio.gather(*(
+            self.retrieve_public_message(sender_id, label) for sender_id in sender_ids
+        )))
+
+    async def publish_opening_share(self, label, values, field="default") -> None:
+        super().publish_opening_share(label, values, field)
+
+    async def retrieve_opening(self, label: str) -> list:
+        values = await self.server.get_value_async("opening", ("", label))
+        self.server.opening_retrieved(self.client_id, label)
+        return json.loads(self._received(values))
+
+    async def retrieve_beaver_triplet_shares(self, op_id, field=None):
+        return super().retrieve_beaver_triplet_shares(op_id, field)
+
+    async def retrieve_beaver_triplet_shares_batch(self, op_ids, sizes=None, field=None):
+        return super().retrieve_beaver_triplet_shares_batch(op_ids, sizes, field)
+
+    async def retrieve_truncation_pairs_batch(self, op_ids, bits, field):
+        return super().retrieve_truncation_pairs_batch(op_ids, bits, field)
+
+
+def run_local_parties(
+        protocol_spec: ProtocolSpec,
+        value_dicts: Dict[str, dict],
+        threads: int = 0,
+        timeout: Optional[float] = None,
+        transport: Callable[[LocalServer, str], object] = LocalCommunication
+    ) -> Dict[str, object]:
+    """
+    Run every party of a protocol as a thread of this process, with a LocalServer, and return
+    the result of each party. The parties use thread pools of `threads` threads, none by
+    default, and the transport made for them from the server and their ID. The first error of
+    a party is raised once all the parties stopped.
+    """
+    server = LocalServer(protocol_spec.participant_ids, timeout)
+    results = {}
+    errors = []
+
+    def run_party(client_id):
+        party = SMCParty(
+            client_id, None, None, protocol_spec, value_dicts.get(client_id, {}),
+            threads=threads, comm=transport(server, client_id)
+        )
+        try:
+            results[client_id] = party.run()
+        except Exception as error:
+            errors.append(error)
+
+    workers = [
+        threading.Thread(target=run_party, args=(client_id,))
+        for client_id in protocol_spec.participant_ids
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+async def run_local_parties_async(
+        protocol_spec: ProtocolSpec,
+        value_dicts: Dict[str, dict],
+        timeout: Optional[float] = None
+    ) -> Dict[str, object]:
+    """
+    Run every party of a protocol as an asyncio task, with a LocalServer, and return the
+    result of each party.
+    """
+    server = LocalServer(protocol_spec.participant_ids, timeout)
+    parties = [
+        AsyncSMCParty(
+            client_id, None, None, protocol_spec, value_dicts.get(client_id, {}),
+            comm=AsyncLocalCommunication(server, client_id)
+        )
+        for client_id in protocol_spec.participant_ids
+    ]
+    return dict(zip(protocol_spec.participant_ids, await run_parties(parties)))
@@ -0,0 +1,359 @@
+"""
+Emulation of the network between the parties and the server.
+
+EmulatedCommunication wraps a Communication, or any transport with its API, and keeps a
+virtual clock of the party: every request advances it by the time it would take on the links
+of a topology, with their latency, jitter, bandwidth and message loss. The messages carry the
+virtual time at which they reached the server, so that a party waiting for a message resumes
+when the message would have arrived. The clock at the end of SMCParty.run is the simulated
+duration of the run, on top of the actual computation time of the party.
+
+All the traffic goes through the server, so the topology gives the link between each party
+and the server. The requests of a party are assumed to be sent one after the other.
+
+Topology files are JSON objects:
+    {
+        "seed": 1,
+        "retransmission_timeout": 0.2,
+        "default": {"latency": 0.001},
+        "parties": {"Alice": {"latency": 0.08, "jitter": 0.01, "bandwidth": 1e6, "loss": 0.01}}
+    }
+where latencies and jitters are one-way, in seconds, bandwidths in bytes per second and losses
+are probabilities. Lost messages are sent again after the retransmission timeout.
+
+Usage:
+    python3 network_emulator.py <module>:<attribute> <topology.json> [--poll-delay S]
+
+where the attribute is a (ProtocolSpec, value_dicts) pair, or a function returning one, with
+the value_dict given to SMCParty for each party.
+"""
+
+import argparse
+import json
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from communication import encode_values
+from local_communication import LocalCommunication, LocalServer, run_local_parties
+from planner import load_target
+from protocol import ProtocolSpec
+
+
+class Link:
+    """
+    Link between a party and the server.
+
+    Attributes:
+        latency: One-way latency in seconds
+        jitter: Largest random delay added to the latency in seconds
+        bandwidth: Bandwidth in bytes per second, unlimited by default
+        loss: Probability that a message is lost
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            bandwidth: Optional[float] = None,
+            loss: float = 0.0
+        ):
+        if not 0 <= loss < 1:
+            raise ValueError("The loss must be a probability below 1")
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.loss = loss
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(latency={self.latency}, jitter={self.jitter}, "
+            f"bandwidth={self.bandwidth}, loss={self.loss})"
+        )
+
+
+class Topology:
+    """
+    Links between the parties and the server.
+
+    Attributes:
+        default: Link of the parties that have none of their own
+        links: Link of each party
+        retransmission_timeout: Delay before a lost message is sent again in seconds
+        seed: Seed of the random jitters and losses, drawn independently for each party
+    """
+
+    def __init__(
+            self,
+            default: Optional[Link] = None,
+            links: Optional[Dict[str, Link]] = None,
+            retransmission_timeout: float = 0.2,
+            seed: Optional[int] = None
+        ):
+        self.default = default or Link()
+        self.links = links or {}
+        self.retransmission_timeout = retransmission_timeout
+        self.seed = seed
+
+    def link(self, client_id: str) -> Link:
+        return self.links.get(client_id, self.default)
+
+    @classmethod
+    def from_dict(cls, topology: dict) -> "Topology":
+        return cls(
+            Link(**topology.get("default", {})),
+            {client_id: Link(**link) for client_id, link in topology.get("parties", {}).items()},
+            topology.get("retransmission_timeout", 0.2),
+            topology.get("seed")
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Topology":
+        """Read a topology file."""
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+
+# Messages are prefixed with the virtual time at which they reached the server.
+_STAMP = struct.Struct("!d")
+
+
+class EmulatedCommunication:
+    """
+    Transport delaying the requests of another one on a virtual clock.
+
+    The server sums the shares of the opened values, which loses the time at which each of
+    them arrived: the clients also publish these times, which add a few bytes to the traffic
+    of the wrapped transport.
+
+    Attributes:
+        comm: Wrapped transport, with the API of Communication
+        client_id: Identifier of this client
+        participants: Identifiers of all the clients, whose shares the openings wait for
+        link: Link of the client to the server
+        poll_delay: Delay between the polls of a message in seconds, like Communication
+            without long polling. By default, the server answers as soon as the message
+            arrives, like with long polling.
+        compute_time: Whether the computation time of the client between its requests is
+            added to the clock
+        clock: Virtual time of the client in seconds, from the start of the run
+    """
+
+    def __init__(
+            self,
+            comm,
+            topology: Topology,
+            participants: List[str],
+            poll_delay: Optional[float] = None,
+            compute_time: bool = True
+        ):
+        self.comm = comm
+        self.client_id = comm.client_id
+        self.participants = participants
+        self.link = topology.link(self.client_id)
+        self.retransmission_timeout = topology.retransmission_timeout
+        self.poll_delay = poll_delay
+        self.clock = 0.0
+        seed = None
+        if topology.seed is not None:
+            seed = topology.seed ^ zlib.crc32(self.client_id.encode())
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # The computation of the party between its requests also takes time.
+        self._compute_time = compute_time
+        self._cpu = time.thread_time()
+
+    @property
+    def bytes_sent(self) -> int:
+        return self.comm.bytes_sent
+
+    @property
+    def bytes_received(self) -> int:
+        return self.comm.bytes_received
+
+    def _transmit(self, size: int) -> float:
+        """Duration of the transmission of a message of size bytes over the link."""
+        link = self.link
+        duration = link.latency + self._rng.uniform(0, link.jitter)
+        if link.bandwidth:
+            duration += size / link.bandwidth
+        while self._rng.random() < link.loss:
+            duration += self.retransmission_timeout
+        return duration
+
+    def _start(self) -> float:
+        """Virtual time at which a request is sent."""
+        cpu = time.thread_time()
+        if self._compute_time:
+            self.clock += cpu - self._cpu
+        self._cpu = cpu
+        return self.clock
+
+    def _end(self, clock: float) -> None:
+        self.clock = clock
+        self._cpu = time.thread_time()
+
+    def _request(self, sent: int, received: int) -> None:
+        """Advance the clock by a request to the server, answered immediately."""
+        with self._lock:
+            clock = self._start() + self._transmit(sent)
+            self._end(clock + self._transmit(received))
+
+    def _send(self, messages: List[bytes]) -> List[bytes]:
+        """
+        Advance the clock by the sending of messages in a request, and stamp them with their
+        arrival.
+        """
+        messages = [m.encode() if isinstance(m, str) else m for m in messages]
+        with self._lock:
+            arrival = self._start() + self._transmit(sum(len(m) for m in messages))
+            self._end(arrival + self._transmit(0))
+        return [_STAMP.pack(arrival) + message for message in messages]
+
+    def _wait(self, stamped: List[bytes]) -> List[bytes]:
+        """
+        Advance the clock by the retrieval of messages stamped with their arrival, polling
+        until the last one arrived.
+        """
+        arrival = max(_STAMP.unpack_from(message)[0] for message in stamped)
+        messages = [message[_STAMP.size:] for message in stamped]
+        self._wait_until(arrival, sum(len(message) for message in messages))
+        return messages
+
+    def _wait_until(self, arrival: float, size: int) -> None:
+        """
+        Advance the clock by the retrieval of size bytes that reached the server at a virtual
+        time, polling until then.
+        """
+        with self._lock:
+            request = self._start() + self._transmit(0)
+            if self.poll_delay is not None:
+                # Each unanswered poll returns, then the client waits before polling again.
+                while request < arrival:
+                    request += self._transmit(0) + self.poll_delay + self._transmit(0)
+            self._end(max(request, arrival) + self._transmit(size))
+
+    def send_private_message(self, receiver_id: str, label: str, message) -> None:
+        self.comm.send_private_message(receiver_id, label, self._send([message])[0])
+
+    def retrieve_private_message(self, label: str) -> bytes:
+        return self._wait([self.comm.retrieve_private_message(label)])[0]
+
+    def retrieve_private_messages(self, labels: List[str]) -> Dict[str, bytes]:
+        stamped = self.comm.retrieve_private_messages(labels)
+        return dict(zip(labels, self._wait([stamped[label] for label in labels])))
+
+    def publish_message(self, label: str, message) -> None:
+        self.comm.publish_message(label, self._send([message])[0])
+
+    def publish_messages(self, messages: Dict[str, bytes]) -> None:
+        self.comm.publish_messages(dict(zip(messages, self._send(list(messages.values())))))
+
+    def retrieve_public_message(self, sender_id: str, label: str) -> bytes:
+        return self._wait([self.comm.retrieve_public_message(sender_id, label)])[0]
+
+    def retrieve_public_messages(self, sender_ids: List[str], label: str) -> List[bytes]:
+        if not sender_ids:
+            return []
+        return self._wait(self.comm.retrieve_public_messages(sender_ids, label))
+
+    def publish_opening_share(self, label: str, values: list, field: str = "default") -> None:
+        stamped = self._send([encode_values(values)])[0]
+        self.comm.publish_opening_share(label, values, field)
+        self.comm.publish_message(_arrival_label(label), stamped[:_STAMP.size])
+
+    def retrieve_opening(self, label: str) -> list:
+        values = self.comm.retrieve_opening(label)
+        stamps = self.comm.retrieve_public_messages(self.participants, _arrival_label(label))
+        arrival = max(_STAMP.unpack(stamp)[0] for stamp in stamps)
+        self._wait_until(arrival, len(encode_values(values)))
+        return values
+
+    def join_session(self) -> int:
+        number = self.comm.join_session()
+        self._request(0, _json_size(number))
+        return number
+
+    def retrieve_beaver_triplet_shares(self, op_id: str, field: Optional[str] = None):
+        triplet = self.comm.retrieve_beaver_triplet_shares(op_id, field)
+        self._request(_json_size([op_id]), _json_size(triplet))
+        return triplet
+
+    def retrieve_beaver_triplet_shares_batch(
+            self,
+            op_ids: List[str],
+            sizes: Optional[List[int]] = None,
+            field: Optional[str] = None
+        ):
+        triplets = self.comm.retrieve_beaver_triplet_shares_batch(op_ids, sizes, field)
+        self._request(_json_size([op_ids, sizes, field]), _json_size(triplets))
+        return triplets
+
+    def retrieve_truncation_pairs_batch(self, op_ids: List[str], bits: List[int], field: str):
+        pairs = self.comm.retrieve_truncation_pairs_batch(op_ids, bits, field)
+        self._request(_json_size([op_ids, bits, field]), _json_size(pairs))
+        return pairs
+
+
+def _arrival_label(label: str) -> str:
+    """Label of the arrival times of the shares of an opening, a single URL path segment."""
+    return f"arrival:{label}"
+
+
+def _json_size(body) -> int:
+    """Size of a body sent as JSON, vectors included."""
+    return len(json.dumps(body, default=lambda vector: vector.tolist()).encode())
+
+
+def emulate_protocol(
+        protocol_spec: ProtocolSpec,
+        value_dicts: Dict[str, dict],
+        topology: Topology,
+        poll_delay: Optional[float] = None,
+        compute_time: bool = True,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Tuple[object, float]]:
+    """
+    Run every party of a protocol in this process over an emulated network, and return the
+    result and the simulated duration of the run of each party, with their computation time
+    unless compute_time is false.
+    """
+    comms = {}
+
+    def transport(server: LocalServer, client_id: str) -> EmulatedCommunication:
+        comms[client_id] = EmulatedCommunication(
+            LocalCommunication(server, client_id), topology, protocol_spec.participant_ids,
+            poll_delay, compute_time
+        )
+        return comms[client_id]
+
+    results = run_local_parties(protocol_spec, value_dicts, timeout=timeout, transport=transport)
+    return {client_id: (result, comms[client_id].clock) for client_id, result in results.items()}
+
+
+def main(args: List[str]) -> None:
+    """
+    Entrypoint of the program.
+    """
+    parser = argparse.ArgumentParser(description="Run an SMC protocol over an emulated network.")
+    parser.add_argument("target", help="<module>:<attribute> holding the protocol and inputs")
+    parser.add_argument("topology", help="JSON file of the links of the parties")
+    parser.add_argument(
+        "--poll-delay", type=float, help="delay between polls in seconds, without long polling"
+    )
+    options = parser.parse_args(args)
+
+    protocol_spec, value_dicts = load_target(options.target)
+    runs = emulate_protocol(
+        protocol_spec, value_dicts, Topology.load(options.topology), options.poll_delay
+    )
+    for client_id, (result, clock) in runs.items():
+        print(f"{client_id:<16}{clock:>9.3f}s  {result}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,384 @@
+"""
+Algebraic rewriting of expressions before their execution.
+
+Every secret*secret multiplication costs a Beaver triplet and an opening, and every layer of
+them a network round. The optimizer normalizes an expression to linear combinations of secret
+"atoms" (secrets and products of secret factors) and emits an equivalent expression where:
+    * subtrees of scalars are folded into a single Scalar,
+    * multiplications by scalars are folded into the coefficients of linear combinations,
+    * common factors are pulled out of sums of products (a*c + b*c -> (a+b)*c),
+    * chains of products are rebalanced into trees of minimal depth,
+    * structurally equal subexpressions are computed once,
+    * sums of products of two factors become an InnerProduct, opened at once.
+
+Coefficients are kept as plain integers, so the rewrites hold in any field. Vector expressions
+are left as written, a dot product being an atom of the expression that uses it. So are
+fixed-point expressions and truncations, whose products must stay truncated as written.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple, Union
+
+from circuit import compile_circuit
+from expression import (
+    Expression,
+    InnerProduct,
+    Operation,
+    Scalar,
+    Secret,
+    Truncation,
+    postorder
+)
+
+
+# A linear form: constant and coefficient of each atom, identified by its node number.
+Form = Tuple[int, Dict[int, int]]
+
+LEAF = 's'
+SUM = '+'
+PRODUCT = '*'
+
+
+class OptimizationReport:
+    """Cost of the expression(s) before and after the optimization."""
+
+    def __init__(
+            self,
+            multiplications_before: int,
+            depth_before: int,
+            multiplications_after: int,
+            depth_after: int
+        ):
+        self.multiplications_before = multiplications_before
+        self.depth_before = depth_before
+        self.multiplications_after = multiplications_after
+        self.depth_after = depth_after
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}("
+            f"multiplications: {self.multiplications_before} -> {self.multiplications_after}, "
+            f"depth: {self.depth_before} -> {self.depth_after})"
+        )
+
+
+class Optimizer:
+    """
+    Rewrites expressions through a hash-consed table of normalized nodes.
+
+    Nodes are numbered in the order they are created. The numbering only depends on the
+    structure of the input, so every party optimizing the same expression gets the same
+    output structure.
+
+    Without `restructure`, products are kept as they are written: only the folding of scalars
+    and the sharing of equal subexpressions remain, which never adds a multiplication.
+    """
+
+    def __init__(self, restructure: bool = True):
+        self.restructure = restructure
+        self.table: Dict[tuple, int] = {}
+        self.nodes: List[tuple] = []
+        self.leaves: Dict[int, Expression] = {}
+        self.shared = set()
+
+    def node(self, key: tuple) -> int:
+        if key not in self.table:
+            self.table[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.table[key]
+
+    def optimize(self, outputs: List[Expression]) -> List[Expression]:
+        nodes = []
+        seen = set()
+        references: Dict[bytes, int] = {output.id: 1 for output in outputs}
+        for output in outputs:
+            for e in postorder(output):
+                if e.id in seen:
+                    continue
+                seen.add(e.id)
+                nodes.append(e)
+                for operand in e.get_operands():
+                    references[operand.id] = references.get(operand.id, 0) + 1
+
+        forms: Dict[bytes, Form] = {}
+        for e in nodes:
+            if e.size is not None:
+                continue
+            if (
+                    e.fraction_bits or isinstance(e, Truncation)
+                    or (isinstance(e, Operation) and e.is_dot_product())
+                ):
+                leaf = self.node((LEAF, e.id))
+                self.leaves[leaf] = e
+                forms[e.id] = (0, {leaf: 1})
+            elif isinstance(e, Operation):
+                a, b = forms[e.a.id], forms[e.b.id]
+                if e.is_addition():
+                    forms[e.id] = combine(a, b, 1)
+                elif e.is_subtraction():
+                    forms[e.id] = combine(a, b, -1)
+                elif e.is_multiplication():
+                    # A node used several times is kept whole, flattening it into the products
+                    # that use it would multiply its factors again.
+                    forms[e.id] = self.multiply(
+                        a, b, references[e.a.id] == 1, references[e.b.id] == 1
+                    )
+                else:
+                    raise RuntimeError("Operation expr not known")
+                if references[e.id] > 1 and forms[e.id][0] == 0 and len(forms[e.id][1]) == 1:
+                    self.shared.update(forms[e.id][1])
+            elif isinstance(e, InnerProduct):
+                forms[e.id] = (0, {})
+                for x, y in zip(e.xs, e.ys):
+                    product = self.multiply(
+                        forms[x.id], forms[y.id], references[x.id] == 1, references[y.id] == 1
+                    )
+                    forms[e.id] = combine(forms[e.id], product, 1)
+            elif isinstance(e, Secret):
+                leaf = self.node((LEAF, e.id))
+                self.leaves[leaf] = e
+                forms[e.id] = (0, {leaf: 1})
+            elif isinstance(e, Scalar):
+                forms[e.id] = (e.value, {})
+            else:
+                raise TypeError(f"Cannot optimize {e!r}")
+        roots = {
+            output.id: self.node(self.factor(forms[output.id]))
+            for output in outputs if output.id in forms
+        }
+        emitted = self.emit(list(roots.values()))
+        return [emitted[roots[output.id]] if output.id in roots else output for output in outputs]
+
+    def multiply(self, a: Form, b: Form, flatten_a: bool = True, flatten_b: bool = True) -> Form:
+        """Product of two linear forms, without expanding sums of secrets."""
+        if not a[1]:
+            return scale(b, a[0])
+        if not b[1]:
+            return scale(a, b[0])
+        coef_a, factors_a = self.factors(a, flatten_a)
+        coef_b, factors_b = self.factors(b, flatten_b)
+        product = self.node((PRODUCT, tuple(sorted(factors_a + factors_b))))
+        return (0, {product: coef_a * coef_b})
+
+    def factors(self, form: Form, flatten: bool = True) -> Tuple[int, List[int]]:
+        """Write a secret form as a coefficient times a product of factors."""
+        key = self.factor(form)
+        coef = 1
+        if key[0] == SUM and key[1] == 0 and len(key[2]) == 1:
+            (atom, coef), = key[2]
+            key = self.nodes[atom]
+        if key[0] == PRODUCT and flatten and self.restructure and self.table[key] not in self.shared:
+            return coef, list(key[1])
+        return coef, [self.node(key)]
+
+    def factor(self, form: Form) -> tuple:
+        """
+        Key of the sum node of a form, after pulling the common factors out of its products.
+        """
+        const, terms = form
+        terms = dict(terms)
+        while self.restructure:
+            counts: Dict[int, int] = {}
+            for atom in terms:
+                key = self.nodes[atom]
+                if key[0] == PRODUCT:
+                    for factor in set(key[1]):
+                        counts[factor] = counts.get(factor, 0) + 1
+            common = [factor for factor, count in counts.items() if count > 1]
+            if not common:
+                break
+            # Most shared factor first, lowest node number on ties.
+            best = min(common, key=lambda factor: (-counts[factor], factor))
+            rest: Form = (0, {})
+            shared = [
+                atom for atom in terms
+                if self.nodes[atom][0] == PRODUCT and best in self.nodes[atom][1]
+            ]
+            for atom in shared:
+                coef = terms.pop(atom)
+                factors = list(self.nodes[atom][1])
+                factors.remove(best)
+                rest = combine(rest, self.product_form(factors), 1, coef)
+            for atom, coef in self.multiply((0, {best: 1}), rest)[1].items():
+                terms[atom] = terms.get(atom, 0) + coef
+            terms = {atom: coef for atom, coef in terms.items() if coef != 0}
+        if not terms:
+            return (SUM, const, ())
+        if const == 0 and len(terms) == 1:
+            (atom, coef), = terms.items()
+            if coef == 1:
+                return self.nodes[atom]
+        return (SUM, const, tuple(sorted(terms.items())))
+
+    def product_form(self, factors: List[int]) -> Form:
+        if len(factors) == 1:
+            key = self.nodes[factors[0]]
+            if key[0] == SUM:
+                return (key[1], dict(key[2]))
+            return (0, {factors[0]: 1})
+        return (0, {self.node((PRODUCT, tuple(factors))): 1})
+
+    def emit(self, roots: List[int]) -> Dict[int, Expression]:
+        """Build the expressions of the normalized nodes, each node once."""
+        uses = self.count_uses(roots)
+        emitted: Dict[int, Expression] = {}
+        depths: Dict[int, int] = {}
+        stack = [(root, False) for root in roots]
+        while stack:
+            number, expanded = stack.pop()
+            if number in emitted:
+                continue
+            key = self.nodes[number]
+            children = []
+            inner = {}
+            if key[0] == SUM:
+                inner = self.inner_product_terms(key, uses)
+                for atom, _ in key[2]:
+                    children.extend(self.nodes[atom][1] if atom in inner else [atom])
+            elif key[0] == PRODUCT:
+                children = list(key[1])
+            pending = [child for child in children if child not in emitted]
+            if pending and not expanded:
+                stack.append((number, True))
+                stack.extend((child, False) for child in pending)
+                continue
+            if key[0] == LEAF:
+                emitted[number], depths[number] = self.leaves[number], 0
+            elif key[0] == SUM:
+                emitted[number], depths[number] = emit_sum(key, inner, emitted, depths)
+            else:
+                emitted[number], depths[number] = emit_product(key, emitted, depths)
+        return emitted
+
+    def count_uses(self, roots: List[int]) -> Dict[int, int]:
+        """Number of distinct nodes or roots using each node reachable from the roots."""
+        uses: Dict[int, int] = {}
+        for root in set(roots):
+            uses[root] = 1
+        visited = set()
+        stack = list(roots)
+        while stack:
+            number = stack.pop()
+            if number in visited:
+                continue
+            visited.add(number)
+            key = self.nodes[number]
+            children = []
+            if key[0] == SUM:
+                children = [atom for atom, _ in key[2]]
+            elif key[0] == PRODUCT:
+                children = key[1]
+            for child in set(children):
+                uses[child] = uses.get(child, 0) + 1
+                stack.append(child)
+        return uses
+
+    def inner_product_terms(self, key: tuple, uses: Dict[int, int]) -> Dict[int, Tuple[int, int]]:
+        """
+        Products of two factors of a sum that are only used by it, to open them all at once in
+        an InnerProduct. Empty if there are not at least two of them.
+        """
+        inner = {
+            atom: self.nodes[atom][1] for atom, _ in key[2]
+            if self.nodes[atom][0] == PRODUCT and len(self.nodes[atom][1]) == 2
+            and uses[atom] == 1
+        }
+        return inner if len(inner) > 1 else {}
+
+
+def combine(a: Form, b: Form, sign: int, coef: int = 1) -> Form:
+    """a + sign * coef * b"""
+    terms = dict(a[1])
+    for atom, value in b[1].items():
+        terms[atom] = terms.get(atom, 0) + sign * coef * value
+    return (a[0] + sign * coef * b[0], {atom: value for atom, value in terms.items() if value != 0})
+
+
+def scale(form: Form, coef: int) -> Form:
+    if coef == 0:
+        return (0, {})
+    return (form[0] * coef, {atom: value * coef for atom, value in form[1].items()})
+
+
+def emit_sum(
+        key: tuple,
+        inner: Dict[int, Tuple[int, int]],
+        emitted: Dict[int, Expression],
+        depths: Dict[int, int]
+    ):
+    _, const, terms = key
+    expr: Optional[Expression] = None
+    depth = 0
+    if inner:
+        xs, ys = [], []
+        for atom, coef in terms:
+            if atom in inner:
+                x, y = inner[atom]
+                xs.append(emitted[x] if coef == 1 else emitted[x] * Scalar(coef))
+                ys.append(emitted[y])
+                depth = max(depth, depths[x] + 1, depths[y] + 1)
+        expr = InnerProduct(xs, ys)
+    for atom, coef in terms:
+        if atom in inner:
+            continue
+        term = emitted[atom]
+        depth = max(depth, depths[atom])
+        if expr is None:
+            expr = term if coef == 1 else term * Scalar(coef)
+        elif coef == 1:
+            expr = expr + term
+        elif coef == -1:
+            expr = expr - term
+        elif coef < 0:
+            expr = expr - term * Scalar(-coef)
+        else:
+            expr = expr + term * Scalar(coef)
+    if expr is None:
+        expr = Scalar(const)
+    elif const > 0:
+        expr = expr + Scalar(const)
+    elif const < 0:
+        expr = expr - Scalar(-const)
+    return expr, depth
+
+
+def emit_product(key: tuple, emitted: Dict[int, Expression], depths: Dict[int, int]):
+    # Always multiply the two shallowest factors: the resulting tree has minimal depth.
+    heap = [(depths[factor], i, emitted[factor]) for i, factor in enumerate(key[1])]
+    heapq.heapify(heap)
+    count = len(heap)
+    while len(heap) > 1:
+        depth_a, _, a = heapq.heappop(heap)
+        depth_b, _, b = heapq.heappop(heap)
+        heapq.heappush(heap, (max(depth_a, depth_b) + 1, count, a * b))
+        count += 1
+    depth, _, expr = heap[0]
+    return expr, depth
+
+
+def optimize_expression(
+        expr: Union[Expression, List[Expression]]
+    ) -> Tuple[Union[Expression, List[Expression]], OptimizationReport]:
+    """
+    Rewrite one or several expressions to use fewer secret multiplications and rounds.
+
+    The secrets of the optimized expressions are the original Secret objects. Several
+    expressions are optimized together and share their common subexpressions.
+    """
+    outputs = [expr] if isinstance(expr, Expression) else list(expr)
+    before = compile_circuit(outputs)
+    # Factoring and flattening are heuristics that can lose some sharing of the original
+    # products: keep the conservative rewrite when it turns out cheaper.
+    candidates = []
+    for restructure in [True, False]:
+        optimized = Optimizer(restructure).optimize(outputs)
+        circuit = compile_circuit(optimized)
+        candidates.append(((circuit.num_multiplications(), circuit.depth), optimized, circuit))
+    _, optimized, after = min(candidates, key=lambda candidate: candidate[0])
+    report = OptimizationReport(
+        before.num_multiplications(), before.depth,
+        after.num_multiplications(), after.depth
+    )
+    if isinstance(expr, Expression):
+        return optimized[0], report
+    return optimized, report
@@ -0,0 +1,271 @@
+"""
+Static cost planner of SMC protocols.
+
+The planner compiles the expressions of a ProtocolSpec like the parties do, then counts what
+each party will exchange with the server: Beaver triplets, network rounds, HTTP requests and
+the bytes of their bodies, as Communication counts them. The payloads are built with the
+same types as the parties and the largest values of the field, so the byte counts are upper
+bounds of the actual ones.
+
+The latency estimate assumes requests are sent one after the other, each taking one round
+trip, and that a party waits on average half a poll delay for the slowest party at every
+round, none with the long polling of Communication. Retried polls and local computation are
+not counted.
+
+Usage:
+    python3 planner.py <module>:<attribute> [--rtt S] [--poll-delay S] [--max-latency S]
+
+where the attribute is a ProtocolSpec, a (ProtocolSpec, inputs) pair, or a function returning
+one of them. Inputs map each party to its secrets, e.g. the value_dict given to SMCParty.
+The command fails if the estimated latency exceeds --max-latency.
+"""
+
+import argparse
+import base64
+import importlib
+import json
+import pickle
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from circuit import MULTIPLICATIONS, TRUNC, Circuit
+from communication import encode_values
+from expression import Expression
+from protocol import ProtocolSpec
+from secret_sharing import Share, ShareVector
+from smc_party import SMCParty, compile_protocol, layer_sizes
+
+
+class PartyPlan:
+    """
+    Expected cost of a protocol for one party.
+
+    Attributes:
+        client_id: Identifier of the party
+        inputs: Number of secrets the party shares
+        messages: HTTP requests sent to the server, without retried polls
+        bytes_sent: Total size of the bodies of the requests
+        bytes_received: Total size of the bodies of the responses
+        latency: Estimated duration of the run in seconds
+    """
+
+    def __init__(self, client_id: str, inputs: int):
+        self.client_id = client_id
+        self.inputs = inputs
+        self.messages = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = 0.0
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({self.client_id}: {self.messages} messages, "
+            f"{self.bytes_sent} bytes sent, {self.bytes_received} bytes received, "
+            f"{self.latency:.3f} s)"
+        )
+
+    def request(self, sent: int = 0, received: int = 0) -> None:
+        self.messages += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+
+
+class Plan:
+    """
+    Expected cost of a protocol.
+
+    Attributes:
+        triplets: Beaver triplets used by every party, one per element of vector products
+        truncations: Truncation pairs used by every party
+        depth: Multiplicative depth, the number of rounds of the computation
+        rounds: Network rounds of a run, with the input sharing and the reveal of the outputs
+        parties: Cost for each party
+    """
+
+    def __init__(self, circuit: Circuit, triplets: int, parties: List[PartyPlan]):
+        self.triplets = triplets
+        self.truncations = sum(op == TRUNC for op in circuit.ops)
+        self.depth = circuit.depth
+        self.rounds = circuit.depth + 2
+        self.parties = parties
+
+    @property
+    def latency(self) -> float:
+        """Estimated duration of the run, for the slowest party."""
+        return max(party.latency for party in self.parties)
+
+    def check(self, max_latency: float) -> None:
+        """Raise a ValueError if the run is expected to take longer than max_latency seconds."""
+        if self.latency > max_latency:
+            raise ValueError(
+                f"The protocol is expected to take {self.latency:.3f} s, "
+                f"more than the {max_latency:.3f} s allowed"
+            )
+
+    def __str__(self):
+        lines = [
+            f"triplets: {self.triplets}, truncations: {self.truncations}, "
+            f"depth: {self.depth}, rounds: {self.rounds}",
+            f"{'party':<16}{'inputs':>8}{'messages':>10}{'sent':>12}{'received':>12}"
+            f"{'latency':>10}",
+        ]
+        for party in self.parties:
+            lines.append(
+                f"{party.client_id:<16}{party.inputs:>8}{party.messages:>10}"
+                f"{party.bytes_sent:>12}{party.bytes_received:>12}{party.latency:>9.3f}s"
+            )
+        return "\n".join(lines)
+
+
+def plan_protocol(
+        protocol_spec: ProtocolSpec,
+        inputs: Optional[Dict[str, Iterable[Expression]]] = None,
+        rtt: float = 0.001,
+        poll_delay: float = 0.0,
+        bandwidth: Optional[float] = None
+    ) -> Plan:
+    """
+    Estimate the cost of running a protocol.
+
+    Args:
+        protocol_spec: Protocol to run
+        inputs: Secrets of each party, none by default
+        rtt: Round trip time to the server in seconds
+        poll_delay: Delay between the polls of a message in seconds, as in Communication
+            without long polling. Long-polled messages arrive as soon as they are sent.
+        bandwidth: Bandwidth of the parties in bytes per second, unlimited by default
+    """
+    circuit, _ = compile_protocol(protocol_spec)
+    field = protocol_spec.field
+    participants = sorted(protocol_spec.participant_ids)
+    inputs = {client_id: list((inputs or {}).get(client_id, ())) for client_id in participants}
+    num_peers = len(participants) - 1
+    largest = field.modulus - 1
+
+    def share_of(secret: Expression):
+        if secret.size:
+            return ShareVector(np.full(secret.size, largest), True, field)
+        return Share(largest, True, field)
+
+    # What every party sends to each peer to share its inputs.
+    bundles = {}
+    for client_id, secrets in inputs.items():
+        if protocol_spec.seeded_sharing:
+            sizes = {secret.id: secret.size for secret in secrets if secret.size}
+            bundle = (2 ** 63 - 1, [secret.id for secret in secrets], sizes)
+        else:
+            bundle = {secret.id: share_of(secret) for secret in secrets}
+        bundles[client_id] = pickle.dumps(bundle)
+
+    # The requests of a multiplication layer, identical for every party.
+    layers = []
+    num_triplets = 0
+    for layer in circuit.layers:
+        requests = []
+        masked = []
+        products = [wire for wire in layer if circuit.ops[wire] in MULTIPLICATIONS]
+        truncations = [wire for wire in layer if circuit.ops[wire] == TRUNC]
+        if products:
+            ops, triplets = [], []
+            for wire, size in zip(products, layer_sizes(circuit, products)):
+                ops.append([circuit.beaver_label(wire), size])
+                num_triplets += size or 1
+                triplets.append([[largest] * size if size else largest] * 3)
+                element = np.full(size, largest, dtype=field.dtype) if size else largest
+                masked.extend([element, element])
+            requests.append((
+                _json_size({"ops": ops, "field": field.name}), _json_size(triplets)
+            ))
+        if truncations:
+            ops = [[circuit.beaver_label(wire), circuit.args_b[wire]] for wire in truncations]
+            requests.append((
+                _json_size({"ops": ops, "field": field.name}),
+                _json_size([[largest, largest]] * len(truncations))
+            ))
+            masked.extend([largest] * len(truncations))
+        layers.append((requests, len(encode_values(masked))))
+
+    revealed = len(encode_values([
+        np.full(circuit.sizes[wire], largest) if circuit.sizes[wire] else largest
+        for wire in circuit.outputs
+    ]))
+
+    parties = []
+    for client_id in participants:
+        party = PartyPlan(client_id, len(inputs[client_id]))
+        rounds = 0
+        if num_peers:
+            # Input sharing: one bundle to each peer, then the bundles of all the peers at once.
+            for _ in range(num_peers):
+                party.request(sent=len(bundles[client_id]))
+            labels = [SMCParty.input_label(peer) for peer in participants if peer != client_id]
+            party.request(
+                sent=_json_size(labels),
+                received=_json_size({
+                    SMCParty.input_label(peer): base64.b64encode(bundles[peer]).decode()
+                    for peer in participants if peer != client_id
+                })
+            )
+            rounds += 1
+        # The masked values and the outputs are opened by the server: every party sends its
+        # shares and gets the values.
+        for requests, masked in layers:
+            for sent, received in requests:
+                party.request(sent=sent, received=received)
+            party.request(sent=masked)
+            party.request(received=masked)
+            rounds += 1
+        party.request(sent=revealed)
+        party.request(received=revealed)
+        rounds += 1
+        party.latency = party.messages * rtt + rounds * (poll_delay / 2 if num_peers else 0)
+        if bandwidth:
+            party.latency += (party.bytes_sent + party.bytes_received) / bandwidth
+        parties.append(party)
+    return Plan(circuit, num_triplets, parties)
+
+
+def _json_size(body) -> int:
+    """Size of a JSON body as sent by requests."""
+    return len(json.dumps(body).encode())
+
+
+def load_target(target: str):
+    """Load a `module:attribute` target, calling it if it is a function."""
+    module_name, _, attribute = target.partition(":")
+    value = getattr(importlib.import_module(module_name), attribute or "spec")
+    return value() if callable(value) else value
+
+
+def main(args: List[str]) -> int:
+    """
+    Entrypoint of the program.
+    """
+    parser = argparse.ArgumentParser(description="Estimate the cost of an SMC protocol.")
+    parser.add_argument("target", help="<module>:<attribute> holding the ProtocolSpec")
+    parser.add_argument("--rtt", type=float, default=0.001, help="round trip time in seconds")
+    parser.add_argument(
+        "--poll-delay", type=float, default=0.0,
+        help="delay between polls in seconds, 0 with long polling"
+    )
+    parser.add_argument("--bandwidth", type=float, help="bandwidth in bytes per second")
+    parser.add_argument("--max-latency", type=float, help="fail above this latency in seconds")
+    options = parser.parse_args(args)
+
+    target = load_target(options.target)
+    protocol_spec, inputs = target if isinstance(target, tuple) else (target, None)
+    plan = plan_protocol(protocol_spec, inputs, options.rtt, options.poll_delay, options.bandwidth)
+    print(plan)
+    if options.max_latency is not None:
+        try:
+            plan.check(options.max_latency)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,7 @@
+from typing import Dict, Union
+
 from expression import Expression
+from field import Field, get_field
 
 
 class ProtocolSpec:
@@ -6,13 +9,37 @@ class ProtocolSpec:
 
     Attributes:
         participant_ids: List of IDs of the participating clients
-        expr: Expression to be computed
+        expr: Expression to be computed. It can also be a list of two expressions, whose ratio is
+            computed (the application use-case), or a dict of named expressions, all revealed.
+        outputs: Expressions to reveal, by name
+        application: Whether the ratio of a list of two expressions is computed
+        named: Whether the expressions are named and all of their values are returned
+        optimize: Whether the parties rewrite the expression to use fewer multiplications
+        seeded_sharing: Whether the shares of the inputs are derived from seeds sent once per
+            pair of parties instead of being sent themselves
+        field: Field in which the values are shared, given by name or as a Field
     """
 
-    def __init__(self, participant_ids: list, expr):
+    def __init__(
+            self,
+            participant_ids: list,
+            expr,
+            optimize: bool = True,
+            seeded_sharing: bool = False,
+            field: Union[str, Field] = "default"
+        ):
         self.participant_ids = participant_ids
         self.expr = expr
+        self.optimize = optimize
+        self.seeded_sharing = seeded_sharing
+        self.field = get_field(field) if isinstance(field, str) else field
+        self.named = isinstance(expr, dict)
         if isinstance(expr, Expression):
             self.application = False
+            self.outputs: Dict[str, Expression] = {"result": expr}
+        elif self.named:
+            self.application = False
+            self.outputs = dict(expr)
         else:
             self.application = True
+            self.outputs = {str(i): e for i, e in enumerate(expr or [])}
@@ -5,53 +5,201 @@ Secret sharing scheme.
 from typing import List, Final
 from random import randint
 
+import numpy as np
+
+from field import DEFAULT_FIELD, Field
+
 class Share:
     """
     A secret share in a finite field.
+
+    The arithmetic operators return new shares, the in-place ones (+=, -=, *=) update the
+    share itself to accumulate values without allocating. Both operands must be in the same
+    field.
     """
-    FIELD: Final[int] = 6700417  # this should be common between all participants
+    FIELD: Final[int] = DEFAULT_FIELD.modulus  # modulus of the default field
+
+    __slots__ = ("value", "is_secret", "field")
 
-    def __init__(self, value=0, is_secret=True):
+    def __init__(self, value=0, is_secret=True, field: Field = DEFAULT_FIELD):
         # Adapt constructor arguments as you wish
-        self.value = value % Share.FIELD
+        self.value = field.reduce(value)
         self.is_secret = is_secret #in order to distinguish a secret from a scalar
+        self.field = field
 
     def __repr__(self):
         # Helps with debugging.
         return f"{self.__class__.__name__}({self.value if self.value is not None else 'Null'})"
 
+    # The constructor reduces the results, the operators do not.
     def __add__(self, other):
-        is_secret = self.is_secret_share() or other.is_secret_share()
-        return Share((self.value + other.value) % Share.FIELD, is_secret)
+        return Share(self.value + other.value, self.is_secret or other.is_secret, self.field)
 
     def __radd__(self, other):
-        # Used by SUM function to perform a right add instead of a left add
-        return (self.value + other) % Share.FIELD
+        # Used by SUM function, which starts from the integer 0
+        return Share(self.value + other, self.is_secret, self.field)
 
     def __sub__(self, other):
-        is_secret = self.is_secret_share() or other.is_secret_share()
-        return Share((self.value-other.value) % Share.FIELD, is_secret)
+        return Share(self.value - other.value, self.is_secret or other.is_secret, self.field)
 
     def __mul__(self, other):
-        is_secret = self.is_secret_share() or other.is_secret_share()
-        return Share((self.value * other.value) % Share.FIELD, is_secret)
+        return Share(self.value * other.value, self.is_secret or other.is_secret, self.field)
+
+    def __iadd__(self, other):
+        self.value = self.field.reduce(self.value + other.value)
+        self.is_secret = self.is_secret or other.is_secret
+        return self
+
+    def __isub__(self, other):
+        self.value = self.field.reduce(self.value - other.value)
+        self.is_secret = self.is_secret or other.is_secret
+        return self
+
+    def __imul__(self, other):
+        self.value = self.field.reduce(self.value * other.value)
+        self.is_secret = self.is_secret or other.is_secret
+        return self
 
     def is_secret_share(self):
         return self.is_secret
 
 def reconstruct_secret(shares: List[Share]) -> int:
     """Reconstruct the secret from shares."""
-    return sum(shares)
+    # Add up the plain values and reduce once, without creating intermediate shares.
+    field = shares[0].field if shares else DEFAULT_FIELD
+    return field.reduce(sum([share.value for share in shares]))
 
 # Feel free to add as many methods as you want.
-def split_secret_in_shares(secret: int, total_num_shares: int) -> List[Share]:
+def split_secret_in_shares(
+        secret: int,
+        total_num_shares: int,
+        field: Field = DEFAULT_FIELD
+    ) -> List[Share]:
     """Generate secret shares."""
     # s = sum_0^N-1(s_i)
     shares = []
     Share.num_shares = total_num_shares
     for _ in range(0, total_num_shares - 1):
-        rand = randint(0, Share.FIELD)
-        shares.append(Share(rand, True))
-    s0 = (secret - sum(shares)) % shares[0].FIELD
-    shares.append(Share(s0, True))
+        rand = randint(0, field.modulus - 1)
+        shares.append(Share(rand, True, field))
+    s0 = secret - sum([share.value for share in shares])
+    shares.append(Share(s0, True, field))
+    return shares
+
+
+class ShareVector:
+    """
+    Secret shares of a vector of finite field values, stored in a NumPy array.
+    """
+
+    __slots__ = ("values", "is_secret", "field")
+
+    def __init__(self, values, is_secret=True, field: Field = DEFAULT_FIELD):
+        self.values = field.vector(values)
+        self.is_secret = is_secret
+        self.field = field
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.values.tolist()})"
+
+    def __len__(self):
+        return len(self.values)
+
+    def __add__(self, other):
+        is_secret = self.is_secret_share() or other.is_secret_share()
+        return ShareVector(self.field.add(_values(self), _values(other)), is_secret, self.field)
+
+    def __sub__(self, other):
+        is_secret = self.is_secret_share() or other.is_secret_share()
+        return ShareVector(self.field.sub(_values(self), _values(other)), is_secret, self.field)
+
+    def __mul__(self, other):
+        is_secret = self.is_secret_share() or other.is_secret_share()
+        return ShareVector(self.field.mul(_values(self), _values(other)), is_secret, self.field)
+
+    def is_secret_share(self):
+        return self.is_secret
+
+
+def _values(share):
+    return share.values if isinstance(share, ShareVector) else share.value
+
+
+def reconstruct_secret_vector(shares: List[ShareVector]) -> np.ndarray:
+    """Reconstruct a secret vector from shares."""
+    field = shares[0].field
+    total = shares[0].values
+    for share in shares[1:]:
+        total = field.add(total, share.values)
+    return total
+
+
+def reconstruct_values(shares: List[list], field: Field = DEFAULT_FIELD) -> list:
+    """
+    Reconstruct values from the shares of every client, each a list of integers and vectors.
+    """
+    values = []
+    for value_shares in zip(*shares):
+        if isinstance(value_shares[0], (list, np.ndarray)):
+            total = field.vector(value_shares[0])
+            for share in value_shares[1:]:
+                total = field.add(total, field.vector(share))
+            values.append(total)
+        else:
+            values.append(field.reduce(sum(value_shares)))
+    return values
+
+
+def split_secret_vector_in_shares(
+        secret,
+        total_num_shares: int,
+        field: Field = DEFAULT_FIELD
+    ) -> List[ShareVector]:
+    """Generate secret shares of a vector, element-wise."""
+    secret = field.vector(secret)
+    rng = np.random.default_rng()
+    shares = [
+        ShareVector(field.random_vector(len(secret), rng), True, field)
+        for _ in range(total_num_shares - 1)
+    ]
+    last = secret
+    for share in shares:
+        last = field.sub(last, share.values)
+    shares.append(ShareVector(last, True, field))
+    return shares
+
+
+def derive_share(seed: int, secret_id: bytes, size: int = 0, field: Field = DEFAULT_FIELD):
+    """
+    Share of a secret derived from a seed agreed with its owner, a vector if size is not zero.
+    The owner and the holder of the share derive the same values.
+    """
+    rng = np.random.default_rng([seed, int.from_bytes(secret_id, "big")])
+    if size:
+        return ShareVector(field.random_vector(size, rng), True, field)
+    return Share(field.random(rng), True, field)
+
+
+def split_secret_with_seeds(
+        secret,
+        secret_id: bytes,
+        seeds: List[int],
+        size: int = 0,
+        field: Field = DEFAULT_FIELD
+    ):
+    """
+    Generate the shares of a secret derived from the seeds, followed by the correction share
+    that completes them. Only the correction share has to be computed by the owner.
+    """
+    shares = [derive_share(seed, secret_id, size, field) for seed in seeds]
+    if size:
+        correction = field.vector(secret)
+        for share in shares:
+            correction = field.sub(correction, share.values)
+        shares.append(ShareVector(correction, True, field))
+    else:
+        correction = secret
+        for share in shares:
+            correction = correction - share.value
+        shares.append(Share(correction, True, field))
     return shares
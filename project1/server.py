@@ -3,20 +3,70 @@ Trusted server that should help SMC client to communicate.
 You should not need to change this file.
 """
 
+import base64
 import collections
+import json
+import queue
 import sys
+import threading
+import time
 from os import environ
 from typing import Dict, List, Optional, Tuple
 
 from flask import Flask, request, Response, jsonify
+from werkzeug.serving import WSGIRequestHandler
 
+from communication import encode_values, pack_frames, unpack_frames
+from field import get_field
+from secret_sharing import reconstruct_values
 from ttp import TrustedParamGenerator
 
 
 environ["WERKZEUG_RUN_MAIN"] = "true"
 app: Flask = Flask("Trusted Third Party Server")
+# Messages of each pool by channel. Private messages are forgotten once their receiver retrieved
+# them, but not once pushed on a stream: a client subscribing again gets them from the store.
 store: Dict[str, Dict[Tuple[str, str], bytes]] = collections.defaultdict(dict)
 ttp: TrustedParamGenerator = TrustedParamGenerator()
+# Events of the channels that clients are waiting for, set once their value is stored.
+events: Dict[Tuple[str, Tuple[str, str]], threading.Event] = {}
+events_lock = threading.Lock()
+
+# Queues of the messages pushed to each subscribed client, guarded by events_lock.
+subscribers: Dict[str, List[queue.Queue]] = collections.defaultdict(list)
+# Number of sessions each client joined, guarded by events_lock.
+sessions: Dict[str, int] = collections.defaultdict(int)
+# Shares of the values being opened by each client, by participants and label, until all of
+# them arrived.
+openings: Dict[Tuple[str, str], Dict[str, list]] = collections.defaultdict(dict)
+# Clients that retrieved opened values, by participants and label, until all of them did.
+openings_retrieved: Dict[Tuple[str, str], set] = collections.defaultdict(set)
+
+# Longest time in seconds a request waits for a message.
+MAX_WAIT = 60.0
+# Delay in seconds between the keep-alive comments of an idle stream.
+KEEP_ALIVE = 15.0
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """
+    Request handler keeping the connection of a client open between its requests.
+    Responses without a length, like the streams, still close it.
+    """
+    protocol_version = "HTTP/1.1"
+    # The headers and the body of a response are written separately: without this, the body
+    # waits for the client to acknowledge the headers, which it delays on an open connection.
+    disable_nagle_algorithm = True
+
+
+@app.after_request
+def discard_request_body(response: Response) -> Response:
+    """
+    Read the body of the request if the route did not, such as for an error: the connection
+    is kept open, and the next request would be parsed from the rest of the body.
+    """
+    request.get_data()
+    return response
 
 
 @app.route("/private/<sender_id>/<receiver_id>/<label>", methods=["POST"])
@@ -34,16 +84,33 @@ def send_private_message(sender_id: str, receiver_id: str, label: str):
 @app.route("/private/<receiver_id>/<label>", methods=["GET"])
 def retrieve_private_message(receiver_id: str, label: str):
     """
-    The client retrieve a private message from the server.
+    The client retrieve a private message from the server, which then forgets it.
     """
     res = _get_value("private", (receiver_id, label))
     if res is not None:
         print(f"[ RETRIEVE ] RECEIVER {receiver_id} / LABEL {label}")
+        _forget_value("private", (receiver_id, label))
         return res, 200
 
     return Response(status=404)
 
 
+@app.route("/private/<receiver_id>", methods=["POST"])
+def retrieve_private_message_batch(receiver_id: str):
+    """
+    The client retrieve several private messages at once.
+    The body lists their labels, the ones that are ready are returned encoded in base64.
+    """
+    messages = {}
+    for label in request.get_json():
+        res = _get_value("private", (receiver_id, label))
+        if res is not None:
+            print(f"[ RETRIEVE ] RECEIVER {receiver_id} / LABEL {label}")
+            _forget_value("private", (receiver_id, label))
+            messages[label] = base64.b64encode(res).decode()
+    return jsonify(messages), 200
+
+
 @app.route("/public/<sender_id>/<label>", methods=["POST"])
 def publish_message(sender_id: str, label: str):
     """
@@ -68,20 +135,298 @@ def retrieve_public_message(receiver_id: str, sender_id: str, label: str):
     return Response(status=404)
 
 
+@app.route("/wait/private/<receiver_id>/<label>", methods=["GET"])
+def wait_private_message(receiver_id: str, label: str):
+    """
+    The client retrieve a private message from the server, waiting until it is sent.
+    The request waits up to the `timeout` query parameter, in seconds, then fails with a 404.
+    """
+    res = _wait_value("private", (receiver_id, label), _timeout())
+    if res is not None:
+        print(f"[ RETRIEVE ] RECEIVER {receiver_id} / LABEL {label}")
+        _forget_value("private", (receiver_id, label))
+        return res, 200
+    return Response(status=404)
+
+
+@app.route("/wait/private/<receiver_id>", methods=["POST"])
+def wait_private_message_batch(receiver_id: str):
+    """
+    The client retrieve several private messages at once, waiting until all of them are sent.
+    After the `timeout` query parameter, in seconds, the ones that are ready are returned.
+    """
+    deadline = time.monotonic() + _timeout()
+    messages = {}
+    for label in request.get_json():
+        res = _wait_value("private", (receiver_id, label), max(0.0, deadline - time.monotonic()))
+        if res is not None:
+            print(f"[ RETRIEVE ] RECEIVER {receiver_id} / LABEL {label}")
+            _forget_value("private", (receiver_id, label))
+            messages[label] = base64.b64encode(res).decode()
+    return jsonify(messages), 200
+
+
+@app.route("/wait/public/<receiver_id>/<sender_id>/<label>", methods=["GET"])
+def wait_public_message(receiver_id: str, sender_id: str, label: str):
+    """
+    The client retrieve a public message from the server, waiting until it is published.
+    The request waits up to the `timeout` query parameter, in seconds, then fails with a 404.
+    """
+    res = _wait_value("public", (sender_id, label), _timeout())
+    if res is not None:
+        print(
+            f"[ RETRIEVE ] RECEIVER {receiver_id}. LABEL {label} / SENDER {sender_id}"
+        )
+        return res, 200
+    return Response(status=404)
+
+
+@app.route("/bulk/publish/<sender_id>", methods=["POST"])
+def publish_message_batch(sender_id: str):
+    """
+    The client publish several messages at once.
+    The body holds frames of the messages, whose keys are [label] lists.
+    """
+    for (label,), data in unpack_frames(request.get_data()):
+        print(f"[ PUBLISH  ] SENDER {sender_id} / LABEL {label}")
+        _set_value("public", (sender_id, label), data)
+    return Response(status=200)
+
+
+@app.route("/bulk/retrieve/<receiver_id>", methods=["POST"])
+def retrieve_public_message_batch(receiver_id: str):
+    """
+    The client retrieve several public messages at once.
+    The body lists [sender_id, label] pairs. The messages that are ready are returned in
+    frames with these pairs as keys, after waiting up to the `timeout` query parameter, in
+    seconds, for all of them.
+    """
+    deadline = time.monotonic() + (_timeout() if "timeout" in request.args else 0.0)
+    frames = []
+    for sender_id, label in request.get_json():
+        res = _wait_value("public", (sender_id, label), max(0.0, deadline - time.monotonic()))
+        if res is not None:
+            print(
+                f"[ RETRIEVE ] RECEIVER {receiver_id}. LABEL {label} / SENDER {sender_id}"
+            )
+            frames.append(([sender_id, label], res))
+    return pack_frames(frames), 200
+
+
+@app.route("/opening/<sender_id>/<label>", methods=["POST"])
+def publish_opening_share(sender_id: str, label: str):
+    """
+    The client publish its shares of values opened to all the clients.
+    The body is a JSON list of integers and lists of integers, in the field of the `field`
+    query parameter. Once every participant sent its shares, the values are reconstructed.
+    The participants are given by the `participants` query parameter, every registered client
+    by default: the labels of the protocols with other participants are their own.
+    """
+    scope = _scope()
+    if sender_id not in scope.split(","):
+        return Response(f"Unknown participant {sender_id}", status=400)
+    field = get_field(request.args.get("field", "default"))
+    print(f"[ OPENING  ] SENDER {sender_id} / LABEL {label}")
+    with events_lock:
+        shares = openings[(scope, label)]
+        shares[sender_id] = request.get_json()
+        if len(shares) < len(scope.split(",")):
+            return Response(status=200)
+        del openings[(scope, label)]
+    values = reconstruct_values(list(shares.values()), field)
+    _set_value("opening", (scope, label), encode_values(values))
+    return Response(status=200)
+
+
+@app.route("/opening/<receiver_id>/<label>", methods=["GET"])
+def retrieve_opening(receiver_id: str, label: str):
+    """
+    The client retrieve opened values, as a JSON list, once every participant sent its shares.
+    """
+    scope = _scope()
+    res = _get_value("opening", (scope, label))
+    if res is not None:
+        print(f"[ RETRIEVE ] RECEIVER {receiver_id} / OPENING {label}")
+        _opening_retrieved(receiver_id, scope, label)
+        return res, 200
+    return Response(status=404)
+
+
+@app.route("/wait/opening/<receiver_id>/<label>", methods=["GET"])
+def wait_opening(receiver_id: str, label: str):
+    """
+    The client retrieve opened values, waiting until every participant sent its shares.
+    The request waits up to the `timeout` query parameter, in seconds, then fails with a 404.
+    """
+    scope = _scope()
+    res = _wait_value("opening", (scope, label), _timeout())
+    if res is not None:
+        print(f"[ RETRIEVE ] RECEIVER {receiver_id} / OPENING {label}")
+        _opening_retrieved(receiver_id, scope, label)
+        return res, 200
+    return Response(status=404)
+
+
+@app.route("/stream/<client_id>", methods=["GET"])
+def stream_messages(client_id: str):
+    """
+    The client subscribe to its private messages, to the public messages of other clients and
+    to the opened values of its protocols. They are pushed as server-sent events, the ones already stored first.
+    Each event holds a JSON object with the pool, the sender for public messages, the label
+    and the message encoded in base64. The `senders` query parameter can restrict the public
+    messages to a comma-separated list of senders.
+    """
+    senders = request.args.get("senders")
+    senders = set(senders.split(",")) if senders else None
+    messages = queue.Queue()
+    with events_lock:
+        stored = [
+            ("private", channel, data) for channel, data in store["private"].items()
+        ] + [
+            ("public", channel, data) for channel, data in store["public"].items()
+        ] + [
+            ("opening", channel, data) for channel, data in store["opening"].items()
+        ]
+        subscribers[client_id].append(messages)
+    for message in stored:
+        messages.put(message)
+
+    def events():
+        # The headers of the response are only sent with its first chunk.
+        yield ": subscribed\n\n"
+        try:
+            while True:
+                try:
+                    pool, (owner, label), data = messages.get(timeout=KEEP_ALIVE)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if pool == "private" and owner != client_id:
+                    continue
+                if pool == "opening" and client_id not in owner.split(","):
+                    continue
+                if pool == "public" and (owner == client_id or senders and owner not in senders):
+                    continue
+                event = {"pool": pool, "label": label, "data": base64.b64encode(data).decode()}
+                if pool == "public":
+                    event["sender"] = owner
+                elif pool == "opening":
+                    _opening_retrieved(client_id, owner, label)
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            with events_lock:
+                subscribers[client_id].remove(messages)
+
+    return Response(events(), mimetype="text/event-stream")
+
+
+@app.route("/session/<client_id>", methods=["POST"])
+def join_session(client_id: str):
+    """
+    The client join its next session, and get its number as JSON. The clients of a session
+    get the same number as long as they join their sessions in the same order.
+    """
+    with events_lock:
+        number = sessions[client_id]
+        sessions[client_id] += 1
+    print(f"[ SESSION  ] CLIENT {client_id} / SESSION {number}")
+    return jsonify(number), 200
+
+
 @app.route("/shares/<client_id>/<op_id>", methods=["GET"])
 def retrieve_share(client_id: str, op_id: str):
     """
     The client retrieve Beaver triplets generated by the server.
+    The field can be given by name in the `field` query parameter, and the participants of the
+    protocol in the `participants` one.
     """
-    shares = ttp.retrieve_share(client_id, op_id)
+    field = get_field(request.args.get("field", "default"))
+    shares = ttp.retrieve_share(client_id, op_id, field=field, participants=_participants())
     return jsonify([share.value for share in shares]), 200 #previously bn instead of value
 
 
+@app.route("/shares/<client_id>", methods=["POST"])
+def retrieve_share_batch(client_id: str):
+    """
+    The client retrieve the Beaver triplets of several operations at once.
+    The body lists the operation IDs, or [op_id, size] pairs for vector triplets. It can also
+    be an object with these operations under "ops" and the name of the field under "field".
+    The triplets are split among the participants of the `participants` query parameter.
+    """
+    body = request.get_json()
+    if isinstance(body, dict):
+        ops, field = body["ops"], get_field(body["field"])
+    else:
+        ops, field = body, get_field("default")
+    participants = _participants()
+    triplets = []
+    for op in ops:
+        op_id, size = op if isinstance(op, list) else (op, 0)
+        shares = ttp.retrieve_share(client_id, op_id, size, field, participants)
+        if size:
+            triplets.append([share.values.tolist() for share in shares])
+        else:
+            triplets.append([share.value for share in shares])
+    return jsonify(triplets), 200
+
+
+@app.route("/truncation/<client_id>", methods=["POST"])
+def retrieve_truncation_pairs(client_id: str):
+    """
+    The client retrieve the truncation pairs of several operations at once.
+    The body has [op_id, bits] pairs under "ops" and the name of the field under "field".
+    The pairs are split among the participants of the `participants` query parameter.
+    """
+    body = request.get_json()
+    field = get_field(body["field"])
+    participants = _participants()
+    pairs = []
+    for op_id, bits in body["ops"]:
+        shares = ttp.retrieve_truncation_pair(client_id, op_id, bits, field, participants)
+        pairs.append([share.value for share in shares])
+    return jsonify(pairs), 200
+
+
 def _set_value(pool: str, channel: Tuple[str, str], data: bytes) -> None:
     """
     Push data to a channel in a given pool and send an event.
     """
-    store[pool][channel] = data
+    with events_lock:
+        store[pool][channel] = data
+        event = events.pop((pool, channel), None)
+        # Private messages only go to their receiver, openings to their participants and
+        # public messages to every subscriber.
+        if pool == "private":
+            receivers = [channel[0]]
+        elif pool == "opening":
+            receivers = channel[0].split(",")
+        else:
+            receivers = list(subscribers)
+        for receiver in receivers:
+            for messages in subscribers.get(receiver, ()):
+                messages.put((pool, channel, data))
+    if event is not None:
+        event.set()
+
+
+def _forget_value(pool: str, channel: Tuple[str, str]) -> None:
+    """
+    Forget the data of a channel, once its receiver got it.
+    """
+    with events_lock:
+        store[pool].pop(channel, None)
+
+
+def _opening_retrieved(receiver_id: str, scope: str, label: str) -> None:
+    """
+    Forget opened values once every participant retrieved them.
+    """
+    with events_lock:
+        receivers = openings_retrieved[(scope, label)]
+        receivers.add(receiver_id)
+        if receivers >= set(scope.split(",")):
+            del openings_retrieved[(scope, label)]
+            store["opening"].pop((scope, label), None)
 
 
 def _get_value(pool: str, channel: Tuple[str, str]) -> Optional[bytes]:
@@ -93,13 +438,49 @@ def _get_value(pool: str, channel: Tuple[str, str]) -> Optional[bytes]:
     return store[pool][channel]
 
 
+def _wait_value(pool: str, channel: Tuple[str, str], timeout: float) -> Optional[bytes]:
+    """
+    Get the data of a channel in a given pool, waiting up to timeout seconds for it.
+    """
+    with events_lock:
+        if channel in store[pool]:
+            return store[pool][channel]
+        event = events.setdefault((pool, channel), threading.Event())
+    event.wait(timeout)
+    return _get_value(pool, channel)
+
+
+def _participants() -> Optional[List[str]]:
+    """
+    Participants of the protocol of a request, sorted, from the comma-separated `participants`
+    query parameter if it is given.
+    """
+    participants = request.args.get("participants")
+    return sorted(participants.split(",")) if participants else None
+
+
+def _scope() -> str:
+    """
+    Participants of an opening, comma-separated. They are all the registered clients by
+    default.
+    """
+    return ",".join(_participants() or sorted(ttp.participant_ids))
+
+
+def _timeout() -> float:
+    """
+    Time to wait for a message, from the `timeout` query parameter.
+    """
+    return min(float(request.args.get("timeout", MAX_WAIT)), MAX_WAIT)
+
+
 def run(host: str, port: int, participants: List[str]) -> None:
     """
     Register the participants, then run the server.
     """
     for participant in participants:
         ttp.add_participant(participant)
-    app.run(host, port)
+    app.run(host, port, request_handler=KeepAliveRequestHandler)
 
 
 def main(args: List[str]) -> None:
@@ -0,0 +1,82 @@
+"""
+Sessions of SMC queries over the same inputs.
+
+An SMCSession shares the inputs of a party once, then evaluates many expressions over them
+with the same connection: a query only costs its multiplications and the reveal of its
+outputs. The parties of a session must run the same queries in the same order, which numbers
+the labels of their messages. Their sessions on a server are numbered when they share their
+inputs, so the parties must also open their sessions in the same order: the labels and the
+Beaver triplets of each session are then its own.
+"""
+
+from typing import Dict, Optional, Union
+
+from communication import Communication
+from expression import Secret
+from field import Field
+from protocol import ProtocolSpec
+from smc_party import SMCParty
+
+
+class SMCSession:
+    """
+    Long-lived SMC client keeping its shares of the inputs across queries.
+
+    Attributes:
+        party: Client running the queries, which holds the shares of the inputs
+        id: Identifier of the session on the server, once the inputs are shared
+        queries: Number of queries run
+    """
+
+    def __init__(
+            self,
+            client_id: str,
+            server_host: str,
+            server_port: int,
+            participant_ids: list,
+            value_dict: Dict[Secret, int],
+            optimize: bool = True,
+            seeded_sharing: bool = False,
+            field: Union[str, Field] = "default",
+            threads: int = 0,
+            comm: Optional[Communication] = None
+        ):
+        protocol_spec = ProtocolSpec(participant_ids, None, optimize, seeded_sharing, field)
+        self.party = SMCParty(
+            client_id, server_host, server_port, protocol_spec, value_dict, threads, comm
+        )
+        self.id = None
+        self.queries = 0
+
+    def share_inputs(self) -> None:
+        """
+        Share the inputs with the other clients, once per session.
+        """
+        if self.id is None:
+            self.id = f"session{self.party.comm.join_session()}"
+            self.party.session = self.id
+            self.party.init_secret_sharing()
+
+    def query(self, expr):
+        """
+        Compute the value of expressions over the inputs of the session, given like the
+        expression of a ProtocolSpec.
+        """
+        self.share_inputs()
+        spec = self.party.protocol_spec
+        self.party.protocol_spec = ProtocolSpec(
+            spec.participant_ids, expr, spec.optimize, spec.seeded_sharing, spec.field
+        )
+        circuit = self.party.compile_protocol()
+        # Each party builds its own expressions: the labels come from the number of the query.
+        circuit.id = f"{self.id}_query{self.queries}"
+        self.queries += 1
+        return self.party.decode_outputs(
+            self.party.reveal(self.party.process_circuit(circuit), circuit.output_label())
+        )
+
+    def close(self) -> None:
+        """
+        Shut down the thread pool of the session, once its queries are done.
+        """
+        self.party.close()
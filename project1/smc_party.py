@@ -7,26 +7,116 @@ MODIFY THIS FILE.
 
 from typing import (
     Dict,
+    List,
+    Optional,
+    Tuple,
 )
 
 import pickle
+import secrets
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from communication import Communication
+from circuit import (
+    ADD,
+    ADD_PUBLIC,
+    BEAVER,
+    CONST,
+    INNER,
+    INPUT,
+    MUL,
+    PUBLIC_SUB,
+    SUB,
+    SUB_PUBLIC,
+    TRUNC,
+    TRUNC_PUBLIC,
+    Circuit,
+    circuit_id,
+    compile_circuit
+)
 from expression import (
     Expression,
     Secret,
-    Scalar,
-    Operation
+    SecretVector
 )
+from field import Field
+from optimizer import OptimizationReport, optimize_expression
 from protocol import ProtocolSpec
 from secret_sharing import(
+    derive_share,
     split_secret_in_shares,
-    Share
+    split_secret_vector_in_shares,
+    split_secret_with_seeds,
+    Share,
+    ShareVector
 )
 from time import sleep
 
 # Feel free to add as many imports as you want.
 
+
+def layer_operands(circuit: Circuit, values: list, wire: int, field: Field):
+    """
+    Operands of a multiplication of a layer, the products of an inner product as two vectors.
+    """
+    if circuit.ops[wire] == INNER:
+        xs, ys = circuit.inner_products[circuit.args_a[wire]]
+        return (
+            field.vector([values[x] for x in xs]),
+            field.vector([values[y] for y in ys])
+        )
+    return values[circuit.args_a[wire]], values[circuit.args_b[wire]]
+
+
+def compile_protocol(
+        protocol_spec: ProtocolSpec
+    ) -> Tuple[Circuit, Optional[OptimizationReport]]:
+    """
+    Compile the outputs of a protocol, optimizing them if the protocol asks to, as every party
+    does.
+    """
+    outputs = list(protocol_spec.outputs.values())
+    # Every party must use the same labels: the ID comes from the expressions as written.
+    id = circuit_id(outputs)
+    report = None
+    if protocol_spec.optimize:
+        outputs, report = optimize_expression(outputs)
+    # The expressions are compiled together so that they share their common nodes
+    return compile_circuit(outputs, id=id), report
+
+
+def layer_sizes(circuit: Circuit, products: List[int]) -> List[int]:
+    """
+    Sizes of the triplets of multiplications: vector multiplications, dot products and inner
+    products use element-wise triplets, the others single values.
+    """
+    return [
+        len(circuit.inner_products[circuit.args_a[wire]][0]) if circuit.ops[wire] == INNER
+        else circuit.sizes[circuit.args_a[wire]]
+        for wire in products
+    ]
+
+
+def vector_operation(field: Field, op: int, a, b, additioner: bool):
+    """
+    Result of a local instruction on a vector wire, with the kernels of the field. An operand
+    can be a single value, broadcast to the vector.
+    """
+    if op == ADD:
+        return field.add(a, b)
+    elif op == MUL:
+        return field.mul(a, b)
+    elif op == SUB:
+        return field.sub(a, b)
+    elif op == ADD_PUBLIC:
+        return field.add(a, b) if additioner else a
+    elif op == SUB_PUBLIC:
+        return field.sub(a, b) if additioner else a
+    elif op == PUBLIC_SUB:
+        return field.sub(a, b) if additioner else field.neg(b)
+    raise RuntimeError("Operation expr not known")
+
+
 class SMCParty:
     """
     A client that executes an SMC protocol to collectively compute a value of an expression together
@@ -38,6 +128,11 @@ class SMCParty:
         server_port: port of the server
         protocol_spec (ProtocolSpec): Protocol specification
         value_dict (dict): Dictionary assigning values to secrets belonging to this client.
+        threads (int): Size of the thread pool on which the requests of a round are sent
+            concurrently, and the Beaver triplets of all the layers prefetched. Requests are
+            sent one after the other without threads (default).
+        comm: Transport with the API of Communication, such as a LocalCommunication. The party
+            communicates with the server at server_host:server_port by default.
     """
     def __init__(
             self,
@@ -45,130 +140,450 @@ class SMCParty:
             server_host: str,
             server_port: int,
             protocol_spec: ProtocolSpec,
-            value_dict: Dict[Secret, int]
+            value_dict: Dict[Secret, int],
+            threads: int = 0,
+            comm: Optional[Communication] = None
         ):
         protocol_spec.participant_ids.sort() #add some consistency
-        self.comm = Communication(server_host, server_port, client_id)
+        self.comm = comm or Communication(
+            server_host, server_port, client_id, participants=protocol_spec.participant_ids
+        )
         self.client_id = client_id
         self.protocol_spec = protocol_spec
         self.value_dict = value_dict
         self.my_secret_shares = {} #share of my secret
+        self.input_shares = {} #secret id -> my share of it, received once per run
+        self.seeds = {} #client id -> seed of the shares of my inputs that it derives
+        # Nodes are computed once per circuit: count the distinct nodes and the reused ones.
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.optimization_report = None
+        self.pool = ThreadPoolExecutor(threads) if threads else None
+        # Prefix of the labels of the inputs, set by the sessions sharing inputs on one server.
+        self.session = ""
 
     def is_additioner_client(self):
         return self.protocol_spec.participant_ids[0] == self.client_id
 
+    def peers(self) -> List[str]:
+        return [client_id for client_id in self.protocol_spec.participant_ids
+                if client_id != self.client_id]
+
+    def map_requests(self, function, items) -> list:
+        """
+        Apply a function sending requests to each item, concurrently if there is a thread pool.
+        """
+        if self.pool is None:
+            return [function(item) for item in items]
+        return list(self.pool.map(function, items))
+
     def run(self):
         """
         The method the client use to do the SMC.
         """
-        self.init_secret_sharing()
+        try:
+            self.init_secret_sharing()
+            circuit = self.compile_protocol()
+            #all the outputs are revealed together
+            shares = self.process_circuit(circuit)
+            return self.decode_outputs(self.reveal(shares, circuit.output_label()))
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Shut down the thread pool of the party, if it has one.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def decode_outputs(self, values: list):
+        """
+        Result of the protocol from the revealed values of its outputs.
+        """
+        field = self.protocol_spec.field
+        values = [
+            field.signed(value) / 2 ** output.fraction_bits if output.fraction_bits else value
+            for value, output in zip(values, self.protocol_spec.outputs.values())
+        ]
+        if self.protocol_spec.named:
+            return dict(zip(self.protocol_spec.outputs, values))
         #distinguish case for application use-case
-        if not self.protocol_spec.application :
-            my_share = self.process_expression(self.protocol_spec.expr)
-            self.comm.publish_message('done', pickle.dumps(my_share))
-            shares = []
-            for client_id in self.protocol_spec.participant_ids:
-                shares.append(pickle.loads(self.comm.retrieve_public_message(client_id ,'done')))
-            return sum(shares)
-        else:
-            nominator = 0
-            denominator = 0
-            first_expr = True
-            for e in self.protocol_spec.expr:
-                my_share = self.process_expression(e)
-                self.comm.publish_message('done'+str(first_expr), pickle.dumps(my_share))
-                shares = []
-                for client_id in self.protocol_spec.participant_ids:
-                    shares.append(pickle.loads(self.comm.retrieve_public_message(client_id, 'done'+str(first_expr))))
-                if first_expr:
-                    nominator = sum(shares)
-                    first_expr = False
-                else:
-                    denominator = sum(shares)
+        if self.protocol_spec.application:
+            nominator, denominator = values
             return nominator / denominator
+        return values[0]
+
+    def reveal(self, my_shares: List[Share], label: str) -> list:
+        """
+        Publish my shares of the outputs in a single message and get their values, which the
+        server reconstructs from the shares of all the clients.
+        """
+        field = self.protocol_spec.field
+        self.comm.publish_opening_share(label, self.share_values(my_shares), field.name)
+        return self.opened_values(self.comm.retrieve_opening(label))
+
+    @staticmethod
+    def share_values(shares: List[Share]) -> list:
+        """
+        Values of shares, as integers and vectors.
+        """
+        return [share.values if isinstance(share, ShareVector) else share.value for share in shares]
+
+    def opened_values(self, values: list) -> list:
+        """
+        Opened values retrieved from the server, with their vectors back in the field.
+        """
+        field = self.protocol_spec.field
+        return [field.vector(value) if isinstance(value, list) else value for value in values]
+
+    def compile_protocol(self) -> Circuit:
+        """
+        Compile the expression(s) of the protocol, optimizing them if the protocol asks to.
+        """
+        circuit, self.optimization_report = compile_protocol(self.protocol_spec)
+        return circuit
 
     """Distribute shares of my secret among other parties"""
     def init_secret_sharing(self):
+        bundles = self.share_inputs()
+        peers = self.peers()
+        self.map_requests(
+            lambda client_id: self.comm.send_private_message(
+                client_id, self.input_label(self.client_id, self.session), bundles[client_id]
+            ),
+            peers
+        )
+        # Then get the shares of the inputs of the other clients in one request.
+        if peers:
+            self.store_input_shares(self.comm.retrieve_private_messages([
+                self.input_label(client_id, self.session) for client_id in peers
+            ]))
+
+    def share_inputs(self) -> Dict[str, bytes]:
+        """
+        Split my inputs in shares, keep mine and return the message to send to each other
+        client.
+        """
         other_clients_ids = self.protocol_spec.participant_ids
+        seeded = self.protocol_spec.seeded_sharing
+        field = self.protocol_spec.field
+        # All the shares sent to a client go in a single message, even if there are none.
+        bundles = {client_id: {} for client_id in other_clients_ids}
+        peers = self.peers()
+        if seeded:
+            # The other clients derive their shares of my inputs from the seeds I send them,
+            # only my share, the correction, is computed from the value of the input.
+            for client_id in peers:
+                self.seeds.setdefault(client_id, secrets.randbits(63))
+            seeds = [self.seeds[client_id] for client_id in peers]
+            # Only the IDs of my inputs are sent, with the sizes of the vectors.
+            announced = []
+            vector_sizes = {}
         #create shares and store private locally
         for key in self.value_dict.keys():
             secret_value = self.value_dict[key]
-            shares = split_secret_in_shares(secret_value, len(other_clients_ids))
+            if key.fraction_bits:
+                secret_value = round(secret_value * 2 ** key.fraction_bits)
+            size = key.size or 0
+            if seeded:
+                shares = split_secret_with_seeds(secret_value, key.id, seeds, size, field)
+                self.my_secret_shares[key.id] = shares[-1]
+                announced.append(key.id)
+                if size:
+                    vector_sizes[key.id] = size
+                continue
+            if isinstance(key, SecretVector):
+                shares = split_secret_vector_in_shares(
+                    secret_value, len(other_clients_ids), field
+                )
+            else:
+                shares = split_secret_in_shares(secret_value, len(other_clients_ids), field)
             for client_id, share in zip(other_clients_ids, shares):
                 if self.client_id != client_id:
-                    serialized_share = pickle.dumps(share)
-                    self.comm.send_private_message(client_id, str(key.id.__hash__()), serialized_share)
+                    bundles[client_id][key.id] = share
                 else:
                     self.my_secret_shares[key.id] = share
+        self.input_shares.update(self.my_secret_shares)
+        return {
+            client_id: pickle.dumps(
+                (self.seeds[client_id], announced, vector_sizes) if seeded
+                else bundles[client_id]
+            )
+            for client_id in peers
+        }
+
+    def store_input_shares(self, bundles: Dict[str, bytes]) -> None:
+        """
+        Keep my shares of the inputs of the other clients, from the messages they sent me.
+        """
+        field = self.protocol_spec.field
+        for bundle in bundles.values():
+            if self.protocol_spec.seeded_sharing:
+                seed, announced, vector_sizes = pickle.loads(bundle)
+                for secret_id in announced:
+                    self.input_shares[secret_id] = derive_share(
+                        seed, secret_id, vector_sizes.get(secret_id, 0), field
+                    )
+            else:
+                self.input_shares.update(pickle.loads(bundle))
+
+    @staticmethod
+    def input_label(sender_id: str, session: str = "") -> str:
+        """Label of the message holding the shares of the inputs of a client in a session."""
+        return f"{session}_inputs_{sender_id}" if session else f"inputs_{sender_id}"
 
     def process_expression(
             self,
             expr: Expression
         ) -> Share:
-        if isinstance(expr, Operation):
-            a, b = expr.get_operands()
-            if expr.is_addition():
-                a = self.process_expression(a)
-                b = self.process_expression(b)
-                if a.is_secret_share() and b.is_secret_share():
-                    return a+b
-                elif self.is_additioner_client():
-                    return a+b
-                else:
-                    if a.is_secret_share():
-                        return a
-                    else:
-                        return b
-
-            elif expr.is_subtraction():
-                a = self.process_expression(a)
-                b = self.process_expression(b)
-                if a.is_secret_share() and b.is_secret_share():
-                    return a-b
-                elif self.is_additioner_client():
-                    return a - b
-                else:
-                    if a.is_secret_share():
-                        return a
-                    else:
-                        return Share(-b.value, True)
-
-            elif expr.is_multiplication():
-                # Distinguish if is a multiplication between two secrets
-                a = self.process_expression(a)
-                b = self.process_expression(b)
-                if a.is_secret_share() and b.is_secret_share():
-                    # Beaver triplets Algorithm
-                    # u = a, v = b, w = c and a = x, b = y
-                    u, v, w = self.comm.retrieve_beaver_triplet_shares(str(expr.id.__hash__()))
-                    u = Share(u, True)
-                    v = Share(v, True)
-                    w = Share(w, True)
-                    # x = a - u that in protocol spec would be x - a
-                    # y = b - v that in protocol spec would be y - b
-                    x = a - u
-                    y = b - v
-                    self.comm.publish_message('beaver:x-a_' + str(expr.id.__hash__()), pickle.dumps(x))
-                    self.comm.publish_message('beaver:y-b_' + str(expr.id.__hash__()), pickle.dumps(y))
-                    # reconstruct locally x - a and y - b (where x = a, a = u, y = b, b = v)
-                    for client_id in self.protocol_spec.participant_ids:
-                        if self.client_id != client_id:
-                            x = x + pickle.loads(self.comm.retrieve_public_message(client_id, 'beaver:x-a_' + str(expr.id.__hash__())))
-                            y = y + pickle.loads(self.comm.retrieve_public_message(client_id, 'beaver:y-b_' + str(expr.id.__hash__())))
-                    res = w + (a * y) + (b * x)
-                    if self.is_additioner_client():
-                        res = res - (x * y)
-                    return res
-                else:
-                    return a * b
+        """
+        Compute my share of an expression.
+        """
+        return self.process_circuit(compile_circuit(expr))[0]
+
+    def process_circuit(
+            self,
+            circuit: Circuit
+        ) -> List[Share]:
+        """
+        Execute a compiled circuit and return my share of each of its outputs.
+        """
+        self.check_circuit(circuit)
+        values = [0] * len(circuit)
+        # The triplets do not depend on the values: with threads, they are all requested while
+        # waiting for the inputs and the openings of the first layers.
+        material = {}
+        if self.pool is not None:
+            material = {
+                depth: self.pool.submit(self.retrieve_layer_material, circuit, layer)
+                for depth, layer in enumerate(circuit.layers, 1)
+            }
+        for depth, (start, beaver_end, end) in enumerate(circuit.stages):
+            if beaver_end > start:
+                self.process_multiplication_layer(
+                    circuit, values, range(start, beaver_end), depth, material.get(depth)
+                )
+            self.process_local_instructions(circuit, values, range(beaver_end, end))
+        return self.output_shares(circuit, values)
+
+    def check_circuit(self, circuit: Circuit) -> None:
+        """
+        Raise a ValueError if the field of the protocol cannot hold the values of a circuit.
+        """
+        ops = circuit.ops
+        field = self.protocol_spec.field
+        if TRUNC in ops and field.value_bits <= max(
+                circuit.args_b[i] for i in range(len(circuit)) if ops[i] == TRUNC
+            ):
+            raise ValueError(f"{field} is too small for fixed-point values, use mersenne61")
+
+    def process_local_instructions(
+            self,
+            circuit: Circuit,
+            values: list,
+            instructions: range
+        ) -> None:
+        """
+        Execute instructions of a circuit that need no communication.
+        """
+        ops, args_a, args_b, sizes = circuit.ops, circuit.args_a, circuit.args_b, circuit.sizes
+        field = self.protocol_spec.field
+        modulus = field.modulus
+        has_vectors = any(sizes)
+        # Parties other than the additioner only hold a zero share of public values.
+        additioner = self.is_additioner_client()
+        for i in instructions:
+            op = ops[i]
+            a = args_a[i]
+            b = args_b[i]
+            if has_vectors and sizes[i] and op != INPUT:
+                values[i] = vector_operation(field, op, values[a], values[b], additioner)
+            elif op == ADD:
+                values[i] = (values[a] + values[b]) % modulus
+            elif op == MUL:
+                values[i] = (values[a] * values[b]) % modulus
+            elif op == SUB:
+                values[i] = (values[a] - values[b]) % modulus
+            elif op == ADD_PUBLIC:
+                values[i] = (values[a] + values[b]) % modulus if additioner else values[a]
+            elif op == SUB_PUBLIC:
+                values[i] = (values[a] - values[b]) % modulus if additioner else values[a]
+            elif op == PUBLIC_SUB:
+                values[i] = (
+                    (values[a] - values[b]) % modulus if additioner else -values[b] % modulus
+                )
+            elif op == INPUT:
+                share = self.retrieve_input_share(circuit.inputs[a])
+                values[i] = share.values if sizes[i] else share.value
+            elif op == CONST:
+                values[i] = circuit.constants[a] % modulus
+            elif op == TRUNC_PUBLIC:
+                values[i] = (field.signed(values[a]) >> b) % modulus
             else:
                 raise RuntimeError("Operation expr not known")
 
-        elif isinstance(expr, Secret):
-            if expr.id in self.my_secret_shares.keys():
-                return self.my_secret_shares[expr.id]
+    def output_shares(self, circuit: Circuit, values: list) -> List[Share]:
+        """
+        My shares of the outputs of an executed circuit.
+        """
+        field = self.protocol_spec.field
+        additioner = self.is_additioner_client()
+        sizes = circuit.sizes
+        self.cache_misses += len(circuit)
+        self.cache_hits += circuit.reused_nodes
+        return [
+            ShareVector(values[wire], True, field) if sizes[wire]
+            else Share(values[wire] if circuit.secret[wire] or additioner else 0, True, field)
+            for wire in circuit.outputs
+        ]
+
+    def process_multiplication_layer(
+            self,
+            circuit: Circuit,
+            values: List[int],
+            layer: range,
+            depth: int,
+            material: Optional[Future] = None
+        ) -> None:
+        """
+        Run the Beaver triplets algorithm for all the multiplications of a layer, and the
+        probabilistic truncation of its truncations, in a single round. The triplets and the
+        truncation pairs are retrieved unless their retrieval was already started.
+        """
+        label = circuit.layer_label(depth)
+        if material is None:
+            material = self.retrieve_layer_material(circuit, layer)
+        else:
+            material = material.result()
+        masked = self.mask_layer(circuit, values, layer, material)
+        self.comm.publish_opening_share(label, masked, self.protocol_spec.field.name)
+        opened = self.opened_values(self.comm.retrieve_opening(label))
+        self.finish_layer(circuit, values, layer, material, opened)
+
+    def mask_layer(
+            self,
+            circuit: Circuit,
+            values: list,
+            layer: range,
+            material: Tuple[list, list]
+        ) -> list:
+        """
+        My shares of the masked values opened for the multiplications and truncations of a
+        layer, given my shares of their triplets and truncation pairs.
+        """
+        field = self.protocol_spec.field
+        modulus = field.modulus
+        additioner = self.is_additioner_client()
+        products = [wire for wire in layer if circuit.ops[wire] != TRUNC]
+        truncations = [wire for wire in layer if circuit.ops[wire] == TRUNC]
+        operands = [layer_operands(circuit, values, wire, field) for wire in products]
+        sizes = layer_sizes(circuit, products)
+        # u = a, v = b, w = c and a = x, b = y
+        triplets, pairs = material
+        masked = []
+        for (a, b), (u, v, _), size in zip(operands, triplets, sizes):
+            # x = a - u that in protocol spec would be x - a
+            # y = b - v that in protocol spec would be y - b
+            if size:
+                masked.append(field.sub(a, u))
+                masked.append(field.sub(b, v))
+            else:
+                masked.append((a - u) % modulus)
+                masked.append((b - v) % modulus)
+        # A value x of value_bits bits is truncated by m bits by opening c = 2^(k-1) + x + r
+        # with a mask r of k + STATISTICAL_SECURITY bits: (c >> m) - (r >> m) - 2^(k-1-m) is
+        # x >> m, or x >> m + 1 depending on the carry of the lower bits.
+        offset = 1 << (field.value_bits - 1)
+        for wire, (r, _) in zip(truncations, pairs):
+            x = values[circuit.args_a[wire]]
+            masked.append((x + r + offset) % modulus if additioner else (x + r) % modulus)
+        return masked
+
+    def finish_layer(
+            self,
+            circuit: Circuit,
+            values: list,
+            layer: range,
+            material: Tuple[list, list],
+            masked: list
+        ) -> None:
+        """
+        Compute my shares of the results of a layer from its opened masked values.
+        """
+        field = self.protocol_spec.field
+        modulus = field.modulus
+        additioner = self.is_additioner_client()
+        products = [wire for wire in layer if circuit.ops[wire] != TRUNC]
+        truncations = [wire for wire in layer if circuit.ops[wire] == TRUNC]
+        operands = [layer_operands(circuit, values, wire, field) for wire in products]
+        sizes = layer_sizes(circuit, products)
+        triplets, pairs = material
+        bits = [circuit.args_b[wire] for wire in truncations]
+        offset = 1 << (field.value_bits - 1)
+        # x - a and y - b (where x = a, a = u, y = b, b = v) are opened by the server
+        for i, (wire, (a, b), (_, _, w), size) in enumerate(
+                zip(products, operands, triplets, sizes)
+            ):
+            x = masked[2 * i]
+            y = masked[2 * i + 1]
+            if size:
+                res = field.add(w, field.add(field.mul(a, y), field.mul(b, x)))
+                if additioner:
+                    res = field.sub(res, field.mul(x, y))
+                if circuit.ops[wire] != BEAVER:
+                    res = field.sum(res)
             else:
-                return pickle.loads(self.comm.retrieve_private_message(str(expr.id.__hash__())))
+                res = w + a * y + b * x
+                if additioner:
+                    res = res - x * y
+                res %= modulus
+            values[wire] = res
+        for c, wire, m, (_, high) in zip(masked[2 * len(products):], truncations, bits, pairs):
+            res = -high
+            if additioner:
+                res += (c >> m) - (offset >> m)
+            values[wire] = res % modulus
 
-        elif isinstance(expr, Scalar):
-            return Share(expr.value, False)
+    def retrieve_layer_material(
+            self,
+            circuit: Circuit,
+            layer: range
+        ) -> Tuple[list, list]:
+        """
+        Get my shares of the Beaver triplets of the multiplications of a layer, as vectors for
+        element-wise triplets, and of the truncation pairs of its truncations.
+        """
+        field = self.protocol_spec.field
+        products = [wire for wire in layer if circuit.ops[wire] != TRUNC]
+        truncations = [wire for wire in layer if circuit.ops[wire] == TRUNC]
+        sizes = layer_sizes(circuit, products)
+        triplets = []
+        if products:
+            triplets = self.comm.retrieve_beaver_triplet_shares_batch(
+                [circuit.beaver_label(wire) for wire in products], sizes, field.name
+            )
+        triplets = [
+            tuple(field.vector(t) for t in triplet) if size else triplet
+            for triplet, size in zip(triplets, sizes)
+        ]
+        pairs = []
+        if truncations:
+            pairs = self.comm.retrieve_truncation_pairs_batch(
+                [circuit.beaver_label(wire) for wire in truncations],
+                [circuit.args_b[wire] for wire in truncations],
+                field.name
+            )
+        return triplets, pairs
+
+    def retrieve_input_share(
+            self,
+            secret_id: bytes
+        ) -> Share:
+        """
+        Get my share of an input, received when initializing the secret sharing.
+        """
+        if secret_id not in self.input_shares:
+            raise KeyError(f"No share was received for the secret {secret_id!r}")
+        return self.input_shares[secret_id]
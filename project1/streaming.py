@@ -0,0 +1,260 @@
+"""
+Streaming of the inputs of an SMC party.
+
+A streamed input is a SecretVector whose values are read in chunks of at most its size, from
+an iterator or a file, instead of being held in memory. The protocol is run once per chunk,
+and the shares of the outputs of the chunks are added up before being revealed: the result is
+the sum over the chunks of the expression, as for the sums, counts and dot products of
+aggregations. The other secrets of the expression are shared once and used for every chunk.
+The sum over the chunks is only the value of the expression over the whole streams when the
+outputs are sums over the elements of the streams, such as dot products scaled by other
+secrets: other outputs are rejected.
+
+A thread reads and shares the chunks ahead of the evaluation of the earlier ones, up to a
+bounded number of chunks, so that memory does not grow with the length of the streams. The
+server forgets the messages of the chunks once their receivers retrieved them.
+"""
+
+import csv
+import itertools
+import pickle
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from circuit import (
+    ADD,
+    ADD_PUBLIC,
+    BEAVER,
+    CONST,
+    DOT,
+    INNER,
+    INPUT,
+    MUL,
+    PUBLIC_SUB,
+    SUB,
+    SUB_PUBLIC,
+    Circuit
+)
+from communication import Communication
+from expression import Secret, SecretVector
+from protocol import ProtocolSpec
+from secret_sharing import Share, split_secret_vector_in_shares
+from smc_party import SMCParty
+
+
+def read_chunks(values: Iterable[int], size: int) -> Iterator[List[int]]:
+    """Chunks of at most size values of an iterable."""
+    values = iter(values)
+    while True:
+        chunk = list(itertools.islice(values, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_csv_column(path: str, column: str, size: int) -> Iterator[List[int]]:
+    """Chunks of at most size integers of a column of a CSV file with a header."""
+    with open(path, newline="") as file:
+        yield from read_chunks((int(row[column]) for row in csv.DictReader(file)), size)
+
+
+def read_parquet_column(path: str, column: str, size: int) -> Iterator[List[int]]:
+    """Chunks of at most size integers of a column of a Parquet file, read with pyarrow."""
+    import pyarrow.parquet
+
+    batches = pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=size, columns=[column])
+    for batch in batches:
+        yield batch.column(0).to_pylist()
+
+
+# How a wire depends on the chunks of the streams: not at all, element-wise, or as a sum over
+# the elements of the chunk.
+GLOBAL, ELEMENTS, SUM = range(3)
+
+
+def _add_kind(kinds: set) -> int:
+    """Kind of a sum of wires of some kinds."""
+    if kinds == {GLOBAL} or kinds == {SUM}:
+        return kinds.pop()
+    if SUM in kinds:
+        # A term of a sum over the chunks would be counted once per chunk, or broadcast.
+        raise ValueError("A streamed protocol cannot add values of every chunk to its sums")
+    return ELEMENTS
+
+
+def _mul_kind(kinds: set) -> int:
+    """Kind of a product of wires of some kinds."""
+    if kinds == {SUM}:
+        raise ValueError("A streamed protocol cannot multiply its sums together")
+    if SUM in kinds and ELEMENTS in kinds:
+        raise ValueError("A streamed protocol cannot multiply its sums with the streams")
+    return max(kinds)
+
+
+def check_streamed_circuit(circuit: Circuit) -> None:
+    """
+    Check that the outputs of a circuit, whose secret vectors are the streams, are sums over
+    the elements of the streams: the sums of their values over the chunks are then their
+    values over the whole streams.
+    """
+    ops, args_a, args_b = circuit.ops, circuit.args_a, circuit.args_b
+    kinds = [GLOBAL] * len(circuit)
+    for i, op in enumerate(ops):
+        a, b = args_a[i], args_b[i]
+        if op == INPUT:
+            kinds[i] = ELEMENTS if circuit.sizes[i] else GLOBAL
+        elif op == CONST:
+            kinds[i] = GLOBAL
+        elif op in (ADD, SUB, ADD_PUBLIC, SUB_PUBLIC, PUBLIC_SUB):
+            kinds[i] = _add_kind({kinds[a], kinds[b]})
+        elif op in (MUL, BEAVER):
+            kinds[i] = _mul_kind({kinds[a], kinds[b]})
+        elif op == DOT:
+            kinds[i] = SUM
+        elif op == INNER:
+            left, right = circuit.inner_products[a]
+            kinds[i] = _add_kind({_mul_kind({kinds[x], kinds[y]}) for x, y in zip(left, right)})
+        else:
+            # Truncations
+            kinds[i] = kinds[a]
+    if any(kinds[wire] != SUM for wire in circuit.outputs):
+        raise ValueError("The outputs of a streamed protocol must be sums over the streams")
+
+
+class StreamingSMCParty(SMCParty):
+    """
+    A client that executes an SMC protocol over streamed inputs.
+
+    Attributes:
+        client_id: Identifier of this client
+        server_host: hostname of the server
+        server_port: port of the server
+        protocol_spec (ProtocolSpec): Protocol specification
+        value_dict (dict): Dictionary assigning values to secrets belonging to this client.
+        streams (dict): Chunks of the values of the streamed secret vectors of this client. The
+            chunks of all the streams of the protocol must have the same sizes.
+        prefetch (int): Number of chunks read and shared ahead of the evaluation
+        threads (int): Size of the thread pool of the requests of a round, as in SMCParty
+        comm: Transport with the API of Communication
+    """
+    def __init__(
+            self,
+            client_id: str,
+            server_host: str,
+            server_port: int,
+            protocol_spec: ProtocolSpec,
+            value_dict: Dict[Secret, int],
+            streams: Dict[SecretVector, Iterable[Sequence[int]]],
+            prefetch: int = 2,
+            threads: int = 0,
+            comm: Optional[Communication] = None
+        ):
+        super().__init__(
+            client_id, server_host, server_port, protocol_spec, value_dict, threads, comm
+        )
+        self.streams = streams
+        self.prefetch = prefetch
+        self.chunks = 0
+
+    @staticmethod
+    def chunk_label(sender_id: str, chunk: int) -> str:
+        """Label of the message holding the shares of a chunk of the streams of a client."""
+        return f"chunk_{sender_id}_{chunk}"
+
+    def run(self):
+        """
+        The method the client use to do the SMC.
+        """
+        try:
+            return self.evaluate_streams()
+        finally:
+            self.close()
+
+    def evaluate_streams(self):
+        """
+        Share my inputs, evaluate the protocol over every chunk of the streams and reveal the
+        sums of its outputs.
+        """
+        self.init_secret_sharing()
+        circuit = self.compile_protocol()
+        self.check_circuit(circuit)
+        if len({size for size in circuit.sizes if size}) > 1:
+            raise ValueError("The secret vectors of a streamed protocol must have the same size")
+        check_streamed_circuit(circuit)
+
+        mine = queue.Queue(self.prefetch)
+        errors = []
+        reader = threading.Thread(target=self.share_chunks, args=(mine, errors), daemon=True)
+        reader.start()
+        field = self.protocol_spec.field
+        totals = [Share(0, True, field) for _ in circuit.outputs]
+        # Only the clients with streams send messages after the first chunk.
+        streamers = list(self.protocol_spec.participant_ids)
+        for chunk in itertools.count():
+            bundles = {}
+            if self.client_id in streamers:
+                bundles[self.client_id] = mine.get()
+                if errors:
+                    raise errors[0]
+            labels = {
+                client_id: self.chunk_label(client_id, chunk)
+                for client_id in streamers if client_id != self.client_id
+            }
+            if labels:
+                messages = self.comm.retrieve_private_messages(list(labels.values()))
+                for client_id, label in labels.items():
+                    bundles[client_id] = pickle.loads(messages[label])
+            streamers = [client_id for client_id in streamers if bundles[client_id][0] is not None]
+            sizes = {bundles[client_id][0] for client_id in streamers}
+            if sizes <= {0}:
+                break
+            if len(sizes) > 1:
+                raise ValueError(f"The chunks {chunk} of the streams have different sizes")
+            for client_id in streamers:
+                self.input_shares.update(bundles[client_id][1])
+            chunk_circuit = circuit.resized(sizes.pop(), f"{circuit.id}_{chunk}")
+            for total, share in zip(totals, self.process_circuit(chunk_circuit)):
+                total += share
+            self.chunks += 1
+        return self.decode_outputs(self.reveal(totals, circuit.output_label()))
+
+    def share_chunks(self, mine: queue.Queue, errors: list) -> None:
+        """
+        Read the chunks of my streams, send their shares to the other clients and put mine in
+        a queue, until the streams end. Each chunk message holds the size of the chunk, 0 once
+        the streams ended, and the shares of its streams. Without streams, a single message of
+        size None is sent.
+        """
+        try:
+            participants = self.protocol_spec.participant_ids
+            field = self.protocol_spec.field
+            streams = [(secret, iter(chunks)) for secret, chunks in self.streams.items()]
+            for chunk in itertools.count():
+                values = [(secret, next(chunks, None)) for secret, chunks in streams]
+                sizes = {len(value) for _, value in values if value is not None}
+                if len(sizes) > 1 or (sizes and any(value is None for _, value in values)):
+                    raise ValueError(f"The chunks {chunk} of my streams have different sizes")
+                size = sizes.pop() if sizes else (0 if streams else None)
+                if size and any(size > secret.size for secret, _ in values):
+                    raise ValueError(f"The chunk {chunk} is larger than its secret vector")
+                bundles = {client_id: {} for client_id in participants}
+                for secret, value in values:
+                    if value is None:
+                        continue
+                    shares = split_secret_vector_in_shares(value, len(participants), field)
+                    for client_id, share in zip(participants, shares):
+                        bundles[client_id][secret.id] = share
+                for client_id in self.peers():
+                    self.comm.send_private_message(
+                        client_id,
+                        self.chunk_label(self.client_id, chunk),
+                        pickle.dumps((size, bundles[client_id]))
+                    )
+                # Blocks while the evaluation is prefetch chunks behind.
+                mine.put((size, bundles[self.client_id]))
+                if not size:
+                    return
+        except Exception as error:
+            errors.append(error)
+            mine.put((0, {}))
@@ -0,0 +1,112 @@
+"""
+Tests of the asynchronous SMC party, hosting all the parties in the test process.
+"""
+
+import asyncio
+import time
+from multiprocessing import Process
+
+from async_communication import AsyncCommunication
+from async_smc_party import AsyncSMCParty, run_parties
+from expression import FixedScalar, FixedSecret, Scalar, Secret
+from protocol import ProtocolSpec
+from server import run
+
+
+def start_servers(*participant_lists):
+    """Start a server for each list of participants, on consecutive ports from 5000."""
+    servers = [
+        Process(target=run, args=("localhost", 5000 + i, participants))
+        for i, participants in enumerate(participant_lists)
+    ]
+    for server in servers:
+        server.start()
+    time.sleep(3)
+    return servers
+
+
+def stop_servers(servers):
+    for server in servers:
+        server.terminate()
+        server.join()
+    time.sleep(2)
+
+
+def parties_of(prot, port, value_dicts):
+    return [
+        AsyncSMCParty(name, "localhost", port, prot, value_dict)
+        for name, value_dict in value_dicts.items()
+    ]
+
+
+def test_async_parties():
+    alice_secret = Secret()
+    bob_secret = Secret()
+    charlie_secret = Secret()
+    value_dicts = {
+        "Alice": {alice_secret: 3},
+        "Bob": {bob_secret: 14},
+        "Charlie": {charlie_secret: 2},
+    }
+    expr = alice_secret * bob_secret * charlie_secret + alice_secret * Scalar(5)
+    prot = ProtocolSpec(participant_ids=list(value_dicts), expr=expr)
+
+    servers = start_servers(list(value_dicts))
+    try:
+        results = asyncio.run(run_parties(parties_of(prot, 5000, value_dicts)))
+    finally:
+        stop_servers(servers)
+    assert results == [3 * 14 * 2 + 3 * 5] * 3
+
+
+def test_concurrent_protocols():
+    """Two protocols on two servers, with all their parties in one event loop."""
+    a, b, c = Secret(), Secret(), Secret()
+    integers = {"Alice": {a: 3}, "Bob": {b: 7}, "Charlie": {c: 11}}
+    integer_prot = ProtocolSpec(participant_ids=list(integers), expr=(a + b) * c * c)
+
+    x, y = FixedSecret(), FixedSecret()
+    fixed = {"Dave": {x: 1.5}, "Eve": {y: -2.25}}
+    fixed_prot = ProtocolSpec(
+        participant_ids=list(fixed), expr=x * y + FixedScalar(0.5), field="mersenne61"
+    )
+
+    async def run_both():
+        return await asyncio.gather(
+            run_parties(parties_of(integer_prot, 5000, integers)),
+            run_parties(parties_of(fixed_prot, 5001, fixed)),
+        )
+
+    servers = start_servers(list(integers), list(fixed))
+    try:
+        integer_results, fixed_results = asyncio.run(run_both())
+    finally:
+        stop_servers(servers)
+    assert integer_results == [(3 + 7) * 11 * 11] * 3
+    for result in fixed_results:
+        assert abs(result - (1.5 * -2.25 + 0.5)) < 2 ** -10
+
+
+def test_party_opens_no_blocking_session(monkeypatch):
+    def communication(*args, **kwargs):
+        raise AssertionError("The party opened a blocking session")
+
+    monkeypatch.setattr("smc_party.Communication", communication)
+    party = AsyncSMCParty("Alice", "localhost", 5000, ProtocolSpec(["Alice"], Secret()), {})
+    assert isinstance(party.comm, AsyncCommunication)
+
+
+def test_protocols_sharing_a_server():
+    """Protocols of the same expression, whose labels are the same, on a single server."""
+    x, y = Secret(), Secret()
+    first = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=x * y)
+    second = ProtocolSpec(participant_ids=["Bob", "Charlie", "Dave"], expr=x * y)
+    parties = parties_of(first, 5000, {"Alice": {x: 3}, "Bob": {y: 5}})
+    parties += parties_of(second, 5000, {"Bob": {}, "Charlie": {x: 7}, "Dave": {y: 11}})
+
+    servers = start_servers(["Alice", "Bob", "Charlie", "Dave"])
+    try:
+        results = asyncio.run(run_parties(parties))
+    finally:
+        stop_servers(servers)
+    assert results == [3 * 5] * 2 + [7 * 11] * 3
@@ -0,0 +1,39 @@
+"""
+Tests of the bulk routes of the server.
+"""
+
+import threading
+import time
+
+from communication import Communication, pack_frames, unpack_frames
+from test_long_poll import CountingCommunication
+
+
+def test_frames():
+    frames = [(["Alice", "x"], b"\x00\x01"), (["Bob", "y"], b"")]
+    assert unpack_frames(pack_frames(frames)) == frames
+    assert unpack_frames(b"") == []
+
+
+def test_bulk_publish_and_retrieve(server):
+    alice = Communication("localhost", 5000, "Alice")
+    bob = Communication("localhost", 5000, "Bob")
+    charlie = CountingCommunication("localhost", 5000, "Charlie")
+    alice.publish_messages({"a": b"alice a", "b": "alice b"})
+    # Bob's message is published while Charlie waits for it.
+    threading.Timer(0.3, bob.publish_message, ("a", b"bob a")).start()
+    tic = time.perf_counter()
+    assert charlie.retrieve_public_messages(["Alice", "Bob"], "a") == [b"alice a", b"bob a"]
+    assert time.perf_counter() - tic >= 0.3
+    # Both messages came in a single request, held until the second one was published.
+    assert charlie.requests == 1
+    assert bob.retrieve_public_message("Alice", "b") == b"alice b"
+
+
+def test_bulk_retrieve_polling(server):
+    alice = Communication("localhost", 5000, "Alice")
+    bob = Communication("localhost", 5000, "Bob")
+    charlie = Communication("localhost", 5000, "Charlie", long_poll=False, poll_delay=0.05)
+    bob.publish_message("polled", b"bob")
+    threading.Timer(0.2, alice.publish_message, ("polled", b"alice")).start()
+    assert charlie.retrieve_public_messages(["Alice", "Bob"], "polled") == [b"alice", b"bob"]
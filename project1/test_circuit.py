@@ -0,0 +1,139 @@
+"""
+Unit tests for the circuit compiler.
+"""
+
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from circuit import (
+    ADD_PUBLIC,
+    BEAVER,
+    CONST,
+    DOT,
+    INNER,
+    INPUT,
+    MUL,
+    PUBLIC_SUB,
+    TRUNC,
+    TRUNC_PUBLIC,
+    compile_circuit
+)
+from expression import (
+    FixedScalar,
+    FixedSecret,
+    InnerProduct,
+    Secret,
+    SecretVector,
+    Scalar
+)
+
+
+def test_compile_layers():
+    a, b, c, d, e, f = (Secret() for _ in range(6))
+    expr = (a * b) * (c * d) + e * f
+    circuit = compile_circuit(expr)
+    assert [len(layer) for layer in circuit.layers] == [3, 1]
+    assert circuit.depth == 2
+    assert circuit.num_multiplications() == 4
+    for layer in circuit.layers:
+        for wire in layer:
+            assert circuit.ops[wire] == BEAVER
+            # Operands come from earlier stages.
+            assert circuit.args_a[wire] < layer.start and circuit.args_b[wire] < layer.start
+
+
+def test_compile_public_operands():
+    a, b = Secret(), Secret()
+    expr = (Scalar(4) - a * Scalar(3)) + Scalar(2) * (Scalar(4) * Scalar(5)) + b
+    circuit = compile_circuit(expr)
+    assert circuit.layers == []
+    assert list(circuit.ops).count(INPUT) == 2
+    assert list(circuit.ops).count(CONST) == 5
+    assert list(circuit.ops).count(MUL) == 3
+    assert PUBLIC_SUB in circuit.ops and ADD_PUBLIC in circuit.ops
+
+
+def test_compile_shares_common_nodes():
+    x, y, z = Secret(), Secret(), Secret()
+    xy = x * y
+    circuit = compile_circuit([xy + x * z, xy * Scalar(2)], owners={x: "Alice", y: "Bob"})
+    assert circuit.num_multiplications() == 2
+    assert len(circuit.outputs) == 2
+    assert circuit.reused_nodes == 2
+    assert sorted(filter(None, circuit.owners)) == ["Alice", "Bob"]
+    assert circuit.inputs.index(x.id) == circuit.owners.index("Alice")
+
+
+def test_circuit_serialization():
+    a, b = Secret(), Secret()
+    circuit = compile_circuit(a * b + Scalar(1))
+    copy = pickle.loads(pickle.dumps(circuit))
+    assert copy.id == circuit.id
+    assert list(copy.ops) == list(circuit.ops)
+    assert copy.stages == circuit.stages
+
+
+def test_compile_vectors():
+    u, v = SecretVector(4), SecretVector(4)
+    w = SecretVector(4)
+    expr = (u * v + w * Scalar(2)) @ w
+    circuit = compile_circuit(expr)
+    assert [[circuit.ops[wire] for wire in layer] for layer in circuit.layers] == [[BEAVER], [DOT]]
+    assert circuit.sizes[circuit.outputs[0]] == 0
+    assert circuit.sizes[circuit.layers[0][0]] == 4
+
+
+def test_compile_vectors_with_secret_values():
+    with pytest.raises(ValueError):
+        compile_circuit(SecretVector(3) + Secret())
+    with pytest.raises(ValueError):
+        SecretVector(3) @ SecretVector(4)
+
+
+def test_compile_inner_product():
+    xs = [Secret() for _ in range(3)]
+    ys = [Secret() for _ in range(3)]
+    expr = InnerProduct(xs + [Scalar(2)], ys + [xs[0]]) + Scalar(1)
+    circuit = compile_circuit(expr)
+    assert circuit.depth == 1
+    assert [circuit.ops[wire] for wire in circuit.layers[0]] == [INNER]
+    assert circuit.num_multiplications() == 3
+    products = circuit.inner_products[circuit.args_a[circuit.layers[0][0]]]
+    assert [len(wires) for wires in products] == [3, 3]
+    assert circuit.reused_nodes == 1
+
+
+def test_compile_truncations():
+    x, y, z = FixedSecret(), FixedSecret(), FixedSecret()
+    xy = x * y
+    expr = xy * z + xy + FixedScalar(0.5) * FixedScalar(2.0)
+    circuit = compile_circuit(expr)
+    # Each truncation opens a value at the stage following its product.
+    assert circuit.depth == 4
+    assert [sorted(circuit.ops[wire] for wire in layer) for layer in circuit.layers] == [
+        [BEAVER], [TRUNC], [BEAVER], [TRUNC]
+    ]
+    assert circuit.num_multiplications() == 2
+    assert sum(op == TRUNC_PUBLIC for op in circuit.ops) == 1
+    truncation = circuit.layers[1][0]
+    assert circuit.args_b[truncation] == 12
+    assert circuit.ops[circuit.args_a[truncation]] == BEAVER
+
+
+def test_circuit_id_independent_of_hash_seed():
+    script = (
+        "from circuit import compile_circuit; from expression import Secret; "
+        "print(compile_circuit([Secret(id=b'x'), Secret(id=b'y')]).id)"
+    )
+    ids = {
+        subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONHASHSEED": seed}
+        ).stdout
+        for seed in ["1", "2"]
+    }
+    assert len(ids) == 1
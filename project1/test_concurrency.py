@@ -0,0 +1,103 @@
+"""
+Tests of the parties overlapping their network waits on a thread pool.
+Run them with `python3 -m pytest -s test_concurrency.py` to see the measurements.
+"""
+
+import time
+from multiprocessing import Process, Queue
+
+from expression import Scalar, Secret
+from local_communication import LocalCommunication, run_local_parties
+from protocol import ProtocolSpec
+from smc_party import SMCParty
+from test_integration import smc_server
+
+
+def threaded_client(client_id, prot, value_dict, threads, queue):
+    cli = SMCParty(
+        client_id,
+        "localhost",
+        5000,
+        protocol_spec=prot,
+        value_dict=value_dict,
+        threads=threads
+    )
+    tic = time.perf_counter()
+    res = cli.run()
+    queue.put((res, time.perf_counter() - tic))
+
+
+def run_threaded(parties, expr, threads):
+    """Run a protocol with every party using `threads` threads, return the results and times."""
+    participants = list(parties.keys())
+    prot = ProtocolSpec(expr=expr, participant_ids=participants)
+    queue = Queue()
+    server = Process(target=smc_server, args=(participants,))
+    clients = [
+        Process(target=threaded_client, args=(name, prot, value_dict, threads, queue))
+        for name, value_dict in parties.items()
+    ]
+    server.start()
+    time.sleep(3)
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    results = [queue.get() for _ in clients]
+    server.terminate()
+    server.join()
+    time.sleep(2)
+    return results
+
+
+def build_parties(num_parties):
+    """Independent products of pairs of secrets, then their product: two layers."""
+    secrets = [Secret() for _ in range(2 * num_parties)]
+    parties = {
+        f"Party{i}": {secrets[2 * i]: i + 2, secrets[2 * i + 1]: i + 3}
+        for i in range(num_parties)
+    }
+    products = [secrets[2 * i] * secrets[2 * i + 1] for i in range(num_parties)]
+    expr = products[0]
+    for product in products[1:]:
+        expr = expr * product + Scalar(1)
+    expected = (2 * 3)
+    for i in range(1, num_parties):
+        expected = (expected * (i + 2) * (i + 3) + 1) % 6700417
+    return parties, expr, expected
+
+
+def test_threaded_parties():
+    parties, expr, expected = build_parties(4)
+    results = run_threaded(parties, expr, threads=4)
+    for result, _ in results:
+        assert result == expected
+
+
+class DelayedCommunication(LocalCommunication):
+    """Local transport whose requests take DELAY seconds, as over a slow network."""
+
+    DELAY = 0.05
+
+    def send_private_message(self, receiver_id, label, message):
+        time.sleep(self.DELAY)
+        super().send_private_message(receiver_id, label, message)
+
+    def retrieve_beaver_triplet_shares_batch(self, op_ids, sizes=None, field=None):
+        time.sleep(self.DELAY)
+        return super().retrieve_beaver_triplet_shares_batch(op_ids, sizes, field)
+
+
+def test_threads_overlap_waits():
+    # On localhost the requests are too fast for the overlap to show: delay them.
+    parties, expr, expected = build_parties(5)
+    spec = ProtocolSpec(expr=expr, participant_ids=list(parties))
+    timings = {}
+    for threads in (0, 4):
+        tic = time.perf_counter()
+        results = run_local_parties(spec, parties, threads, transport=DelayedCommunication)
+        timings[threads] = time.perf_counter() - tic
+        assert all(result == expected for result in results.values())
+    print(f"sequential: {timings[0]:.3f} s, 4 threads: {timings[4]:.3f} s")
+    # 4 input bundles and 2 layers of triplets one after the other, or about 2 delays.
+    assert timings[4] < 0.6 * timings[0]
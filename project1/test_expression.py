@@ -5,7 +5,9 @@ Testing expressions is not obligatory.
 MODIFY THIS FILE.
 """
 
-from expression import Secret, Scalar
+import pytest
+
+from expression import FixedScalar, FixedSecret, Secret, Scalar, Truncation, postorder
 
 
 # Example test, you can adapt it to your needs.
@@ -18,5 +20,42 @@ def test_expr_construction():
     assert repr(expr) == "(Secret(1) + Secret(2)) * Secret(3) * (Secret(2) - Secret(3)) * (Scalar(4) + Scalar(3))"
 
 
+def test_repr_deep_expression():
+    expr = Secret(0)
+    for i in range(1, 5000):
+        expr = expr + Secret(i)
+    assert repr(expr).startswith("(" * 4999 + "Secret(0) + Secret(1))")
+
+
+def test_postorder():
+    a = Secret(1)
+    b = Secret(2)
+    ab = a * b
+    expr = ab + ab * Scalar(3)
+    nodes = postorder(expr)
+    assert len(nodes) == 6
+    assert nodes[-1] is expr
+    position = {node.id: i for i, node in enumerate(nodes)}
+    assert position[a.id] < position[ab.id] and position[b.id] < position[ab.id]
+
+
+def test_fixed_point_precision():
+    x, y = FixedSecret(12), FixedSecret(8)
+    k = Secret()
+    assert (x + FixedScalar(1.5)).fraction_bits == 12
+    assert FixedScalar(1.5).value == 3 * 2 ** 11
+    # A product by an integer needs no truncation.
+    assert (x * k).fraction_bits == 12 and not isinstance(x * k, Truncation)
+    product = x * y
+    assert isinstance(product, Truncation)
+    assert product.bits == 8 and product.fraction_bits == 12
+    with pytest.raises(ValueError):
+        x + k
+    with pytest.raises(ValueError):
+        x - FixedScalar(1.5, 8)
+    with pytest.raises(ValueError):
+        Truncation(k, 1)
+
+
 def test():
     raise NotImplementedError("You can create some tests.")
@@ -0,0 +1,89 @@
+"""
+Unit tests of the fields and integration tests of the protocol in the Mersenne field.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from expression import Scalar, Secret, SecretVector
+from field import DEFAULT_FIELD, MERSENNE_61, Field, get_field
+from protocol import ProtocolSpec
+from secret_sharing import (
+    Share,
+    ShareVector,
+    reconstruct_secret,
+    reconstruct_secret_vector,
+    split_secret_in_shares,
+    split_secret_vector_in_shares
+)
+from test_integration import run_processes
+
+
+def test_mersenne_reduce():
+    p = MERSENNE_61.modulus
+    assert p == 2 ** 61 - 1
+    for value in [0, 1, p - 1, p, p + 1, 2 * p, (p - 1) ** 2, 2 ** 200 + 5, -7]:
+        assert MERSENNE_61.reduce(value) == value % p
+
+
+def test_mersenne_kernels():
+    p = MERSENNE_61.modulus
+    rng = random.Random(61)
+    a = [rng.randrange(p) for _ in range(1000)] + [0, 1, p - 1, p - 1]
+    b = [rng.randrange(p) for _ in range(1000)] + [p - 1, 0, p - 1, 1]
+    u, v = MERSENNE_61.vector(a), MERSENNE_61.vector(b)
+    assert u.dtype == np.uint64
+    assert MERSENNE_61.add(u, v).tolist() == [(x + y) % p for x, y in zip(a, b)]
+    assert MERSENNE_61.sub(u, v).tolist() == [(x - y) % p for x, y in zip(a, b)]
+    assert MERSENNE_61.mul(u, v).tolist() == [(x * y) % p for x, y in zip(a, b)]
+    assert MERSENNE_61.mul(u, 3).tolist() == [(x * 3) % p for x in a]
+    assert MERSENNE_61.neg(u).tolist() == [-x % p for x in a]
+    assert MERSENNE_61.sum(u) == sum(a) % p
+    assert MERSENNE_61.vector([-1, 2 ** 70]).tolist() == [p - 1, 2 ** 70 % p]
+
+
+def test_field_registry():
+    assert get_field("default") is DEFAULT_FIELD
+    assert get_field("mersenne61") is MERSENNE_61
+    assert DEFAULT_FIELD.modulus == Share.FIELD
+    with pytest.raises(ValueError):
+        get_field("unknown")
+    with pytest.raises(ValueError):
+        Field("large", 2 ** 61 - 1)
+
+
+def test_shares_in_mersenne_field():
+    secret = 2 ** 60 + 12345
+    shares = split_secret_in_shares(secret, 4, MERSENNE_61)
+    assert reconstruct_secret(shares) == secret
+    assert (shares[0] * shares[1]).value == shares[0].value * shares[1].value % MERSENNE_61.modulus
+
+    vector = [0, 1, 2 ** 60, MERSENNE_61.modulus - 1]
+    shares = split_secret_vector_in_shares(vector, 3, MERSENNE_61)
+    assert reconstruct_secret_vector(shares).tolist() == vector
+    doubled = ShareVector(vector, True, MERSENNE_61) * Share(2, False, MERSENNE_61)
+    assert doubled.values.tolist() == [2 * x % MERSENNE_61.modulus for x in vector]
+
+
+def test_protocol_in_mersenne_field():
+    """
+    f(a, b, c, u, v) = a * b * c + Σ (u * v) - K, with values beyond the default field
+    """
+    alice_secret, bob_secret, charlie_secret = Secret(), Secret(), Secret()
+    alice_vector, bob_vector = SecretVector(50), SecretVector(50)
+
+    parties = {
+        "Alice": {alice_secret: 10 ** 6, alice_vector: np.arange(50) * 10 ** 5},
+        "Bob": {bob_secret: 3 * 10 ** 5, bob_vector: np.full(50, 7 * 10 ** 4)},
+        "Charlie": {charlie_secret: 12345},
+    }
+    expr = alice_secret * bob_secret * charlie_secret + alice_vector @ bob_vector - Scalar(5)
+    expected = 10 ** 6 * 3 * 10 ** 5 * 12345 + sum(range(50)) * 10 ** 5 * 7 * 10 ** 4 - 5
+
+    participants = list(parties.keys())
+    prot = ProtocolSpec(expr=expr, participant_ids=participants, field="mersenne61")
+    clients = [(name, prot, value_dict) for name, value_dict in parties.items()]
+    for result in run_processes(participants, *clients):
+        assert result == expected
@@ -0,0 +1,43 @@
+"""
+Integration tests of the fixed-point arithmetic.
+"""
+
+import pytest
+
+from expression import FixedScalar, FixedSecret, Secret
+from protocol import ProtocolSpec
+from test_integration import run_processes
+
+
+def test_fixed_point_scores():
+    """
+    weighted = Σ grade_i * ects_i, mean = (Σ grade_i) / 3, product = grade_a * grade_b - K
+    """
+    alice_grade, bob_grade, charlie_grade = FixedSecret(), FixedSecret(), FixedSecret()
+    alice_ects, bob_ects, charlie_ects = Secret(), Secret(), Secret()
+
+    parties = {
+        "Alice": {alice_grade: 5.25, alice_ects: 7},
+        "Bob": {bob_grade: 4.75, bob_ects: 6},
+        "Charlie": {charlie_grade: 5.5, charlie_ects: 5},
+    }
+    expr = {
+        "weighted": alice_grade * alice_ects + bob_grade * bob_ects + charlie_grade * charlie_ects,
+        "mean": (alice_grade + bob_grade + charlie_grade) * FixedScalar(1 / 3),
+        "product": alice_grade * bob_grade - FixedScalar(30.0),
+    }
+    expected = {
+        "weighted": 5.25 * 7 + 4.75 * 6 + 5.5 * 5,
+        # 1/3 itself is rounded to 12 fractional bits.
+        "mean": (5.25 + 4.75 + 5.5) * FixedScalar(1 / 3).value / 2 ** 12,
+        "product": 5.25 * 4.75 - 30,
+    }
+
+    participants = list(parties.keys())
+    prot = ProtocolSpec(expr=expr, participant_ids=participants, field="mersenne61")
+    clients = [(name, prot, value_dict) for name, value_dict in parties.items()]
+    for result in run_processes(participants, *clients):
+        # The truncation is exact up to one unit of the last place.
+        for name, value in expected.items():
+            assert result[name] == pytest.approx(value, abs=2 ** -10)
+
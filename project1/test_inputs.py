@@ -0,0 +1,75 @@
+"""
+Integration tests of the distribution of the inputs.
+"""
+
+import numpy as np
+
+from expression import Secret, SecretVector
+from protocol import ProtocolSpec
+from test_integration import run_processes, suite
+
+
+def test_many_inputs():
+    """
+    f(a_0, ..., b_0, ..., c_0, ...) = Σ a_i + Σ b_i * c_i, with hundreds of inputs per party
+    """
+    alice_secrets = [Secret() for _ in range(300)]
+    bob_secrets = [Secret() for _ in range(300)]
+    charlie_secrets = [Secret() for _ in range(300)]
+
+    parties = {
+        "Alice": {secret: i for i, secret in enumerate(alice_secrets)},
+        "Bob": {secret: i + 1 for i, secret in enumerate(bob_secrets)},
+        "Charlie": {secret: 2 for secret in charlie_secrets},
+    }
+
+    expr = alice_secrets[0]
+    for secret in alice_secrets[1:]:
+        expr = expr + secret
+    for b, c in zip(bob_secrets, charlie_secrets):
+        expr = expr + b * c
+    expected = sum(range(300)) + sum(2 * (i + 1) for i in range(300))
+    suite(parties, expr, expected)
+
+
+def test_party_without_inputs():
+    """
+    f(a, b) = a * b, computed with a third party that has no input
+    """
+    alice_secret = Secret()
+    bob_secret = Secret()
+
+    parties = {
+        "Alice": {alice_secret: 3},
+        "Bob": {bob_secret: 14},
+        "Charlie": {},
+    }
+
+    expr = alice_secret * bob_secret
+    expected = 3 * 14
+    suite(parties, expr, expected)
+
+
+def test_seeded_sharing():
+    """
+    f(a, b, u, v) = a * b + Σ (u * v), with the shares derived from seeds
+    """
+    alice_secret = Secret()
+    bob_secret = Secret()
+    alice_vector = SecretVector(100)
+    charlie_vector = SecretVector(100)
+
+    parties = {
+        "Alice": {alice_secret: 3, alice_vector: np.arange(100)},
+        "Bob": {bob_secret: 14},
+        "Charlie": {charlie_vector: np.full(100, 2)},
+    }
+
+    expr = alice_secret * bob_secret + alice_vector @ charlie_vector
+    expected = 3 * 14 + 2 * sum(range(100))
+
+    participants = list(parties.keys())
+    prot = ProtocolSpec(expr=expr, participant_ids=participants, seeded_sharing=True)
+    clients = [(name, prot, value_dict) for name, value_dict in parties.items()]
+    for result in run_processes(participants, *clients):
+        assert result == expected
@@ -0,0 +1,73 @@
+"""
+Tests of the in-process transport, running all the parties as threads or asyncio tasks.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import test_integration
+from expression import FixedScalar, FixedSecret, Scalar, Secret, SecretVector
+from local_communication import LocalServer, run_local_parties, run_local_parties_async
+from protocol import ProtocolSpec
+
+
+def run_processes_locally(server_args, *client_args):
+    """Drop-in for test_integration.run_processes, with threads instead of processes."""
+    prot = client_args[0][1]
+    value_dicts = {name: value_dict for name, _, value_dict in client_args}
+    return list(run_local_parties(prot, value_dicts, timeout=10).values())
+
+
+@pytest.mark.parametrize("test", [
+    getattr(test_integration, name) for name in dir(test_integration) if name.startswith("test_")
+])
+def test_integration_suites(test, monkeypatch):
+    monkeypatch.setattr(test_integration, "run_processes", run_processes_locally)
+    test()
+
+
+def test_vectors_and_fixed_point():
+    u, v = SecretVector(3), SecretVector(3)
+    x, y = FixedSecret(), FixedSecret()
+    value_dicts = {"Alice": {u: [1, 2, 3], x: 0.75}, "Bob": {v: [4, 5, 6], y: -1.5}}
+    prot = ProtocolSpec(
+        participant_ids=list(value_dicts),
+        expr={"dot": u @ v, "fixed": x * y + FixedScalar(0.25)},
+        field="mersenne61"
+    )
+    for result in run_local_parties(prot, value_dicts, threads=2, timeout=10).values():
+        assert result["dot"] == 32
+        assert abs(result["fixed"] - (0.75 * -1.5 + 0.25)) < 2 ** -10
+
+
+def test_async_parties():
+    secrets = [Secret() for _ in range(4)]
+    value_dicts = {f"Party{i}": {secret: i + 1} for i, secret in enumerate(secrets)}
+    expr = secrets[0] * secrets[1] + secrets[2] * secrets[3] * Scalar(2)
+    prot = ProtocolSpec(participant_ids=list(value_dicts), expr=expr)
+    results = asyncio.run(run_local_parties_async(prot, value_dicts, timeout=10))
+    assert list(results.values()) == [1 * 2 + 3 * 4 * 2] * 4
+
+
+def test_missing_message_times_out():
+    server = LocalServer(["Alice"], timeout=0.01)
+    with pytest.raises(TimeoutError):
+        server.get_value("public", ("Alice", "done"))
+
+
+def test_many_parties():
+    num_parties = 50
+    secrets = [Secret() for _ in range(num_parties)]
+    value_dicts = {f"Party{i:02}": {secret: i} for i, secret in enumerate(secrets)}
+    expr = Scalar(0)
+    for a, b in zip(secrets[::2], secrets[1::2]):
+        expr = expr + a * b
+    prot = ProtocolSpec(participant_ids=list(value_dicts), expr=expr)
+    tic = time.perf_counter()
+    results = run_local_parties(prot, value_dicts, timeout=30)
+    elapsed = time.perf_counter() - tic
+    print(f"{num_parties} parties: {elapsed:.3f} s")
+    expected = sum(i * (i + 1) for i in range(0, num_parties, 2))
+    assert list(results.values()) == [expected] * num_parties
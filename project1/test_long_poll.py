@@ -0,0 +1,64 @@
+"""
+Tests of the long-polling routes of the server.
+"""
+
+import threading
+import time
+
+import requests
+
+from communication import Communication
+
+
+class CountingCommunication(Communication):
+    """Communication counting the requests it sends."""
+
+    requests = 0
+
+    def _request(self, *args, **kwargs):
+        self.requests += 1
+        return super()._request(*args, **kwargs)
+
+
+def test_wait_times_out(server):
+    tic = time.perf_counter()
+    res = requests.get(f"{server}/wait/public/Bob/Alice/never?timeout=0.3")
+    assert res.status_code == 404
+    assert time.perf_counter() - tic >= 0.3
+
+
+def test_retrieve_returns_once_sent(server):
+    alice = Communication("localhost", 5000, "Alice")
+    bob = CountingCommunication("localhost", 5000, "Bob")
+    delay = 0.5
+
+    def send_later():
+        time.sleep(delay)
+        alice.publish_message("later", b"public")
+        alice.send_private_message("Bob", "later", b"private")
+
+    sender = threading.Thread(target=send_later)
+    tic = time.perf_counter()
+    sender.start()
+    assert bob.retrieve_public_message("Alice", "later") == b"public"
+    assert time.perf_counter() - tic >= delay
+    # A single request, held by the server until the message was published.
+    assert bob.requests == 1
+    assert bob.retrieve_private_messages(["later"]) == {"later": b"private"}
+    assert bob.requests == 2
+    sender.join()
+
+
+def test_polling_still_works(server):
+    alice = Communication("localhost", 5000, "Alice", long_poll=False)
+    bob = Communication("localhost", 5000, "Bob", long_poll=False, poll_delay=0.05)
+    threading.Timer(0.2, alice.publish_message, ("polled", b"value")).start()
+    assert bob.retrieve_public_message("Alice", "polled") == b"value"
+
+
+def test_private_message_forgotten_once_retrieved(server):
+    alice = Communication("localhost", 5000, "Alice")
+    bob = Communication("localhost", 5000, "Bob")
+    alice.send_private_message("Bob", "once", b"private")
+    assert bob.retrieve_private_message("once") == b"private"
+    assert requests.get(f"{server}/private/Bob/once").status_code == 404
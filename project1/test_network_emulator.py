@@ -0,0 +1,107 @@
+"""
+Tests of the network emulator.
+"""
+
+import json
+
+import pytest
+
+from communication import Communication
+from expression import Scalar, Secret, SecretVector
+from local_communication import run_local_parties
+from network_emulator import EmulatedCommunication, Link, Topology, emulate_protocol, main
+from planner import plan_protocol
+from protocol import ProtocolSpec
+
+
+def example():
+    a, b, c = Secret(), Secret(), Secret()
+    value_dicts = {"Alice": {a: 3}, "Bob": {b: 5}, "Charlie": {c: 7}}
+    spec = ProtocolSpec(participant_ids=list(value_dicts), expr=a * b * c + Scalar(2))
+    return spec, value_dicts
+
+
+def test_latency_matches_plan():
+    spec, value_dicts = example()
+    topology = Topology(Link(latency=0.05))
+    runs = emulate_protocol(spec, value_dicts, topology, poll_delay=None, compute_time=False)
+    plan = plan_protocol(spec, rtt=0.1, poll_delay=0)
+    for result, clock in runs.values():
+        assert result == 3 * 5 * 7 + 2
+        # Every request takes a round trip, and the parties are never kept waiting.
+        assert clock == pytest.approx(plan.latency)
+
+
+def test_slow_party_delays_others():
+    spec, value_dicts = example()
+    fast = emulate_protocol(
+        spec, value_dicts, Topology(Link(latency=0.01)), poll_delay=None, compute_time=False
+    )
+    slow = emulate_protocol(
+        spec, value_dicts, Topology(Link(latency=0.01), {"Charlie": Link(latency=0.2)}),
+        poll_delay=None, compute_time=False
+    )
+    for client_id in value_dicts:
+        assert slow[client_id][1] > fast[client_id][1] + 0.2
+
+
+def test_polling_and_loss_add_delays():
+    spec, value_dicts = example()
+    link = Link(latency=0.01)
+    base = emulate_protocol(spec, value_dicts, Topology(link), None, compute_time=False)
+    polled = emulate_protocol(spec, value_dicts, Topology(link), 0.2, compute_time=False)
+    lossy = emulate_protocol(
+        spec, value_dicts, Topology(Link(latency=0.01, loss=0.5), seed=1), None,
+        compute_time=False
+    )
+    clock = max(run[1] for run in base.values())
+    assert max(run[1] for run in polled.values()) >= clock
+    assert max(run[1] for run in lossy.values()) > clock + 0.2
+    assert [run[0] for run in lossy.values()] == [run[0] for run in base.values()]
+
+
+def test_bandwidth():
+    u, v = SecretVector(1000), SecretVector(1000)
+    value_dicts = {"Alice": {u: list(range(1000))}, "Bob": {v: [2] * 1000}}
+    spec = ProtocolSpec(participant_ids=list(value_dicts), expr=u @ v)
+    unlimited = emulate_protocol(spec, value_dicts, Topology(), poll_delay=None)
+    limited = emulate_protocol(
+        spec, value_dicts, Topology(Link(bandwidth=1e5)), poll_delay=None
+    )
+    for client_id in value_dicts:
+        assert unlimited[client_id][0] == limited[client_id][0] == 2 * sum(range(1000))
+        # Each party sends and receives at least the 2 masked vectors of 1000 elements.
+        assert limited[client_id][1] > unlimited[client_id][1] + 4 * 8000 / 1e5
+
+
+def test_topology_file(tmp_path, capsys):
+    path = tmp_path / "topology.json"
+    path.write_text(json.dumps({
+        "seed": 1,
+        "default": {"latency": 0.01},
+        "parties": {"Alice": {"latency": 0.08, "jitter": 0.01, "bandwidth": 1e6, "loss": 0.01}},
+    }))
+    topology = Topology.load(str(path))
+    assert topology.link("Alice").bandwidth == 1e6
+    assert topology.link("Bob").latency == 0.01
+    main(["test_network_emulator:example", str(path)])
+    assert "Charlie" in capsys.readouterr().out
+
+
+def test_http_server(server):
+    spec, value_dicts = example()
+    topology = Topology(Link(latency=0.05))
+    comms = {}
+
+    def transport(_, client_id):
+        comms[client_id] = EmulatedCommunication(
+            Communication("localhost", 5000, client_id), topology, spec.participant_ids,
+            compute_time=False
+        )
+        return comms[client_id]
+
+    results = run_local_parties(spec, value_dicts, timeout=30, transport=transport)
+    plan = plan_protocol(spec, rtt=0.1, poll_delay=0)
+    for client_id, result in results.items():
+        assert result == 3 * 5 * 7 + 2
+        assert comms[client_id].clock == pytest.approx(plan.latency)
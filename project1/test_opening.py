@@ -0,0 +1,82 @@
+"""
+Tests of the opening routes of the server, which reconstruct values from the shares of every
+client.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+
+from communication import Communication
+from field import MERSENNE_61
+
+
+def test_opening_waits_for_every_share(server):
+    comms = [Communication("localhost", 5000, name) for name in ["Alice", "Bob", "Charlie"]]
+    comms[0].publish_opening_share("sum", [1, np.array([1, 2])])
+    comms[1].publish_opening_share("sum", [2, [3, 4]])
+    # The last share is published while the others wait for the values.
+    threading.Timer(0.3, comms[2].publish_opening_share, ("sum", [6700416, [0, 6700416]])).start()
+    tic = time.perf_counter()
+    assert comms[0].retrieve_opening("sum") == [2, [4, 5]]
+    assert time.perf_counter() - tic >= 0.3
+    assert comms[1].retrieve_opening("sum") == [2, [4, 5]]
+
+
+def test_opening_in_field(server):
+    comms = [Communication("localhost", 5000, name) for name in ["Alice", "Bob", "Charlie"]]
+    modulus = MERSENNE_61.modulus
+    for comm in comms:
+        comm.publish_opening_share("mersenne", [modulus - 1], MERSENNE_61.name)
+    assert comms[2].retrieve_opening("mersenne") == [modulus - 3]
+
+
+def test_opening_forgotten_once_retrieved(server):
+    comms = [Communication("localhost", 5000, name) for name in ["Alice", "Bob", "Charlie"]]
+    for comm in comms:
+        comm.publish_opening_share("reused", [1])
+    for comm in comms:
+        assert comm.retrieve_opening("reused") == [3]
+    res = requests.get("http://localhost:5000/opening/Alice/reused")
+    assert res.status_code == 404
+    # The label opens new values, not the ones of its earlier use.
+    for comm in comms:
+        comm.publish_opening_share("reused", [2])
+    assert comms[0].retrieve_opening("reused") == [6]
+
+
+def test_opening_of_unknown_client(server):
+    with pytest.raises(requests.HTTPError):
+        Communication("localhost", 5000, "Mallory").publish_opening_share("sum", [1])
+
+
+def test_rejected_share_leaves_connection_usable(server):
+    mallory = Communication("localhost", 5000, "Mallory", pool_size=1)
+    with pytest.raises(requests.HTTPError):
+        mallory.publish_opening_share("rejected", [1, 2, 3])
+    # The next request is sent on the same connection, after the body of the rejected one.
+    mallory.publish_message("after_rejected", b"[1, 2, 3]")
+    alice = Communication("localhost", 5000, "Alice")
+    assert alice.retrieve_public_message("Mallory", "after_rejected") == b"[1, 2, 3]"
+
+
+def test_openings_scoped_to_participants(server):
+    first = [
+        Communication("localhost", 5000, name, participants=["Alice", "Bob"])
+        for name in ["Alice", "Bob"]
+    ]
+    second = [
+        Communication("localhost", 5000, name, participants=["Bob", "Charlie"])
+        for name in ["Bob", "Charlie"]
+    ]
+    # Each pair opens its own values under the same label, without the third client.
+    for comm, share in zip(first + second, [1, 2, 10, 20]):
+        comm.publish_opening_share("pair", [share])
+    assert [comm.retrieve_opening("pair") for comm in first] == [[3], [3]]
+    assert [comm.retrieve_opening("pair") for comm in second] == [[30], [30]]
+    outsider = Communication("localhost", 5000, "Charlie", participants=["Alice", "Bob"])
+    with pytest.raises(requests.HTTPError):
+        outsider.publish_opening_share("pair", [1])
@@ -0,0 +1,94 @@
+"""
+Unit tests for the expression optimizer.
+"""
+
+import random
+
+from expression import InnerProduct, Operation, Scalar, Secret, postorder
+from optimizer import optimize_expression
+from secret_sharing import Share
+
+
+def evaluate(expr, values):
+    """Evaluate an expression in the clear."""
+    results = {}
+    for e in postorder(expr):
+        if isinstance(e, Operation):
+            a, b = results[e.a.id], results[e.b.id]
+            if e.is_addition():
+                results[e.id] = a + b
+            elif e.is_subtraction():
+                results[e.id] = a - b
+            else:
+                results[e.id] = a * b
+        elif isinstance(e, InnerProduct):
+            results[e.id] = sum(results[x.id] * results[y.id] for x, y in zip(e.xs, e.ys))
+        elif isinstance(e, Secret):
+            results[e.id] = values[e.id]
+        else:
+            results[e.id] = e.value
+    return results[expr.id] % Share.FIELD
+
+
+def test_factoring():
+    a, b, c = Secret(1), Secret(2), Secret(3)
+    optimized, report = optimize_expression(a * c + b * c)
+    assert report.multiplications_before == 2
+    assert report.multiplications_after == 1
+
+
+def test_rebalancing():
+    secrets = [Secret() for _ in range(8)]
+    expr = secrets[0]
+    for secret in secrets[1:]:
+        expr = expr * secret
+    _, report = optimize_expression(expr)
+    assert report.multiplications_after == 7
+    assert report.depth_before == 7
+    assert report.depth_after == 3
+
+
+def test_constant_folding():
+    a, b = Secret(), Secret()
+    expr = (a * Scalar(2) + b) * Scalar(3) + Scalar(2) * Scalar(5) - a
+    optimized, _ = optimize_expression(expr)
+    assert repr(optimized) == "((Secret(Null) * Scalar(5) + Secret(Null) * Scalar(3)) + Scalar(10))"
+    optimized, _ = optimize_expression(Scalar(4) * (Scalar(2) - Scalar(5)))
+    assert repr(optimized) == "Scalar(-12)"
+
+
+def test_inner_product():
+    grades = [Secret() for _ in range(4)]
+    ects = [Secret() for _ in range(4)]
+    expr = grades[0] * ects[0]
+    for grade, ect in zip(grades[1:], ects[1:]):
+        expr = expr + grade * ect
+    optimized, report = optimize_expression(expr + Scalar(2) * grades[0] * ects[0])
+    assert isinstance(optimized, InnerProduct)
+    assert len(optimized.xs) == 4
+    assert report.multiplications_after == 4
+    assert report.depth_after == 1
+
+
+def test_shared_products_are_kept():
+    a, b, c = Secret(), Secret(), Secret()
+    ab = a * b
+    expr = ab * ab + ab * c
+    _, report = optimize_expression(expr)
+    assert report.multiplications_after <= report.multiplications_before
+
+
+def test_optimized_expressions_are_equivalent():
+    rng = random.Random(523)
+    for _ in range(500):
+        secrets = [Secret() for _ in range(5)]
+        values = {secret.id: rng.randrange(Share.FIELD) for secret in secrets}
+        pool = secrets + [Scalar(rng.randint(-3, 5)) for _ in range(3)]
+        for _ in range(rng.randint(1, 30)):
+            a, b = rng.choice(pool), rng.choice(pool)
+            pool.append(rng.choice([a + b, a - b, a * b]))
+        outputs = pool[-2:]
+        optimized, report = optimize_expression(outputs)
+        for output, result in zip(outputs, optimized):
+            assert evaluate(output, values) == evaluate(result, values)
+        assert report.multiplications_after <= report.multiplications_before
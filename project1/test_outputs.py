@@ -0,0 +1,46 @@
+"""
+Integration tests of the protocols revealing several named outputs.
+"""
+
+import numpy as np
+
+from expression import Scalar, Secret, SecretVector
+from protocol import ProtocolSpec
+from test_integration import run_processes
+
+
+def test_named_outputs():
+    """
+    sum = a + b + c, products = a * b + b * c, scaled = (u + v) * K, shifted = a - K
+    """
+    alice_secret = Secret()
+    bob_secret = Secret()
+    charlie_secret = Secret()
+    alice_vector = SecretVector(10)
+    bob_vector = SecretVector(10)
+
+    parties = {
+        "Alice": {alice_secret: 3, alice_vector: np.arange(10)},
+        "Bob": {bob_secret: 14, bob_vector: np.ones(10, dtype=np.int64)},
+        "Charlie": {charlie_secret: 2},
+    }
+    expr = {
+        "sum": alice_secret + bob_secret + charlie_secret,
+        "products": alice_secret * bob_secret + bob_secret * charlie_secret,
+        "scaled": (alice_vector + bob_vector) * Scalar(5),
+        "shifted": alice_secret - Scalar(1),
+    }
+    expected = {
+        "sum": 3 + 14 + 2,
+        "products": 3 * 14 + 14 * 2,
+        "scaled": (np.arange(10) + 1) * 5,
+        "shifted": 3 - 1,
+    }
+
+    participants = list(parties.keys())
+    prot = ProtocolSpec(expr=expr, participant_ids=participants)
+    clients = [(name, prot, value_dict) for name, value_dict in parties.items()]
+    for result in run_processes(participants, *clients):
+        assert list(result) == list(expected)
+        for name, value in expected.items():
+            assert np.array_equal(result[name], value)
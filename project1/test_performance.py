@@ -0,0 +1,190 @@
+"""
+Performance benchmarks of the SMC party.
+Run them with `python3 -m pytest -s test_performance.py` to see the measurements.
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from multiprocessing import Process
+from threading import Thread
+
+import requests
+
+from communication import Communication
+from expression import Scalar, Secret
+from protocol import ProtocolSpec
+from secret_sharing import Share, reconstruct_secret
+from smc_party import SMCParty
+from test_integration import smc_server
+
+
+def build_circuit(num_secrets):
+    """Left-deep chain mixing additions, subtractions and scalar multiplications."""
+    secrets = [Secret() for _ in range(num_secrets)]
+    expr = secrets[0]
+    for i, secret in enumerate(secrets[1:]):
+        if i % 2:
+            expr = expr + secret * Scalar(3)
+        else:
+            expr = expr - secret
+    return secrets, expr
+
+
+def time_evaluation(num_secrets):
+    secrets, expr = build_circuit(num_secrets)
+    spec = ProtocolSpec(participant_ids=["Alice"], expr=expr)
+    party = SMCParty("Alice", "localhost", 5000, spec, {s: i for i, s in enumerate(secrets)})
+    party.init_secret_sharing()
+    # Like timeit, keep the garbage collector from adding noise to the measurement.
+    gc.disable()
+    tic = time.perf_counter()
+    party.process_expression(expr)
+    toc = time.perf_counter()
+    gc.enable()
+    return toc - tic, party.cache_misses
+
+
+def test_evaluation_scales_linearly():
+    per_node = []
+    for num_secrets in [10000, 50000, 100000]:
+        elapsed, num_nodes = time_evaluation(num_secrets)
+        per_node.append(elapsed / num_nodes)
+        print(f"{num_nodes} nodes: {elapsed:.3f} s ({per_node[-1] * 1e6:.2f} us/node)")
+    # Linear growth: the cost of a node does not depend on the size of the circuit.
+    assert per_node[-1] < 3 * per_node[0]
+
+
+class DictShare:
+    """Share without __slots__, the layout Share used to have."""
+
+    def __init__(self, value=0, is_secret=True):
+        self.value = value % Share.FIELD
+        self.is_secret = is_secret
+
+
+def allocated_bytes(cls, num_shares):
+    """Memory held by a list of shares, without the list itself."""
+    tracemalloc.start()
+    shares = [cls(i) for i in range(num_shares)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size - sys.getsizeof(shares)
+
+
+def test_share_memory():
+    slotted = allocated_bytes(Share, 100000) / 100000
+    unslotted = allocated_bytes(DictShare, 100000) / 100000
+    print(f"{slotted:.1f} bytes/share, {unslotted:.1f} bytes/share without slots")
+    assert slotted < unslotted
+
+
+def time_sum(accumulate, shares):
+    gc.disable()
+    tic = time.perf_counter()
+    accumulate(shares)
+    toc = time.perf_counter()
+    gc.enable()
+    return toc - tic
+
+
+def add(shares):
+    total = Share(0)
+    for share in shares:
+        total = total + share
+    return total
+
+
+def add_in_place(shares):
+    total = Share(0)
+    for share in shares:
+        total += share
+    return total
+
+
+def test_share_accumulation():
+    shares = [Share(i) for i in range(100000)]
+    assert add(shares).value == add_in_place(shares).value == reconstruct_secret(shares)
+    # One share is allocated in total, instead of one per addition.
+    total = Share(0)
+    accumulator = total
+    for share in shares[:10]:
+        total += share
+    assert total is accumulator
+    new_shares = min(time_sum(add, shares) for _ in range(5))
+    in_place = min(time_sum(add_in_place, shares) for _ in range(5))
+    reconstruct = min(time_sum(reconstruct_secret, shares) for _ in range(5))
+    print(
+        f"100000 shares: + {new_shares * 1e3:.2f} ms, += {in_place * 1e3:.2f} ms, "
+        f"reconstruct_secret {reconstruct * 1e3:.2f} ms"
+    )
+
+
+def sharing_traffic(seeded_sharing, num_parties=3, num_secrets=300):
+    """Bytes sent by each party to distribute the shares of its inputs."""
+    participants = [f"Party{i}" for i in range(num_parties)]
+    inputs = {name: {Secret(): i for i in range(num_secrets)} for name in participants}
+    spec = ProtocolSpec(participant_ids=participants, expr=None, seeded_sharing=seeded_sharing)
+    parties = [
+        SMCParty(name, "localhost", 5000, spec, value_dict) for name, value_dict in inputs.items()
+    ]
+
+    server = Process(target=smc_server, args=(participants,))
+    server.start()
+    time.sleep(3)
+    threads = [Thread(target=party.init_secret_sharing) for party in parties]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.terminate()
+    server.join()
+
+    for party in parties:
+        assert len(party.input_shares) == num_parties * num_secrets
+    return [party.comm.bytes_sent for party in parties]
+
+
+def test_seeded_sharing_traffic():
+    random_bytes = sharing_traffic(seeded_sharing=False)
+    seeded_bytes = sharing_traffic(seeded_sharing=True)
+    print(f"random shares: {random_bytes} bytes sent, seeded shares: {seeded_bytes} bytes sent")
+    assert all(seeded < random for seeded, random in zip(seeded_bytes, random_bytes))
+
+
+def publish_rate(publish, num_messages=500):
+    """Messages published per second, one after the other."""
+    tic = time.perf_counter()
+    for i in range(num_messages):
+        publish(f"message{i}", b"x" * 64)
+    return num_messages / (time.perf_counter() - tic)
+
+
+def opened_connections(comm):
+    """Number of connections to the server opened by a Communication."""
+    poolmanager = comm.session.get_adapter(comm.base_url).poolmanager
+    return sum(poolmanager.pools[key].num_connections for key in poolmanager.pools.keys())
+
+
+def test_connection_pooling():
+    server = Process(target=smc_server, args=(["Alice"],))
+    server.start()
+    time.sleep(3)
+    comm = Communication("localhost", 5000, "Alice")
+
+    def publish_fresh(label, message):
+        # A new connection per message, as with the module-level functions of requests.
+        requests.post(f"{comm.base_url}/public/Alice/fresh_{label}", message)
+
+    try:
+        fresh = publish_rate(publish_fresh)
+        pooled = publish_rate(comm.publish_message)
+        connections = opened_connections(comm)
+    finally:
+        comm.close()
+        server.terminate()
+        server.join()
+    print(f"{fresh:.0f} messages/s with a connection each, {pooled:.0f} messages/s pooled")
+    # Every message went over the same kept-alive connection.
+    assert connections == 1
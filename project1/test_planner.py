@@ -0,0 +1,62 @@
+"""
+Unit tests for the cost planner.
+"""
+
+import pytest
+
+from expression import Scalar, Secret, SecretVector
+from planner import main, plan_protocol
+from protocol import ProtocolSpec
+
+
+def example_spec():
+    a, b, c = Secret(), Secret(), Secret()
+    u, v = SecretVector(100), SecretVector(100)
+    spec = ProtocolSpec(
+        participant_ids=["Alice", "Bob", "Charlie"],
+        expr={"products": a * b * c + Scalar(3), "dot": u @ v},
+        optimize=False
+    )
+    inputs = {"Alice": [a, u], "Bob": [b, v], "Charlie": [c]}
+    return spec, inputs
+
+
+def test_plan_counts():
+    spec, inputs = example_spec()
+    plan = plan_protocol(spec, inputs, rtt=0.01, poll_delay=0.2)
+    assert plan.depth == 2
+    assert plan.rounds == 4
+    # a * b and the 100 products of the dot product, then (a * b) * c
+    assert plan.triplets == 102
+    assert [party.inputs for party in plan.parties] == [2, 2, 1]
+    for party in plan.parties:
+        # Inputs: 2 bundles sent and 1 bulk retrieve. Each layer: triplets, publish and
+        # 1 bulk retrieve. Reveal: publish and 1 bulk retrieve.
+        assert party.messages == 3 + 2 * 3 + 2
+        assert party.bytes_sent > 0 and party.bytes_received > 0
+        assert party.latency == pytest.approx(11 * 0.01 + 4 * 0.1)
+    # Alice and Bob send vectors, Charlie a single share.
+    assert plan.parties[2].bytes_sent < plan.parties[0].bytes_sent
+
+
+def test_plan_seeded_sharing_sends_less():
+    spec, inputs = example_spec()
+    random_plan = plan_protocol(spec, inputs)
+    spec.seeded_sharing = True
+    seeded_plan = plan_protocol(spec, inputs)
+    for random_party, seeded_party in zip(random_plan.parties, seeded_plan.parties):
+        assert seeded_party.bytes_sent < random_party.bytes_sent
+
+
+def test_plan_check():
+    spec, inputs = example_spec()
+    plan = plan_protocol(spec, inputs, rtt=0.5)
+    plan.check(60)
+    with pytest.raises(ValueError):
+        plan.check(1)
+
+
+def test_cli(capsys):
+    assert main(["test_planner:example_spec", "--rtt", "0.01"]) == 0
+    assert "triplets: 102" in capsys.readouterr().out
+    assert main(["test_planner:example_spec", "--max-latency", "0.01"]) == 1
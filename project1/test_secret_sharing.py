@@ -4,9 +4,18 @@ Testing secret sharing is not obligatory.
 
 MODIFY THIS FILE.
 """
+import numpy as np
+
 from secret_sharing import (
+    derive_share,
+    split_secret_with_seeds,
     split_secret_in_shares,
-    reconstruct_secret
+    split_secret_vector_in_shares,
+    reconstruct_secret,
+    reconstruct_secret_vector,
+    reconstruct_values,
+    Share,
+    ShareVector
 )
 from expression import Secret
 
@@ -14,3 +23,69 @@ def test():
     shares = split_secret_in_shares(2000, 5)
     ans = reconstruct_secret(shares)
     assert ans == 2000
+
+
+def test_share_arithmetic():
+    a = Share(Share.FIELD - 1)
+    b = Share(5, False)
+    assert (a + b).value == 4
+    assert (b - a).value == 6
+    assert (a * b).value == Share.FIELD - 5
+    assert (a + b).is_secret and not (b * b).is_secret
+    # sum() starts from 0 and returns a share
+    total = sum([a, b, Share(3)])
+    assert isinstance(total, Share) and total.value == 7
+
+
+def test_share_in_place():
+    total = Share(0, False)
+    alias = total
+    for value in [3, Share.FIELD - 1, 10]:
+        total += Share(value)
+    assert total is alias and total.value == 12 and total.is_secret
+    total -= Share(20)
+    total *= Share(2)
+    assert total.value == Share.FIELD - 16
+
+
+def test_vector():
+    secret = np.array([0, 1, 2000, Share.FIELD - 1])
+    shares = split_secret_vector_in_shares(secret, 5)
+    assert all(len(share) == 4 for share in shares)
+    assert np.array_equal(reconstruct_secret_vector(shares), secret)
+
+
+def test_vector_arithmetic():
+    u = ShareVector([1, 2, 3])
+    v = ShareVector([Share.FIELD - 1, 5, 6])
+    assert (u + v).values.tolist() == [0, 7, 9]
+    assert (u - v).values.tolist() == [2, Share.FIELD - 3, Share.FIELD - 3]
+    assert (u * Share(2, False)).values.tolist() == [2, 4, 6]
+
+
+def test_seeded_shares():
+    secret_id = Secret().id
+    shares = split_secret_with_seeds(2000, secret_id, [11, 22, 33])
+    assert reconstruct_secret(shares) == 2000
+    # The holders of the seeds derive their shares by themselves.
+    assert [derive_share(seed, secret_id).value for seed in [11, 22, 33]] == [
+        share.value for share in shares[:3]
+    ]
+
+    vector = np.array([0, 1, 2000, Share.FIELD - 1])
+    shares = split_secret_with_seeds(vector, secret_id, [11, 22], size=4)
+    assert np.array_equal(reconstruct_secret_vector(shares), vector)
+    assert np.array_equal(derive_share(22, secret_id, 4).values, shares[1].values)
+
+
+def test_reconstruct_values():
+    scalar = split_secret_in_shares(42, 3)
+    vector = split_secret_vector_in_shares([1, 2, Share.FIELD - 1], 3)
+    # Vectors come as lists from JSON bodies, or as arrays.
+    shares = [
+        [s.value, v.values.tolist() if i else v.values]
+        for i, (s, v) in enumerate(zip(scalar, vector))
+    ]
+    value, values = reconstruct_values(shares)
+    assert value == 42
+    assert values.tolist() == [1, 2, Share.FIELD - 1]
@@ -0,0 +1,95 @@
+"""
+Tests of the sessions of queries over the same inputs.
+"""
+
+import threading
+
+from expression import Scalar, Secret
+from local_communication import LocalCommunication, LocalServer
+from session import SMCSession
+
+
+class CountingServer(LocalServer):
+    """LocalServer counting the private messages sent to it."""
+
+    def __init__(self, participants, timeout=None):
+        super().__init__(participants, timeout)
+        self.private_messages = 0
+
+    def set_value(self, pool, channel, data):
+        super().set_value(pool, channel, data)
+        self.private_messages += pool == "private"
+
+
+def test_queries_reuse_inputs():
+    secrets = {"Alice": Secret(), "Bob": Secret(), "Charlie": Secret()}
+    values = {"Alice": 3, "Bob": 5, "Charlie": 7}
+    participants = list(secrets)
+    server = CountingServer(participants, timeout=10)
+    weights = [(1, 1, 1), (2, 0, 1), (1, 1, 1)]
+    results = {}
+
+    def run(client_id):
+        session = SMCSession(
+            client_id, None, None, participants, {secrets[client_id]: values[client_id]},
+            comm=LocalCommunication(server, client_id)
+        )
+        answers = []
+        for weight in weights:
+            # Every party builds its own expressions, with the same secrets.
+            a, b, c = (secrets[name] * Scalar(w) for name, w in zip(participants, weight))
+            answers.append(session.query(a + b + c))
+        total = secrets["Alice"] + secrets["Bob"] + secrets["Charlie"]
+        answers.append(session.query([total, Scalar(3)]))
+        answers.append(session.query({
+            "product": secrets["Alice"] * secrets["Bob"] * secrets["Charlie"], "total": total
+        }))
+        results[client_id] = (answers, session.queries)
+
+    workers = [threading.Thread(target=run, args=(client_id,)) for client_id in participants]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    for answers, queries in results.values():
+        assert answers == [15, 13, 15, 5, {"product": 105, "total": 15}]
+        assert queries == 5
+    # The inputs were only shared once, to each other party.
+    assert server.private_messages == len(participants) * (len(participants) - 1)
+    assert not server.store["private"]
+
+
+def test_sessions_in_a_row():
+    secrets = {"Alice": Secret(), "Bob": Secret()}
+    participants = list(secrets)
+    server = LocalServer(participants, timeout=10)
+
+    def run_session(values):
+        results = {}
+
+        def run(client_id):
+            session = SMCSession(
+                client_id, None, None, participants, {secrets[client_id]: values[client_id]},
+                comm=LocalCommunication(server, client_id)
+            )
+            results[client_id] = (
+                session.query(secrets["Alice"] + secrets["Bob"]),
+                session.query(secrets["Alice"] * secrets["Bob"])
+            )
+
+        workers = [threading.Thread(target=run, args=(client_id,)) for client_id in participants]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    assert run_session({"Alice": 5, "Bob": 10}) == {"Alice": (15, 50), "Bob": (15, 50)}
+    triplets = len(server.ttp.tripletPerOp)
+    # The second session reads none of the messages of the first one.
+    assert run_session({"Alice": 15, "Bob": 20}) == {"Alice": (35, 300), "Bob": (35, 300)}
+    # and gets its own Beaver triplets.
+    assert len(server.ttp.tripletPerOp) == 2 * triplets
+    # The opened values are forgotten once every party retrieved them.
+    assert not server.store["opening"]
@@ -0,0 +1,47 @@
+"""
+Unit tests for the SMC party.
+"""
+
+import pytest
+
+from expression import FixedSecret, Secret, Scalar
+from protocol import ProtocolSpec
+from secret_sharing import Share
+from smc_party import SMCParty
+
+
+def test_process_expression_reuses_shared_nodes():
+    x = Secret()
+    spec = ProtocolSpec(participant_ids=["Alice"], expr=None)
+    party = SMCParty("Alice", "localhost", 5000, spec, {x: 7})
+    party.init_secret_sharing()
+
+    term = x * Scalar(3)
+    expr = term + term - (term + Scalar(1))
+    share = party.process_expression(expr)
+
+    assert share.value == 7 * 3 + 7 * 3 - (7 * 3 + 1)
+    # `term` and `x` are computed once, the other references hit the cache.
+    assert party.cache_hits == 2
+    assert party.cache_misses == 7
+
+
+def test_process_expression_deep_chain():
+    secrets = [Secret() for _ in range(20000)]
+    spec = ProtocolSpec(participant_ids=["Alice"], expr=None)
+    party = SMCParty("Alice", "localhost", 5000, spec, {s: i for i, s in enumerate(secrets)})
+    party.init_secret_sharing()
+
+    expr = secrets[0]
+    for secret in secrets[1:]:
+        expr = expr + secret
+    assert party.process_expression(expr).value == sum(range(20000)) % Share.FIELD
+
+
+def test_fixed_point_needs_a_large_field():
+    x, y = FixedSecret(), FixedSecret()
+    spec = ProtocolSpec(participant_ids=["Alice"], expr=None)
+    party = SMCParty("Alice", "localhost", 5000, spec, {x: 1.5, y: 2.0})
+    party.init_secret_sharing()
+    with pytest.raises(ValueError):
+        party.process_expression(x * y)
@@ -0,0 +1,58 @@
+"""
+Tests of the stream of messages pushed by the server.
+"""
+
+import threading
+import time
+
+from communication import StreamCommunication
+from expression import Scalar, Secret
+from protocol import ProtocolSpec
+from smc_party import SMCParty
+
+
+def test_stream_messages(server):
+    alice = StreamCommunication("localhost", 5000, "Alice")
+    bob = StreamCommunication("localhost", 5000, "Bob", senders=["Alice"])
+    charlie = StreamCommunication("localhost", 5000, "Charlie")
+    # Sent before the subscription, then after it.
+    alice.publish_message("before", b"1")
+    alice.send_private_message("Bob", "before", b"2")
+    bob.subscribe()
+    threading.Timer(0.2, alice.publish_message, ("after", b"3")).start()
+    threading.Timer(0.2, alice.send_private_message, ("Bob", "after", b"4")).start()
+    charlie.publish_message("ignored", b"5")
+
+    assert bob.retrieve_public_message("Alice", "before") == b"1"
+    assert bob.retrieve_private_messages(["before", "after"]) == {"before": b"2", "after": b"4"}
+    assert bob.retrieve_public_message("Alice", "after") == b"3"
+    assert bob.bytes_received > 0
+    # Bob only subscribed to the messages of Alice.
+    time.sleep(0.2)
+    assert ("public", "Charlie", "ignored") not in bob._mailbox
+    for comm in (alice, bob, charlie):
+        comm.close()
+
+
+def test_parties_over_streams(server):
+    secrets = {"Alice": Secret(), "Bob": Secret(), "Charlie": Secret()}
+    values = {"Alice": 3, "Bob": 5, "Charlie": 7}
+    expr = secrets["Alice"] * secrets["Bob"] * secrets["Charlie"] + Scalar(1)
+    prot = ProtocolSpec(participant_ids=list(secrets), expr=expr)
+    results = {}
+
+    def run(client_id):
+        comm = StreamCommunication("localhost", 5000, client_id)
+        party = SMCParty(
+            client_id, "localhost", 5000, prot, {secrets[client_id]: values[client_id]},
+            comm=comm
+        )
+        results[client_id] = party.run()
+        comm.close()
+
+    workers = [threading.Thread(target=run, args=(client_id,)) for client_id in secrets]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    assert results == {client_id: 3 * 5 * 7 + 1 for client_id in secrets}
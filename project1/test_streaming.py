@@ -0,0 +1,154 @@
+"""
+Tests of the streaming of the inputs.
+"""
+
+import threading
+
+import pytest
+
+from expression import Scalar, Secret, SecretVector
+from local_communication import LocalCommunication, LocalServer
+from protocol import ProtocolSpec
+from streaming import StreamingSMCParty, read_chunks, read_csv_column
+
+
+class StoreSizeServer(LocalServer):
+    """LocalServer recording the largest number of private messages it held."""
+
+    def __init__(self, participants, timeout=None):
+        super().__init__(participants, timeout)
+        self.largest = 0
+
+    def set_value(self, pool, channel, data):
+        super().set_value(pool, channel, data)
+        self.largest = max(self.largest, len(self.store["private"]))
+
+
+def run_streaming(prot, value_dicts, streams, prefetch=2, server=None):
+    server = server or LocalServer(prot.participant_ids, timeout=10)
+    parties = {
+        client_id: StreamingSMCParty(
+            client_id, None, None, prot, value_dicts.get(client_id, {}),
+            streams.get(client_id, {}), prefetch, comm=LocalCommunication(server, client_id)
+        )
+        for client_id in prot.participant_ids
+    }
+    results = {}
+    errors = []
+
+    def run(client_id):
+        try:
+            results[client_id] = parties[client_id].run()
+        except Exception as error:
+            errors.append(error)
+
+    workers = [threading.Thread(target=run, args=(client_id,)) for client_id in parties]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+    return results, parties
+
+
+def test_read_chunks():
+    assert list(read_chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(read_chunks([], 3)) == []
+
+
+def test_read_csv_column(tmp_path):
+    path = tmp_path / "values.csv"
+    path.write_text("id,value\n" + "".join(f"{i},{i * 10}\n" for i in range(5)))
+    assert list(read_csv_column(str(path), "value", 2)) == [[0, 10], [20, 30], [40]]
+
+
+def test_streamed_dot_product():
+    n = 1000
+    u, v = SecretVector(64), SecretVector(64)
+    weight = Secret()
+    prot = ProtocolSpec(
+        participant_ids=["Alice", "Bob", "Charlie"],
+        expr={"weighted": (u @ v) * weight, "dot": u @ v}
+    )
+    streams = {
+        "Alice": {u: read_chunks(range(n), 64)},
+        "Bob": {v: read_chunks((i % 7 for i in range(n)), 64)},
+    }
+    results, parties = run_streaming(prot, {"Charlie": {weight: 3}}, streams)
+    dot = sum(i * (i % 7) for i in range(n)) % 6700417
+    for client_id, result in results.items():
+        assert result == {"weighted": dot * 3 % 6700417, "dot": dot}
+        assert parties[client_id].chunks == 16
+
+
+def test_server_store_bounded():
+    u, v = SecretVector(10), SecretVector(10)
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob", "Charlie"], expr=u @ v)
+    streams = {
+        "Alice": {u: read_chunks(range(1000), 10)}, "Bob": {v: read_chunks(range(1000), 10)}
+    }
+    server = StoreSizeServer(prot.participant_ids, timeout=10)
+    results, parties = run_streaming(prot, {}, streams, prefetch=2, server=server)
+    for client_id, result in results.items():
+        assert result == sum(i * i for i in range(1000)) % 6700417
+        assert parties[client_id].chunks == 100
+    # Each streamer is at most a few chunks ahead of the others, whatever the streams length.
+    assert server.largest <= 2 * 2 * (2 + 2)
+    assert not server.store["private"]
+
+
+def test_streamed_average():
+    values = list(range(1, 101))
+    u = SecretVector(30)
+    ones = SecretVector(30)
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=[u @ ones, ones @ ones])
+    streams = {
+        "Alice": {u: read_chunks(values, 30)},
+        "Bob": {ones: read_chunks([1] * 100, 30)},
+    }
+    results, _ = run_streaming(prot, {}, streams, prefetch=1)
+    for result in results.values():
+        assert result == pytest.approx(sum(values) / len(values))
+
+
+def test_streams_of_different_lengths():
+    u, v = SecretVector(10), SecretVector(10)
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=u @ v)
+    streams = {"Alice": {u: read_chunks(range(25), 10)}, "Bob": {v: read_chunks(range(15), 10)}}
+    with pytest.raises(ValueError):
+        run_streaming(prot, {}, streams)
+
+
+def test_streamed_terms_per_element():
+    # Constants are fine element-wise, before the sum over the stream, and secrets after.
+    u, ones = SecretVector(10), SecretVector(10)
+    w = Secret()
+    prot = ProtocolSpec(
+        participant_ids=["Alice", "Bob"], expr=(u + Scalar(1)) @ ones + (u @ ones) * w
+    )
+    streams = {
+        "Alice": {u: read_chunks(range(100), 10)}, "Bob": {ones: read_chunks([1] * 100, 10)}
+    }
+    results, _ = run_streaming(prot, {"Bob": {w: 5}}, streams)
+    for result in results.values():
+        assert result == sum(range(100)) + 100 + 5 * sum(range(100))
+
+
+@pytest.mark.parametrize("output", ["constant", "secret", "square", "vector"])
+def test_streamed_outputs_must_be_sums(output):
+    u, ones = SecretVector(10), SecretVector(10)
+    w = Secret()
+    total = u @ ones
+    expr = {
+        "constant": total + Scalar(1),
+        "secret": total + w,
+        "square": total * total,
+        "vector": u,
+    }[output]
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=expr)
+    streams = {
+        "Alice": {u: read_chunks(range(100), 10)}, "Bob": {ones: read_chunks([1] * 100, 10)}
+    }
+    with pytest.raises(ValueError):
+        run_streaming(prot, {"Bob": {w: 5}}, streams)
@@ -5,8 +5,52 @@ Testing ttp is not obligatory.
 MODIFY THIS FILE.
 """
 
+import numpy as np
+
+from field import MERSENNE_61
+from secret_sharing import Share, reconstruct_secret, reconstruct_secret_vector
 from ttp import TrustedParamGenerator
 
 
+def test_vector_triplet():
+    ttp = TrustedParamGenerator()
+    for participant in ["Alice", "Bob", "Charlie"]:
+        ttp.add_participant(participant)
+    shares = [ttp.retrieve_share(participant, "op", 10) for participant in ["Alice", "Bob", "Charlie"]]
+    a, b, c = (reconstruct_secret_vector(list(column)) for column in zip(*shares))
+    assert np.array_equal((a * b) % Share.FIELD, c)
+
+
+def test_triplet_masks_are_uniform():
+    ttp = TrustedParamGenerator()
+    for participant in ["Alice", "Bob"]:
+        ttp.add_participant(participant)
+    masks = []
+    for i in range(20):
+        shares = [
+            ttp.retrieve_share(participant, f"op{i}", 0, MERSENNE_61)
+            for participant in ["Alice", "Bob"]
+        ]
+        a, b, c = (reconstruct_secret(list(column)) for column in zip(*shares))
+        assert c == MERSENNE_61.reduce(a * b)
+        masks += [a, b]
+    # Masks of about 30 bits would leave the high bits of the opened values in clear.
+    assert max(masks) > 2 ** 58
+
+
+def test_triplets_split_among_participants():
+    ttp = TrustedParamGenerator()
+    for participant in ["Alice", "Bob", "Charlie"]:
+        ttp.add_participant(participant)
+    pair = [
+        ttp.retrieve_share(participant, "op", participants=["Alice", "Bob"])
+        for participant in ["Alice", "Bob"]
+    ]
+    a, b, c = (reconstruct_secret(list(column)) for column in zip(*pair))
+    assert c == (a * b) % Share.FIELD
+    # The operation of all the participants has its own triplet.
+    assert ttp.retrieve_share("Alice", "op")[0].value != pair[0][0].value
+
+
 def test():
     raise NotImplementedError("You can create some tests.")
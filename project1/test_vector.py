@@ -0,0 +1,60 @@
+"""
+Integration tests of the computations on secret vectors.
+"""
+
+import numpy as np
+
+from expression import Scalar, SecretVector
+from protocol import ProtocolSpec
+from test_integration import run_processes
+
+
+def vector_suite(parties, expr, expected):
+    participants = list(parties.keys())
+
+    prot = ProtocolSpec(expr=expr, participant_ids=participants)
+    clients = [(name, prot, value_dict) for name, value_dict in parties.items()]
+
+    results = run_processes(participants, *clients)
+
+    for result in results:
+        assert np.array_equal(result, expected)
+
+
+def test_vector_operations():
+    """
+    f(u, v, w) = u * v + w * K - v
+    """
+    alice_vector = SecretVector(1000)
+    bob_vector = SecretVector(1000)
+    charlie_vector = SecretVector(1000)
+    u = np.arange(1000)
+    v = np.arange(1000) % 7
+    w = np.full(1000, 3)
+
+    parties = {
+        "Alice": {alice_vector: u},
+        "Bob": {bob_vector: v},
+        "Charlie": {charlie_vector: w},
+    }
+
+    expr = alice_vector * bob_vector + charlie_vector * Scalar(5) - bob_vector
+    vector_suite(parties, expr, u * v + w * 5 - v)
+
+
+def test_dot_product():
+    """
+    f(u, v) = <u, v> + K
+    """
+    alice_vector = SecretVector(1000)
+    bob_vector = SecretVector(1000)
+    u = np.arange(1000)
+    v = np.arange(1000) % 7
+
+    parties = {
+        "Alice": {alice_vector: u},
+        "Bob": {bob_vector: v},
+    }
+
+    expr = alice_vector @ bob_vector + Scalar(2)
+    vector_suite(parties, expr, int(u @ v) + 2)
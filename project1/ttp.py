@@ -5,20 +5,26 @@ MODIFY THIS FILE.
 """
 
 import collections
+import threading
 from typing import (
     Dict,
+    List,
+    Optional,
     Set,
     Tuple,
 )
 
 from communication import Communication
+from field import DEFAULT_FIELD, STATISTICAL_SECURITY, Field
 from secret_sharing import (
     Share,
-    split_secret_in_shares
+    split_secret_in_shares,
+    split_secret_vector_in_shares
 )
 
-from random import randint
-from math import sqrt, floor
+import numpy as np
+
+from random import getrandbits
 
 # Feel free to add as many imports as you want.
 
@@ -33,6 +39,8 @@ class TrustedParamGenerator:
         self.numParties = 0
         self.tripletPerOp = dict()
         self.clientIdentifier = dict() #client_id -> index of Beaver Triplet
+        # The server handles requests concurrently: all parties must get the same triplet
+        self.lock = threading.Lock()
 
 
     def add_participant(self, participant_id: str) -> None:
@@ -43,35 +51,113 @@ class TrustedParamGenerator:
         self.clientIdentifier[participant_id] = self.numParties
         self.numParties += 1
 
-    def retrieve_share(self, client_id: str, op_id: str) -> Tuple[Share, Share, Share]:
+    def retrieve_share(
+            self,
+            client_id: str,
+            op_id: str,
+            size: int = 0,
+            field: Field = DEFAULT_FIELD,
+            participants: Optional[List[str]] = None
+        ) -> Tuple[Share, Share, Share]:
         """
         Retrieve a triplet of shares for a given client_id.
+        With a size, the shares are ShareVectors of an element-wise triplet of that size.
+        The triplet is generated in the field given by the first client asking for it.
+        With participants, the triplet is split among them only, apart from the triplets of
+        the same operation of other participants.
         """
         #For a given operation id, we should generate number_of_clients*3 values s.t [a]*[b] = [c]
-        if op_id in self.tripletPerOp:
-            id = self.clientIdentifier[client_id]
-            triplet = self.tripletPerOp[op_id]
-            return triplet.get_shares(id)
-        else:
-            self.tripletPerOp[op_id] = BeaverTriplet(self.numParties)
-            id = self.clientIdentifier[client_id]
-            triplet = self.tripletPerOp[op_id]
-            t = triplet.get_shares(id)
-            return t
+        with self.lock:
+            return self._retrieve_share(client_id, op_id, size, field, participants)
+
+    def _retrieve_share(
+            self,
+            client_id: str,
+            op_id: str,
+            size: int,
+            field: Field,
+            participants: Optional[List[str]]
+        ) -> Tuple[Share, Share, Share]:
+        key, numParties, id = self._split(client_id, op_id, participants)
+        if key not in self.tripletPerOp:
+            if size:
+                self.tripletPerOp[key] = BeaverTripletVector(numParties, size, field)
+            else:
+                self.tripletPerOp[key] = BeaverTriplet(numParties, field)
+        return self.tripletPerOp[key].get_shares(id)
+
+    def _split(self, client_id: str, op_id: str, participants: Optional[List[str]]):
+        """
+        Key of the parameters of an operation, their number of shares and the index of the
+        share of a client, among some participants or all of them.
+        """
+        if participants is None:
+            return op_id, self.numParties, self.clientIdentifier[client_id]
+        participants = sorted(participants)
+        return (",".join(participants), op_id), len(participants), participants.index(client_id)
+
+    def retrieve_truncation_pair(
+            self,
+            client_id: str,
+            op_id: str,
+            bits: int,
+            field: Field = DEFAULT_FIELD,
+            participants: Optional[List[str]] = None
+        ) -> Tuple[Share, Share]:
+        """
+        Retrieve the shares of a random mask r and of r >> bits, to truncate a value by bits,
+        split among some participants like the triplets.
+        """
+        with self.lock:
+            key, numParties, id = self._split(client_id, op_id, participants)
+            if key not in self.tripletPerOp:
+                self.tripletPerOp[key] = TruncationPair(numParties, bits, field)
+            return self.tripletPerOp[key].get_shares(id)
 
     # Feel free to add as many methods as you want.
 
 
 class BeaverTriplet:
     """Element defining a Beaver Triplet, containing the three elements (a, b, c), the num of parties, and their shares"""
-    def __init__(self, numParties):
-        self.a = randint(0, int(floor(sqrt(Share.FIELD))))
-        self.b = randint(0, int(floor(sqrt(Share.FIELD))))
-        self.c = self.a * self.b
+    def __init__(self, numParties, field: Field = DEFAULT_FIELD):
+        self.a = field.random()
+        self.b = field.random()
+        self.c = field.reduce(self.a * self.b)
+
+        self.listA = split_secret_in_shares(self.a, numParties, field)
+        self.listB = split_secret_in_shares(self.b, numParties, field)
+        self.listC = split_secret_in_shares(self.c, numParties, field)
+
+    def get_shares(self, id):
+        return self.listA[id], self.listB[id], self.listC[id]
+
+
+class BeaverTripletVector(BeaverTriplet):
+    """Element-wise Beaver Triplets of vectors (a, b, c) with c = a * b, and their shares"""
+    def __init__(self, numParties, size, field: Field = DEFAULT_FIELD):
+        rng = np.random.default_rng()
+        self.a = field.random_vector(size, rng)
+        self.b = field.random_vector(size, rng)
+        self.c = field.mul(self.a, self.b)
+
+        self.listA = split_secret_vector_in_shares(self.a, numParties, field)
+        self.listB = split_secret_vector_in_shares(self.b, numParties, field)
+        self.listC = split_secret_vector_in_shares(self.c, numParties, field)
+
+
+class TruncationPair:
+    """
+    Random mask r of field.value_bits + STATISTICAL_SECURITY bits, and its high part r >> bits,
+    and their shares. Adding r to a value of field.value_bits bits statistically hides it.
+    """
+    def __init__(self, numParties, bits, field: Field = DEFAULT_FIELD):
+        if bits >= field.value_bits:
+            raise ValueError(f"The field is too small to truncate {bits} bits")
+        self.high = getrandbits(field.value_bits + STATISTICAL_SECURITY - bits)
+        self.r = (self.high << bits) + getrandbits(bits)
 
-        self.listA = split_secret_in_shares(self.a, numParties)
-        self.listB = split_secret_in_shares(self.b, numParties)
-        self.listC = split_secret_in_shares(self.c, numParties)
+        self.listR = split_secret_in_shares(self.r, numParties, field)
+        self.listHigh = split_secret_in_shares(self.high, numParties, field)
 
     def get_shares(self, id):
-        return self.listA[id], self.listB[id], self.listC[id]
\ No newline at end of file
+        return self.listR[id], self.listHigh[id]